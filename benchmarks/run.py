@@ -0,0 +1,205 @@
+"""
+Benchmark suite for the hot paths of plates.
+
+Runs every benchmark, prints a summary and optionally writes the results
+as JSON, so that runs can be compared. When a baseline is given, the run
+fails if any benchmark is slower than the baseline times the threshold.
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json --threshold 1.25
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import timeit
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import plates
+from plates import core
+
+try:
+    import numpy as np
+    from plates import bulk
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+PATTERNS: Dict[str, str] = {
+    "short": "CCDD",
+    "std": "CCDDDCC",
+    "long": "CCCDDDDCCCDDDDCCCDDDD",
+    "shorthand": "3C3D",
+}
+
+# Number of calls made by each bulk loop benchmark
+LOOP_SIZE: int = 10_000
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def scalar_benchmarks() -> List[Benchmark]:
+    benchmarks: List[Benchmark] = []
+    for name, pattern in PATTERNS.items():
+        total = core.combinations(pattern)
+        index = total // 3
+        plate = core.get_plate(pattern, index)
+        benchmarks += [
+            (f"expand_pattern[{name}]", lambda p=pattern: core.expand_pattern(p)),
+            (f"combinations[{name}]", lambda p=pattern: core.combinations(p)),
+            (f"get_plate[{name}]", lambda p=pattern, i=index: core.get_plate(p, i)),
+            (f"get_plate_index[{name}]", lambda pl=plate: core.get_plate_index(pl)),
+            (
+                f"matches_pattern[{name}]",
+                lambda p=pattern, pl=plate: core.matches_pattern(p, pl),
+            ),
+            (
+                f"generate_random_plate[{name}]",
+                lambda p=pattern: core.generate_random_plate(p),
+            ),
+            (f"get_pattern[{name}]", lambda pl=plate: core.get_pattern(pl)),
+        ]
+    return benchmarks
+
+
+def loop_benchmarks() -> List[Benchmark]:
+    pattern = PATTERNS["std"]
+    step = core.combinations(pattern) // LOOP_SIZE
+    indices = list(range(1, LOOP_SIZE * step, step))
+    plates_list = [core.get_plate(pattern, i) for i in indices]
+    benchmarks: List[Benchmark] = [
+        (
+            "loop/get_plate",
+            lambda: [core.get_plate(pattern, i) for i in indices],
+        ),
+        (
+            "loop/get_plate_index",
+            lambda: [core.get_plate_index(p) for p in plates_list],
+        ),
+        (
+            "loop/matches_pattern",
+            lambda: [core.matches_pattern(pattern, p) for p in plates_list],
+        ),
+        (
+            "loop/generate_random_plate",
+            lambda: [core.generate_random_plate(pattern) for _ in indices],
+        ),
+    ]
+    if np is not None:
+        array = np.array(indices, dtype=np.int64)
+        plates_array = bulk.get_plates(pattern, array)
+        benchmarks += [
+            ("bulk/get_plates", lambda: bulk.get_plates(pattern, array)),
+            ("bulk/get_plate_indices", lambda: bulk.get_plate_indices(plates_array)),
+        ]
+    return benchmarks
+
+
+def render_std_patterns_table() -> None:
+    with redirect_stdout(io.StringIO()):
+        core.std_patterns_table()
+
+
+def run_cli(*args: str) -> None:
+    subprocess.run(
+        [sys.executable, *args], check=True, stdout=subprocess.DEVNULL
+    )
+
+
+def startup_benchmarks() -> List[Benchmark]:
+    return [
+        ("startup/import", lambda: run_cli("-c", "import plates")),
+        ("startup/cli", lambda: run_cli("-m", "plates", "max_plate", "3C3D")),
+        ("render/std_patterns_table", render_std_patterns_table),
+    ]
+
+
+def all_benchmarks() -> List[Benchmark]:
+    return scalar_benchmarks() + loop_benchmarks() + startup_benchmarks()
+
+
+def measure(f: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, Any]:
+    """
+    Times f, calling it enough times per round to take at least
+    min_time seconds, and returns the best and median time per call
+    over repeat rounds.
+    """
+    timer = timeit.Timer(f)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = sorted(t / number for t in timer.repeat(repeat, number))
+    return {
+        "best": times[0],
+        "median": times[len(times) // 2],
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Returns a message for each benchmark whose best time is over
+    threshold times its best time in the baseline.
+    """
+    slowdowns = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["best"] / old["best"]
+        if ratio > threshold:
+            slowdowns.append(f"{name}: {ratio:.2f}x slower than baseline")
+    return slowdowns
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-o", "--output", help="write the results as JSON to OUTPUT")
+    parser.add_argument("-c", "--compare", help="baseline JSON results to compare to")
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="slowdown over the baseline that fails the run (default 1.25)",
+    )
+    parser.add_argument("-k", "--filter", default="", help="only run matching names")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, f in all_benchmarks():
+        if args.filter not in name:
+            continue
+        results[name] = measure(f, args.repeat, args.min_time)
+        print(f"{name:<40} {results[name]['best'] * 1e6:>14.3f} us")
+
+    report = {
+        "plates_version": plates.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        slowdowns = compare(results, baseline, args.threshold)
+        for msg in slowdowns:
+            print(msg, file=sys.stderr)
+        return 1 if slowdowns else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,17 +2,25 @@ __version__ = "1.1.0"
 
 from plates.core import (
     combinations,
+    compile,
+    CompiledPattern,
+    compile_std,
     expand_pattern,
     generate_random_pattern,
     generate_random_plate,
     get_pattern,
     get_plate,
     get_plate_index,
+    get_overflow_policy,
+    iso_locations,
     matches_pattern,
     max_plate,
     min_plate,
+    set_overflow_policy,
+    STD_ALPHABETS,
     STD_PATTERNS,
     std_patterns_table,
     valid_pattern,
     valid_plate,
 )
+from plates.profiling import instrument
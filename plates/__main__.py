@@ -1,22 +1,59 @@
 import argparse
-import json
-import pathlib
-from typing import Any, Callable, Dict, Iterable, List, Mapping, Union
+import functools
+import sys
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    TextIO,
+    Union,
+)
 
 from plates import __version__ as __version__
 from plates import core
+from plates import registry
+
+
+@functools.lru_cache(maxsize=None)
+def program_info() -> Dict[str, str]:
+    """
+    Returns the "Program Info" section of data.json, with the usage,
+    description and epilog of the program.
+    """
+    info: Dict[str, str] = registry.load_data()["Program Info"]
+    return info
+
+
+class _Parser(argparse.ArgumentParser):
+    """
+    Argument parser taking its usage, description and epilog from
+    program_info only when the help or the usage are shown, so that
+    running a command does not need to parse data.json.
+    """
 
+    def _set_program_info(self) -> None:
+        if self.usage is None:
+            info = program_info()
+            self.usage = info["Program Usage"]
+            self.description = info["Program Description"]
+            self.epilog = info["Program Epilog"]
 
-PATH = pathlib.Path(__file__)
+    def format_usage(self) -> str:
+        self._set_program_info()
+        return super().format_usage()
 
-with open(PATH.parent / "data.json") as f:
-    json_file = json.loads(f.read())
+    def format_help(self) -> str:
+        self._set_program_info()
+        return super().format_help()
 
-program_info = json_file["License Plates"]["Program Info"]
-USAGE: str = program_info["Program Usage"]
-DESCRIPTION: str = program_info["Program Description"]
-EPILOG: str = program_info["Program Epilog"]
 
+# Number of plates written at a time by the enumerate command
+ENUMERATE_CHUNK_SIZE: int = 1 << 16
 
 FUNCTION_NAMES: List[str] = [
     "combinations",
@@ -30,12 +67,9 @@ FUNCTION_NAMES: List[str] = [
 ]
 
 # Create parser for command line arguments
-parser = argparse.ArgumentParser(
+parser = _Parser(
     prog="plates",
-    usage=USAGE,
-    description=DESCRIPTION,
     add_help=True,
-    epilog=EPILOG,
 )
 
 parser.add_argument(
@@ -67,6 +101,74 @@ parser.add_argument(
     type=int,
 )
 
+parser.add_argument(
+    "-b",
+    "--batch",
+    dest="batch",
+    action="store",
+    type=str,
+    metavar="FILE",
+    help="calls the function once for each line of FILE (- for stdin), "
+    "taking from the line the arguments that were not passed",
+)
+
+parser.add_argument(
+    "-o",
+    "--overflow",
+    dest="overflow",
+    action="store",
+    choices=core.OVERFLOW_POLICIES,
+    help="what to do with indices beyond the last plate of a pattern "
+    "(default clamp)",
+)
+
+parser.add_argument(
+    "--shard",
+    dest="shard",
+    action="store",
+    type=str,
+    metavar="K/N",
+    help="makes the enumerate command write only the shard K out of N "
+    "of the plates of the pattern",
+)
+
+parser.add_argument(
+    "--host",
+    dest="host",
+    action="store",
+    type=str,
+    help="address the serve command listens on, or the stats command "
+    "connects to (default 127.0.0.1)",
+)
+
+parser.add_argument(
+    "--port",
+    dest="port",
+    action="store",
+    type=int,
+    help="port the serve command listens on, or the stats command "
+    "connects to (default 7878)",
+)
+
+parser.add_argument(
+    "--unix",
+    dest="unix",
+    action="store",
+    type=str,
+    metavar="PATH",
+    help="Unix socket the serve command listens on, or the stats command "
+    "connects to, instead of a port",
+)
+
+parser.add_argument(
+    "--format",
+    dest="format",
+    action="store",
+    choices=("json", "prometheus"),
+    default="json",
+    help="output format of the stats command (default json)",
+)
+
 parser.add_argument(
     "-lf",
     "--list-functions",
@@ -99,15 +201,33 @@ def get_help_str(f: Callable[..., Any]) -> str:
     """
     parameters: Dict[str, type] = f.__annotations__.copy()
     del parameters["return"]
+    optional = _optional_parameters(f)
     help_str: str = f"\t- {f.__name__}:"
     if not parameters:
         help_str += " (no args)"
     else:
         for pname, ptype in parameters.items():
-            help_str += f" <{pname} ({ptype.__name__})>"
+            if pname in optional:
+                help_str += f" [{pname}]"
+            else:
+                help_str += f" <{pname} ({ptype.__name__})>"
     return help_str
 
 
+def _optional_parameters(f: Callable[..., Any]) -> List[str]:
+    """
+    Returns the names of the parameters of f with a default value.
+    """
+    # Instrumented functions hide the signature of the original
+    while hasattr(f, "__wrapped__"):
+        f = f.__wrapped__
+    defaults = getattr(f, "__defaults__", None) or ()
+    if not defaults:
+        return []
+    code = f.__code__
+    return list(code.co_varnames[code.co_argcount - len(defaults) : code.co_argcount])
+
+
 def call(f: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
     """
     For each parameter that f takes, it is looked up in the kwargs,
@@ -130,11 +250,14 @@ def call(f: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
     params: Dict[str, type] = f.__annotations__.copy()
     # return is not a parameter so we take it out
     params.pop("return", None)
+    # Parameters with a default value may be left out
+    optional = _optional_parameters(f)
+    required = len(params) - len(optional)
 
-    if len(args) + len(kwargs) != len(params):
+    if not required <= len(args) + len(kwargs) <= len(params):
         raise TypeError(
             "Incorrect number of arguments passed. "
-            f"Required number of arguments is {len(params)}, "
+            f"Required number of arguments is {required}, "
             f"but {len(args) + len(kwargs)} were passed"
         )
 
@@ -151,22 +274,120 @@ def call(f: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
         # it is consumed from args and correctly casted
         # according to the function signature
         if kwargs.get(pname, None) is None:
-            kwargs[pname] = ptype(args[0])
+            if pname in optional and not args:
+                continue
+            # Optional parameters may be annotated with typing constructs,
+            # which can not cast, so their arguments are passed as given
+            kwargs[pname] = ptype(args[0]) if isinstance(ptype, type) else args[0]
             args = args[1:]
 
     return f(**kwargs)
 
 
-def main(params: Mapping[str, Any]) -> None:
+def run_batch(
+    f: Callable[..., Any],
+    lines: Iterable[str],
+    out: TextIO,
+    *args: Any,
+    **kwargs: Any,
+) -> int:
+    """
+    Calls f once for each non empty line, consuming the whitespace
+    separated fields of the line as positional arguments after args
+    (see call), and writes each result to out in its own line.
+    Lines that fail are reported to stderr with their line number
+    and skipped. Returns the number of lines that failed.
+    """
+    errors = 0
+    for line_number, line in enumerate(lines, start=1):
+        fields = line.split()
+        if not fields:
+            continue
+        try:
+            res = call(f, *args, *fields, **kwargs)
+        except (
+            core.PatternNotValidException,
+            core.PlateNotValidException,
+            core.IndexOverflowException,
+            ValueError,
+            TypeError,
+        ) as e:
+            errors += 1
+            msg = getattr(e, "msg", None) or str(e)
+            print(f"line {line_number}: {msg}", file=sys.stderr)
+            continue
+        if res is not None:
+            out.write(f"{res}\n")
+    return errors
+
+
+def enumerate_plates(pattern: str, shard: Optional[str] = None) -> int:
+    """
+    Writes every plate of the pattern to stdout, one per line, or only
+    those of the shard given as "number/n_shards" (see ranges.partition).
+    """
+    from plates import ranges
+
+    number, n_shards = ranges.parse_shard(shard) if shard is not None else (1, 1)
+    out = sys.stdout.buffer
+    for chunk in ranges.iter_shard(pattern, number, n_shards, ENUMERATE_CHUNK_SIZE):
+        out.write(cast(bytes, chunk))
+    out.flush()
+    return 0
+
+
+def print_stats(
+    host: str, port: int, path: Optional[str] = None, format: str = "json"
+) -> int:
+    """
+    Prints the counters of the server listening on host and port, or on
+    the Unix socket at path: as JSON, with the server counters and those
+    of plates.profiling, or only the latter in the Prometheus text format.
+    """
+    import json
+    from plates import profiling, server
+
+    profile = server.request("profile", host=host, port=port, path=path)
+    if format == "prometheus":
+        sys.stdout.write(profiling.to_prometheus(profile))
+        return 0
+    stats = server.request("stats", host=host, port=port, path=path)
+    print(json.dumps({"server": stats, "profile": profile}, indent=2))
+    return 0
+
+
+def main(params: Mapping[str, Any]) -> int:
     if params["list_functions"]:
         print_function_usage(FUNCTION_NAMES)
-        return
+        return 0
     if not params["args"]:
-        print(USAGE)
-        return
+        print(program_info()["Program Usage"])
+        return 0
 
     func_name, *pos_args = params["args"]
 
+    if params.get("overflow") is not None:
+        core.set_overflow_policy(params["overflow"])
+
+    if func_name == "enumerate":
+        pattern = params.get("pattern") or (pos_args[0] if pos_args else None)
+        if pattern is None:
+            parser.error("enumerate requires a pattern")
+        return enumerate_plates(pattern, params.get("shard"))
+
+    if func_name in ("serve", "stats"):
+        from plates import server
+
+        host, port = params.get("host"), params.get("port")
+        host = server.DEFAULT_HOST if host is None else host
+        port = server.DEFAULT_PORT if port is None else port
+        if func_name == "stats":
+            return print_stats(
+                host, port, params.get("unix"), params.get("format") or "json"
+            )
+        server.serve(host, port, params.get("unix"))
+        return 0
+
     if func_name not in FUNCTION_NAMES:
         raise NotImplementedError(
             f"Function provided as argument {func_name}"
@@ -183,12 +404,20 @@ def main(params: Mapping[str, Any]) -> None:
         if value is not None:
             kwargs[key] = value
 
+    batch = params.get("batch")
+    if batch is not None:
+        if batch == "-":
+            return run_batch(func, sys.stdin, sys.stdout, *pos_args, **kwargs)
+        with open(batch) as f:
+            return run_batch(func, f, sys.stdout, *pos_args, **kwargs)
+
     res = call(func, *pos_args, **kwargs)
     # If func produces output, print it, else dont
     if res is not None:
         print(res)
+    return 0
 
 
 if __name__ == "__main__":
     args = vars(parser.parse_args())
-    main(args)
+    sys.exit(1 if main(args) else 0)
@@ -0,0 +1,271 @@
+"""
+On-disk sets of plates of a single pattern, keeping one bit per plate
+in a memory mapped file, so that sets of hundreds of millions of plates
+take a few megabytes and are opened without reading them.
+"""
+import mmap
+import os
+import struct
+from typing import Any, Iterable, Iterator, Optional, Union, NoReturn
+
+from plates import core
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+_MAGIC = b"PLATEBMP"
+_VERSION = 1
+# magic, version, length of the expanded pattern and number of combinations
+_HEADER = struct.Struct("<8sHHQ")
+# The bits start at a multiple of this offset after the header and pattern
+_DATA_ALIGN = 64
+
+# Number of bytes scanned at a time when searching or counting
+SCAN_CHUNK_SIZE: int = 1 << 20
+# Bytes skipped at once while looking for set bits without NumPy
+_BLOCK_SIZE = 4096
+
+_FULL_BYTE = b"\xff"
+_EMPTY_BYTE = b"\x00"
+
+
+def _has_numpy() -> bool:
+    return np is not None
+
+
+class PlateBitmap:
+    """
+    A set of plates of the pattern given, stored in the file at path,
+    where the plate with index i is present if the bit i - 1 is set.
+    The file is created, with every bit unset, if it does not exist.
+    If it exists and was created for another pattern, raises ValueError.
+    >>> seen = PlateBitmap("2C3D2C", "seen.bmp")
+    >>> seen.add("AA001CD")
+    >>> "AA001CD" in seen
+    True
+    >>> seen.next_free("AA001CC")
+    "AA001CE"
+    """
+
+    def __init__(
+        self,
+        pattern: Union[str, core.CompiledPattern],
+        path: str,
+        readonly: bool = False,
+    ) -> None:
+        self.compiled = core.compile(pattern) if isinstance(pattern, str) else pattern
+        self.path = path
+        self.size: int = self.compiled.combinations()
+        encoded = self.compiled.pattern.encode("ascii")
+        header_size = _HEADER.size + len(encoded)
+        self._data_at = -(-header_size // _DATA_ALIGN) * _DATA_ALIGN
+        self._nbytes = -(-self.size // 8)
+
+        if not os.path.exists(path):
+            self._create(encoded)
+        with open(path, "rb" if readonly else "r+b") as f:
+            access = mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=access)
+            except ValueError:
+                # Empty files can not be mapped
+                raise ValueError(f"{path} does not hold a plate bitmap")
+
+        try:
+            magic, version, length, size = _HEADER.unpack_from(self._mmap, 0)
+        except struct.error:
+            magic = version = None
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{path} does not hold a plate bitmap")
+        stored = self._mmap[_HEADER.size : _HEADER.size + length]
+        if stored != encoded or size != self.size:
+            self.close()
+            raise ValueError(
+                f"{path} holds a bitmap of pattern {stored.decode('ascii')}, "
+                f"not {self.compiled.pattern}"
+            )
+        if len(self._mmap) < self._data_at + self._nbytes:
+            self.close()
+            raise ValueError(f"{path} holds a truncated plate bitmap")
+
+    def _create(self, encoded: bytes) -> None:
+        # The bits are left as a hole in the file, which most filesystems
+        # keep sparse until they are written
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, len(encoded), self.size))
+            f.write(encoded)
+            f.truncate(self._data_at + self._nbytes)
+        os.replace(tmp_path, self.path)
+
+    def _bit(self, plate: str) -> int:
+        return self.compiled.get_plate_index(plate) - 1
+
+    def add(self, plate: str) -> None:
+        """
+        Adds the plate to the set.
+        If it does not match the pattern, raises ValueError.
+        """
+        bit = self._bit(plate)
+        at = self._data_at + (bit >> 3)
+        self._mmap[at] |= 1 << (bit & 7)
+
+    def discard(self, plate: str) -> None:
+        """
+        Removes the plate from the set, if present.
+        If it does not match the pattern, raises ValueError.
+        """
+        bit = self._bit(plate)
+        at = self._data_at + (bit >> 3)
+        self._mmap[at] &= ~(1 << (bit & 7)) & 0xFF
+
+    def __contains__(self, plate: object) -> bool:
+        if not isinstance(plate, str) or not self.compiled.matches_pattern(plate):
+            return False
+        bit = self.compiled._index(plate) - 1
+        return bool(self._mmap[self._data_at + (bit >> 3)] >> (bit & 7) & 1)
+
+    def contains(self, plate: str) -> bool:
+        return plate in self
+
+    def update(self, plates: Iterable[str]) -> None:
+        """
+        Adds every plate given to the set.
+        If any of them does not match the pattern, raises ValueError
+        and the plates before it are left added.
+        """
+        get_plate_index = self.compiled.get_plate_index
+        self.update_indices([get_plate_index(plate) for plate in plates])
+
+    def update_indices(self, indices: Any) -> Union[None, NoReturn]:
+        """
+        Adds the plates with the indices given to the set, for instance
+        as returned by plates.bulk.get_plate_indices. With NumPy
+        installed, every bit is set in a single vectorized operation.
+        If any index is out of range, raises ValueError and nothing is added.
+        """
+        if _has_numpy():
+            bits = np.asarray(indices, dtype=np.int64).ravel() - 1
+            if bits.size and (bits.min() < 0 or bits.max() >= self.size):
+                raise ValueError(f"indices must be between 1 and {self.size}")
+            data = np.frombuffer(
+                self._mmap, dtype=np.uint8, count=self._nbytes, offset=self._data_at
+            )
+            masks = np.left_shift(1, bits & 7).astype(np.uint8)
+            np.bitwise_or.at(data, bits >> 3, masks)
+            return None
+
+        bits_list = [index - 1 for index in indices]
+        if any(not 0 <= bit < self.size for bit in bits_list):
+            raise ValueError(f"indices must be between 1 and {self.size}")
+        mm, data_at = self._mmap, self._data_at
+        for bit in bits_list:
+            mm[data_at + (bit >> 3)] |= 1 << (bit & 7)
+        return None
+
+    def _chunks(self, start: int = 0) -> Iterator[Any]:
+        """
+        Yields the offset of the byte of data where each chunk
+        starts and the chunk, from the byte start onwards.
+        """
+        end = self._data_at + self._nbytes
+        at = self._data_at + start
+        while at < end:
+            stop = min(at + SCAN_CHUNK_SIZE, end)
+            yield at - self._data_at, self._mmap[at:stop]
+            at = stop
+
+    def count(self) -> int:
+        """
+        Returns the number of plates in the set.
+        """
+        if _has_numpy():
+            data = np.frombuffer(
+                self._mmap, dtype=np.uint8, count=self._nbytes, offset=self._data_at
+            )
+            total = 0
+            for start in range(0, self._nbytes, SCAN_CHUNK_SIZE):
+                chunk = data[start : start + SCAN_CHUNK_SIZE]
+                total += int(np.unpackbits(chunk).sum(dtype=np.int64))
+            return total
+        return sum(
+            bin(int.from_bytes(chunk, "little")).count("1")
+            for _, chunk in self._chunks()
+        )
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _indices(self) -> Iterator[int]:
+        for offset, chunk in self._chunks():
+            if _has_numpy():
+                bits = np.unpackbits(
+                    np.frombuffer(chunk, dtype=np.uint8), bitorder="little"
+                )
+                yield from (np.flatnonzero(bits) + offset * 8 + 1).tolist()
+                continue
+            # Runs of empty bytes are skipped a block at a time
+            for block in range(0, len(chunk), _BLOCK_SIZE):
+                piece = chunk[block : block + _BLOCK_SIZE]
+                if not piece.strip(_EMPTY_BYTE):
+                    continue
+                for i, byte in enumerate(piece, offset + block):
+                    while byte:
+                        low = byte & -byte
+                        yield i * 8 + low.bit_length()
+                        byte ^= low
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Yields the plates in the set, in index order.
+        """
+        get_plate = self.compiled._plate
+        for index in self._indices():
+            yield get_plate(index)
+
+    def next_free(self, plate: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the first plate after the one given (or the first
+        plate of the pattern, if not given) which is not in the set,
+        or None if every plate after it is in the set.
+        """
+        bit = 0 if plate is None else self._bit(plate) + 1
+        if bit >= self.size:
+            return None
+        at = bit >> 3
+        # Bits before the one searched within its byte count as set
+        byte = self._mmap[self._data_at + at] | ((1 << (bit & 7)) - 1)
+        if byte != 0xFF:
+            found = at * 8 + (~byte & (byte + 1)).bit_length() - 1
+        else:
+            found = -1
+            for offset, chunk in self._chunks(at + 1):
+                rest = chunk.lstrip(_FULL_BYTE)
+                if rest:
+                    byte = rest[0]
+                    skipped = len(chunk) - len(rest)
+                    found = (offset + skipped) * 8
+                    found += (~byte & (byte + 1)).bit_length() - 1
+                    break
+        if not 0 <= found < self.size:
+            return None
+        return self.compiled._plate(found + 1)
+
+    def flush(self) -> None:
+        self._mmap.flush()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "PlateBitmap":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.compiled.pattern!r}, {self.path!r})"
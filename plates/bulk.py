@@ -0,0 +1,402 @@
+"""
+Vectorized versions of the core functions, operating on whole NumPy
+arrays of indices or plates at once instead of one element at a time.
+NumPy is an optional dependency, install it with `pip install plates[numpy]`.
+"""
+import concurrent.futures
+import functools
+import os
+from typing import Any, List, Optional, Tuple, Union, NoReturn
+
+from plates import core
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+INT64_MAX: int = 2 ** 63 - 1
+
+# Number of plates generated from each seed stream by generate_random_plates
+RANDOM_BATCH_SIZE: int = 1 << 20
+
+_DIGIT_MIN, _DIGIT_MAX = ord("0"), ord("9")
+_ALPHA_MIN, _ALPHA_MAX = ord("A"), ord("Z")
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "plates.bulk requires NumPy, install it with `pip install plates[numpy]`"
+        )
+
+
+@functools.lru_cache(maxsize=core.COMPILE_CACHE_SIZE)
+def _symbol_tables(compiled: core.CompiledPattern) -> Tuple[Any, ...]:
+    """
+    Returns, for each position of the pattern, an array mapping
+    the value of a symbol to its ASCII code.
+    """
+    return tuple(
+        np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+        for alphabet in compiled.alphabets
+    )
+
+
+@functools.lru_cache(maxsize=core.COMPILE_CACHE_SIZE)
+def _value_tables(compiled: core.CompiledPattern) -> Any:
+    """
+    Returns a matrix with a row for each position of the pattern,
+    mapping each byte to the value of the symbol at that position,
+    or to -1 if the symbol is not in the alphabet of the position.
+    """
+    tables = np.full((len(compiled), 256), -1, dtype=np.int64)
+    for pos, alphabet in enumerate(compiled.alphabets):
+        codes = np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+        tables[pos, codes] = np.arange(len(alphabet))
+    return tables
+
+
+def _check_overflow(overflow: Any, policy: Optional[str], mask: bool) -> str:
+    """
+    Returns the overflow policy to follow, given the boolean array of
+    elements that overflow, warning once for the whole batch if needed.
+    """
+    policy = core.check_overflow_policy(policy)
+    if policy == "clamp" and not mask and overflow.any():
+        # Blames the code calling get_plates or advance_plates
+        core.overflow_warning(3)
+    return policy
+
+
+def get_plates(
+    pattern: str,
+    indices: Any,
+    overflow: Optional[str] = None,
+    mask: bool = False,
+) -> Union[Any, NoReturn]:
+    """
+    Vectorized get_plate. Takes a pattern and an array-like of
+    indices, and returns an array of dtype S{n} (n being the length
+    of the pattern) with the corresponding plates, with the same
+    shape as indices.
+    Indices greater than the number of combinations follow the overflow
+    policy given, or the global one if None, as in get_plate: "clamp"
+    issues a single warning for the whole array, "raise" raises
+    IndexOverflowException, and "none" leaves an empty plate (b"").
+    If mask is True, returns as well a boolean array telling which of
+    the indices were valid, and instead of raising for indices less
+    than 1 or warning for overflowing ones, leaves an empty plate for
+    the former and follows the policy silently for the latter (with
+    "raise" behaving as "none").
+    >>> get_plates("CCCDDD", [1, 2, 17576000])
+    array([b'AAA000', b'AAA001', b'ZZZ999'], dtype='|S6')
+    >>> get_plates("CD", [0, 1, 261], overflow="wrap", mask=True)
+    (array([b'', b'A0', b'A0'], dtype='|S2'), array([False,  True, False]))
+    """
+    _require_numpy()
+    compiled = core.compile(pattern)
+    total = compiled.combinations()
+    if total > INT64_MAX:
+        raise OverflowError(
+            f"Pattern {compiled.pattern} has more combinations than fit in an int64"
+        )
+
+    indices = np.asarray(indices, dtype=np.int64)
+    shape = indices.shape
+    rem = indices.ravel()
+    below = rem < 1
+    if not mask and below.any():
+        raise ValueError(
+            f"indices must be positive integers, received {int(rem.min())}"
+        )
+
+    above = rem > total
+    policy = _check_overflow(above, overflow, mask)
+    if policy == "raise" and not mask and above.any():
+        raise core.IndexOverflowException(compiled.pattern, int(rem[above][0]))
+    if policy == "wrap":
+        rem = np.where(above, (rem - 1) % total + 1, rem)
+    else:
+        rem = np.where(above, total, rem)
+    # Elements left without a plate
+    empty = below | above if policy in ("raise", "none") else below
+    rem = np.where(below, 1, rem)
+
+    rem = rem - 1
+    width = len(compiled)
+    chars = np.empty((rem.size, width), dtype=np.uint8)
+    for pos, (factor, table) in enumerate(
+        zip(compiled.factors, _symbol_tables(compiled))
+    ):
+        val, rem = np.divmod(rem, factor)
+        chars[:, pos] = table[val]
+    chars[empty] = 0
+
+    plates = chars.view(f"S{width}").reshape(shape)
+    if mask:
+        return plates, ~(below | above).reshape(shape)
+    return plates
+
+
+def _as_bytes_array(plates: Any, width: int = 0) -> Any:
+    arr = np.asarray(plates)
+    if arr.size == 0:
+        return np.empty(arr.shape, dtype=f"S{max(width, 1)}")
+    if arr.dtype.kind == "U":
+        try:
+            arr = arr.astype("S")
+        except UnicodeEncodeError:
+            # Reports the first plate that is not ASCII
+            flat = np.ascontiguousarray(arr).ravel()
+            codes = flat.view(np.uint32).reshape(flat.size, -1)
+            plate = flat[(codes > 127).any(axis=1).argmax()]
+            raise core.PlateNotValidException(str(plate)) from None
+    if arr.dtype.kind != "S":
+        raise TypeError(f"plates must be an array of strings, received {arr.dtype}")
+    if arr.dtype.itemsize < width:
+        arr = arr.astype(f"S{width}")
+    return np.ascontiguousarray(arr)
+
+
+def _digit_vectors(arr: Any) -> Union[Tuple[Any, Any, Any], NoReturn]:
+    """
+    Takes an array of fixed-width bytes plates, and returns three
+    matrices with a row per plate and a column per position: the value
+    of each symbol, the radix of each position (10 or 26) and whether
+    each position is a digit. Plates shorter than the width of the
+    array are padded with null bytes, which get value 0 and radix 1 so
+    that they do not change the index of the plate.
+    If any plate is not valid, raises PlateNotValidException.
+    """
+    arr = arr.ravel()
+    width = arr.dtype.itemsize
+    chars = arr.view(np.uint8).reshape(arr.size, width)
+    is_digit = (chars >= _DIGIT_MIN) & (chars <= _DIGIT_MAX)
+    is_alpha = (chars >= _ALPHA_MIN) & (chars <= _ALPHA_MAX)
+
+    # The null bytes of the padding must all be at the end of the plate
+    lengths = np.count_nonzero(chars, axis=1)
+    in_plate = np.arange(width) < lengths[:, None]
+    valid = ((is_digit | is_alpha) == in_plate).all(axis=1) & (lengths > 0)
+    if not valid.all():
+        raise core.PlateNotValidException(arr[~valid][0].decode("ascii", "replace"))
+
+    radices = np.where(is_digit, core.LEN_DIGITS, np.where(is_alpha, core.LEN_ALPHA, 1))
+    if arr.size and np.log2(radices).sum(axis=1).max() >= 63:
+        raise OverflowError("Plates have more combinations than fit in an int64")
+
+    values = np.where(is_digit, chars - _DIGIT_MIN, chars - _ALPHA_MIN)
+    values = np.where(in_plate, values, 0).astype(np.int64)
+    return values, radices, is_digit
+
+
+def _indices_from_vectors(values: Any, radices: Any) -> Any:
+    # Cumulative product of the radices from right to left, shifted
+    # one position so that the last factor is 1
+    factors = np.ones(values.shape, dtype=np.int64)
+    factors[:, :-1] = np.cumprod(radices[:, :0:-1], axis=1)[:, ::-1]
+    return (values * factors).sum(axis=1) + 1
+
+
+def _pattern_indices(
+    compiled: core.CompiledPattern, plates: Any
+) -> Union[Any, NoReturn]:
+    if compiled.combinations() > INT64_MAX:
+        raise OverflowError(
+            f"Pattern {compiled.pattern} has more combinations than fit in an int64"
+        )
+    width = len(compiled)
+    arr = _as_bytes_array(plates, width)
+    chars = arr.ravel().view(np.uint8).reshape(arr.size, arr.dtype.itemsize)
+    # Plates shorter than the array are padded with null bytes, which
+    # are in no alphabet, and longer plates have extra columns
+    values = _value_tables(compiled)[np.arange(width), chars[:, :width]]
+    valid = (values >= 0).all(axis=1) & (chars[:, width:] == 0).all(axis=1)
+    if not valid.all():
+        plate = arr.ravel()[~valid][0].decode("ascii", "replace")
+        if not core.valid_plate(plate):
+            raise core.PlateNotValidException(plate)
+        raise ValueError(f"Plate {plate} does not match pattern {compiled.pattern}")
+    factors = np.array(compiled.factors, dtype=np.int64)
+    return (values @ factors + 1).reshape(arr.shape)
+
+
+def get_plate_indices(
+    plates: Any, pattern: Union[str, core.CompiledPattern, None] = None
+) -> Union[Any, NoReturn]:
+    """
+    Vectorized get_plate_index. Takes an array-like of plates, either
+    as str or as fixed-width bytes, and returns an int64 array with
+    the index of each of them, with the same shape as plates.
+    As with get_plate_index, the pattern of each plate is taken from
+    the plate itself, so plates of different patterns can be mixed.
+    If any plate is not valid, raises PlateNotValidException.
+    If a pattern is given instead, either as str or compiled, symbols
+    take their values from its alphabets, and if a valid plate does not
+    match it, raises ValueError.
+    >>> get_plate_indices([b"AAA000", b"AA001CD"])
+    array([  1, 732])
+    >>> get_plate_indices(["AA000AB"], "CCDDDCC@NO_IOQU")
+    array([2])
+    """
+    _require_numpy()
+    if pattern is not None:
+        compiled = core.compile(pattern) if isinstance(pattern, str) else pattern
+        return _pattern_indices(compiled, plates)
+    arr = _as_bytes_array(plates)
+    values, radices, _ = _digit_vectors(arr)
+    return _indices_from_vectors(values, radices).reshape(arr.shape)
+
+
+def plate_distances(a: Any, b: Any) -> Union[Any, NoReturn]:
+    """
+    Vectorized plate_distance. Takes two array-likes of plates with
+    the same shape, and returns an int64 array with how many plates
+    after each plate of a comes the corresponding plate of b.
+    If any pair of plates does not have the same pattern, raises ValueError.
+    >>> plate_distances(["AA000AA", "AAA010"], ["AA001CD", "AAA000"])
+    array([731, -10])
+    """
+    _require_numpy()
+    arr_a, arr_b = _as_bytes_array(a), _as_bytes_array(b)
+    if arr_a.shape != arr_b.shape:
+        raise ValueError(f"Shapes {arr_a.shape} and {arr_b.shape} do not match")
+    width = max(arr_a.dtype.itemsize, arr_b.dtype.itemsize)
+    values_a, radices_a, _ = _digit_vectors(_as_bytes_array(arr_a, width))
+    values_b, radices_b, _ = _digit_vectors(_as_bytes_array(arr_b, width))
+
+    same_pattern = (radices_a == radices_b).all(axis=1)
+    if not same_pattern.all():
+        i = int(np.argmin(same_pattern))
+        raise ValueError(
+            f"Plates {arr_a.ravel()[i].decode()} and {arr_b.ravel()[i].decode()} "
+            "do not have the same pattern"
+        )
+    distances = _indices_from_vectors(values_b, radices_b) - _indices_from_vectors(
+        values_a, radices_a
+    )
+    return distances.reshape(arr_a.shape)
+
+
+def advance_plates(
+    plates: Any, n: Any, overflow: Optional[str] = None, mask: bool = False
+) -> Union[Any, NoReturn]:
+    """
+    Vectorized advance_plate. Takes an array-like of plates and an
+    offset (or an array-like of offsets, with the same shape as plates),
+    and returns a fixed-width bytes array with the plate that comes n
+    plates after each of them. The offsets are added to the digit vectors
+    of the plates, propagating the carry one column at a time.
+    Results past the last plate of their pattern follow the overflow
+    policy, as in get_plates. If any goes before the first plate, raises
+    ValueError, unless the policy is "wrap".
+    If mask is True, returns as well a boolean array telling which of
+    the results stayed within their pattern, and instead of raising or
+    warning, leaves an empty plate (b"") for those going before the first
+    plate, and follows the policy silently for those going past the last.
+    >>> advance_plates(["AA999ZZ", "AAA010"], [1, -1])
+    array([b'AB000AA', b'AAA009'], dtype='|S7')
+    """
+    _require_numpy()
+    arr = _as_bytes_array(plates)
+    values, radices, is_digit = _digit_vectors(arr)
+    offsets = np.broadcast_to(np.asarray(n, dtype=np.int64), arr.shape).ravel()
+    carry = offsets.copy()
+
+    # Padding columns have radix 1, so the carry goes through them untouched
+    for col in range(values.shape[1] - 1, -1, -1):
+        carry, values[:, col] = np.divmod(values[:, col] + carry, radices[:, col])
+
+    below, above = carry < 0, carry > 0
+    policy = _check_overflow(above, overflow, mask)
+    if policy == "wrap":
+        # The digit vectors already hold the wrapped plates
+        empty = np.zeros_like(below)
+    else:
+        if not mask and below.any():
+            raise ValueError("Offsets go before the first plate of the pattern")
+        if policy == "raise" and not mask and above.any():
+            i = int(above.argmax())
+            plate = arr.ravel()[i].decode("ascii")
+            raise core.IndexOverflowException(
+                core.get_pattern(plate), core.get_plate_index(plate) + int(offsets[i])
+            )
+        if policy == "clamp":
+            values[above] = radices[above] - 1
+            empty = below
+        else:
+            empty = below | above
+
+    chars = np.where(is_digit, values + _DIGIT_MIN, values + _ALPHA_MIN)
+    chars = np.where(radices > 1, chars, 0).astype(np.uint8)
+    chars[empty] = 0
+    result = chars.view(arr.dtype).reshape(arr.shape)
+    if mask:
+        return result, ~(below | above).reshape(arr.shape)
+    return result
+
+
+def _random_batch(pattern: str, size: int, entropy: Any, batch: int) -> Any:
+    """
+    Generates the batch number batch of generate_random_plates, drawing
+    from its own seed stream so that it does not depend on which
+    process generates it.
+    """
+    seed = np.random.SeedSequence(entropy, spawn_key=(batch,))
+    rng = np.random.default_rng(seed)
+    total = core.compile(pattern).combinations()
+    return get_plates(pattern, rng.integers(1, total, size, endpoint=True))
+
+
+def generate_random_plates(
+    pattern: str, n: int, *, seed: Optional[int] = None, workers: Optional[int] = None
+) -> Union[Any, NoReturn]:
+    """
+    Vectorized generate_random_plate. Returns an array of dtype S{n}
+    with n plates drawn uniformly from the pattern.
+    Plates are generated in batches of RANDOM_BATCH_SIZE, each from an
+    independent seed stream derived from seed, and the batches are
+    split among workers processes (by default, one per CPU). For the
+    same seed, the result is the same whatever the number of workers.
+    >>> generate_random_plates("CCCDDD", 3, seed=0)
+    array([b'UWI133', b'YNL070', b'ADS369'], dtype='|S6')
+    """
+    _require_numpy()
+    if n < 0:
+        raise ValueError(f"n must be a non negative integer, received {n}")
+    compiled = core.compile(pattern)
+    if compiled.combinations() > INT64_MAX:
+        raise OverflowError(
+            f"Pattern {compiled.pattern} has more combinations than fit in an int64"
+        )
+
+    entropy = np.random.SeedSequence(seed).entropy
+    sizes: List[int] = [
+        min(RANDOM_BATCH_SIZE, n - start) for start in range(0, n, RANDOM_BATCH_SIZE)
+    ]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(sizes))
+
+    if workers <= 1:
+        batches = [
+            _random_batch(compiled.pattern, size, entropy, batch)
+            for batch, size in enumerate(sizes)
+        ]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            batches = list(
+                pool.map(
+                    _random_batch,
+                    [compiled.pattern] * len(sizes),
+                    sizes,
+                    [entropy] * len(sizes),
+                    range(len(sizes)),
+                )
+            )
+
+    if not batches:
+        return np.empty(0, dtype=f"S{len(compiled)}")
+    return np.concatenate(batches)
@@ -0,0 +1,102 @@
+"""
+Functions to find which of the standard patterns a plate could belong to.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, NoReturn
+
+from plates import core, registry
+
+
+# Codes of the standard patterns of a shape, if none of them names an
+# alphabet, and each code with its CompiledPattern otherwise
+_ShapeEntry = Tuple[
+    Optional[Tuple[str, ...]], Tuple[Tuple[str, core.CompiledPattern], ...]
+]
+
+
+def _ordered_codes() -> List[str]:
+    # Codes as they appear in ISO_3166, then the rest of STD_PATTERNS
+    ordered = dict.fromkeys(
+        iso_code
+        for _, iso_code in core.iso_locations()
+        if iso_code in core.STD_PATTERNS
+    )
+    ordered.update(dict.fromkeys(core.STD_PATTERNS))
+    return list(ordered)
+
+
+@registry.cached_by_version(core.ISO_3166, core.STD_PATTERNS)
+def pattern_index() -> Dict[str, Tuple[str, ...]]:
+    """
+    Returns a dictionary mapping each expanded pattern in STD_PATTERNS
+    to the ISO 3166 codes that use it. Codes are ordered as they appear
+    in ISO_3166, followed by any code of STD_PATTERNS missing from it.
+    The index is built on the first call and reused until STD_PATTERNS
+    or ISO_3166 are modified.
+    >>> pattern_index()["CCDDDCC"]
+    ("AR-2", "HR")
+    """
+    index: Dict[str, List[str]] = {}
+    for iso_code in _ordered_codes():
+        pattern = core.compile_std(iso_code).pattern
+        index.setdefault(pattern, []).append(iso_code)
+    return {pattern: tuple(codes) for pattern, codes in index.items()}
+
+
+@registry.cached_by_version(core.ISO_3166, core.STD_PATTERNS, core.STD_ALPHABETS)
+def shape_index() -> Dict[str, _ShapeEntry]:
+    """
+    Returns a dictionary mapping the shape of each pattern in STD_PATTERNS
+    (the pattern without its alphabet) to the codes using it, in the same
+    order as pattern_index, and cached in the same way until STD_ALPHABETS
+    is modified as well.
+    """
+    members: Dict[str, List[Tuple[str, core.CompiledPattern]]] = {}
+    for iso_code in _ordered_codes():
+        compiled = core.compile_std(iso_code)
+        members.setdefault(compiled.shape, []).append((iso_code, compiled))
+
+    index: Dict[str, _ShapeEntry] = {}
+    for shape, entries in members.items():
+        plain = all(c.type_alphabets is core.ALPHABETS for _, c in entries)
+        codes = tuple(code for code, _ in entries) if plain else None
+        index[shape] = (codes, tuple(entries))
+    return index
+
+
+def _classify(plate: str, shape: str, index: Dict[str, _ShapeEntry]) -> Tuple[str, ...]:
+    entry = index.get(shape)
+    if entry is None:
+        return ()
+    codes, members = entry
+    if codes is not None:
+        return codes
+    # Symbols outside the alphabets of a pattern do not translate to the shape
+    return tuple(
+        code
+        for code, compiled in members
+        if plate.translate(compiled._shape_table) == shape
+    )
+
+
+def classify_plate(plate: str) -> Union[Tuple[str, ...], NoReturn]:
+    """
+    Returns the ISO 3166 codes of every standard pattern that
+    the plate matches, or an empty tuple if it matches none.
+    If the plate is not valid, raises PlateNotValidException
+    >>> classify_plate("AD077YI")
+    ("AR-2", "HR")
+    >>> classify_plate("AD077YB")
+    ("AR-2", "HR", "IT")
+    """
+    return _classify(plate, core.get_pattern(plate), shape_index())
+
+
+def classify_plates(plates: Iterable[str]) -> Iterator[Tuple[str, ...]]:
+    """
+    Lazily classifies each of the plates given, yielding
+    the same as classify_plate would for each of them.
+    """
+    index = shape_index()
+    get_pattern = core.get_pattern
+    for plate in plates:
+        yield _classify(plate, get_pattern(plate), index)
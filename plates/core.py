@@ -1,35 +1,139 @@
 import functools
-import re
 import random
 import itertools
-from typing import List, NoReturn, Optional, Union, Match
+import string
+from typing import Dict, List, NamedTuple, NoReturn, Optional, Tuple, Union
 import operator
-import json
-import pathlib
-from rich.console import Console
-from rich.table import Table
+import warnings
 
+from plates import registry
 
-LEN_ALPHA: int = ord("Z") - ord("A") + 1  # Length of the english alphabet
-LEN_DIGITS: int = 10
 
-PATH = pathlib.Path(__file__)
-with open(PATH.parent / "data.json") as f:
-    data = json.load(f)
-    STD_PATTERNS = data["License Plates"]["Standard Plate Patterns"]
-    ISO_3166 = data["License Plates"]["ISO 3166"]
+# Maximum number of compiled patterns kept by the compile cache
+COMPILE_CACHE_SIZE: int = 256
 
+# Patterns up to this length are encoded and decoded a symbol at a time,
+# longer ones a run at a time, which is faster the longer the runs are
+SYMBOLWISE_MAX_LENGTH: int = 12
+# Maximum number of entries of the table each alphabet of letters is
+# decoded with, which holds every string of a few of its symbols
+CHUNK_TABLE_SIZE: int = 1024
 
-class PatternNotValidException(Exception):
+# What to do with an index greater than the number of combinations:
+# - "raise": raise IndexOverflowException
+# - "clamp": warn with PlateOverflowWarning and use the last plate
+# - "wrap": use the index modulo the number of combinations
+# - "none": return None
+OVERFLOW_POLICIES: Tuple[str, ...] = ("raise", "clamp", "wrap", "none")
+_overflow_policy: str = "clamp"
+
+# Symbols available for each type of position of a pattern, ordered
+# by value, and the inverse mapping from a symbol to its value
+_DIGITS = string.digits
+ALPHABETS = {"C": string.ascii_uppercase, "D": _DIGITS}
+LEN_ALPHA: int = len(ALPHABETS["C"])  # Length of the english alphabet
+LEN_DIGITS: int = len(ALPHABETS["D"])
+
+
+def _symbol_values(alphabets: Dict[str, str]) -> Dict[str, int]:
+    return {
+        symb: val
+        for alphabet in alphabets.values()
+        for val, symb in enumerate(alphabet)
+    }
+
+
+def _shape_table(alphabets: Dict[str, str]) -> Dict[int, str]:
+    return str.maketrans(
+        {symb: kind for kind, alphabet in alphabets.items() for symb in alphabet}
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _chunk_table(alphabet: str) -> Tuple[str, ...]:
+    # Every string of as many symbols of the alphabet as fit in
+    # CHUNK_TABLE_SIZE entries, in the order of their values
+    size = 1
+    while len(alphabet) ** (size + 1) <= CHUNK_TABLE_SIZE:
+        size += 1
+    return tuple("".join(p) for p in itertools.product(alphabet, repeat=size))
+
+
+_SYMBOL_VALUES = _symbol_values(ALPHABETS)
+# Translation tables from the symbols of a plate to its pattern,
+# and from the symbols of an expanded pattern to their type
+_PLATE_SHAPE = _shape_table(ALPHABETS)
+_SYMBOL_TYPES = bytes.maketrans(b"CD", b"\x00\x01")
+# Digits used by int to parse numbers in bases up to 36
+_INT_DIGITS = string.digits + string.ascii_lowercase
+
+# Patterns may end with ALPHABET_SEPARATOR and the name of an alphabet
+# of STD_ALPHABETS, replacing the symbols of some types of position,
+# as in "2C3D2C@NO_IOQU"
+ALPHABET_SEPARATOR = "@"
+
+
+class _Alphabets(registry.LazySection):
     """
-    Raised if a pattern is not valid.
-    Valid pattern formats contain only C, D or integer characters.
-    - "CCCDDC", "3D2C" are valid formats
-    - "cccddc", "3d2C" are not valid formats
+    The "Alphabets" section of data.json. Modifying it drops the
+    compiled patterns, which hold the symbols of their alphabets.
     """
 
-    def __init__(self, pattern: str) -> None:
+    def __init__(self) -> None:
+        super().__init__(registry.ALPHABETS_SECTION)
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        compile.cache_clear()
+        _compile_precompiled.cache_clear()
+
+
+# They are loaded the first time they are accessed, STD_PATTERNS from
+# the precompiled registry if available and from data.json otherwise
+STD_ALPHABETS = _Alphabets()
+STD_PATTERNS = registry.StandardPatterns(STD_ALPHABETS)
+ISO_3166 = registry.LazySection("ISO 3166")
+
+
+class _RunInfo(NamedTuple):
+    """
+    What CompiledPattern needs to know about each run of a pattern.
+    """
+
+    alphabet: str
+    radix: int
+    length: int
+    # Number of combinations of the run
+    size: int
+    # Factor by which the value of the run is multiplied
+    factor: int
+
+
+class PatternNotValidException(Exception):
+    """
+    Raised if a pattern is not valid.
+    Valid pattern formats contain only C, D or integer characters,
+    where each integer is a repeat count for the C or D following it,
+    optionally followed by ALPHABET_SEPARATOR and the name of an
+    alphabet of STD_ALPHABETS.
+    When known, position is the index of the character of the
+    pattern where the error was found.
+    - "CCCDDC", "3D2C", "12D", "2C3D2C@NO_IOQU" are valid formats
+    - "cccddc", "3d2C", "2C3", "3C@" are not valid formats
+    """
+
+    def __init__(
+        self,
+        pattern: str,
+        position: Optional[int] = None,
+        reason: str = "",
+    ) -> None:
+        self.pattern = pattern
+        self.position = position
         self.msg = f"Pattern {pattern} is not a valid pattern"
+        if position is not None:
+            self.msg += f": {reason} at position {position}"
+        super().__init__(self.msg)
 
 
 class PlateNotValidException(Exception):
@@ -42,18 +146,432 @@ class PlateNotValidException(Exception):
 
     def __init__(self, plate: str) -> None:
         self.msg = f"Plate {plate} is not a valid license plate"
+        super().__init__(self.msg)
+
+
+class IndexOverflowException(Exception):
+    """
+    Raised, under the "raise" overflow policy, if an index
+    is greater than the number of combinations of its pattern.
+    """
+
+    def __init__(self, pattern: str, index: int) -> None:
+        self.pattern = pattern
+        self.index = index
+        self.msg = (
+            f"Index {index} exceeds the number of combinations of pattern {pattern}"
+        )
+        super().__init__(self.msg)
+
+
+class PlateOverflowWarning(UserWarning):
+    """
+    Warning issued, under the "clamp" overflow policy, when an index
+    greater than the number of combinations of its pattern is replaced
+    by the last plate. It goes through the warnings module, so it can be
+    silenced, turned into an error or sent to logging (with
+    logging.captureWarnings) using the usual warning filters.
+    """
 
 
 def value(symb: str) -> int:
-    if symb.isdecimal():
-        return int(symb)
-    return ord(symb) - ord("A")
+    return _SYMBOL_VALUES[symb]
 
 
 def symbol_by_value(val: int, symbol_type: str) -> str:
-    if symbol_type == "D":
-        return str(val)
-    return chr(ord("A") + val)
+    return ALPHABETS[symbol_type][val]
+
+
+_OVERFLOW_MESSAGE = (
+    "The input index exceeded the number of combinations possible "
+    "with the pattern given"
+)
+
+
+def overflow_warning(stacklevel: int = 2) -> None:
+    """
+    Issues the PlateOverflowWarning shown when an index exceeds
+    the number of combinations of a pattern. By default, the
+    warning is shown once for each place it comes from.
+    stacklevel is counted as in warnings.warn, as if the caller issued
+    the warning, so the default of 2 blames the caller of the caller.
+    Public functions reaching it through helpers pass the number of
+    frames that lead to the code calling them.
+    """
+    warnings.warn(_OVERFLOW_MESSAGE, PlateOverflowWarning, stacklevel=stacklevel + 1)
+
+
+def set_overflow_policy(policy: str) -> None:
+    """
+    Sets the overflow policy (one of OVERFLOW_POLICIES) used by the
+    functions taking an overflow argument when it is not given.
+    """
+    global _overflow_policy
+    _overflow_policy = check_overflow_policy(policy)
+
+
+def get_overflow_policy() -> str:
+    return _overflow_policy
+
+
+def check_overflow_policy(policy: Optional[str]) -> Union[str, NoReturn]:
+    """
+    Returns the policy given, or the global overflow policy if it is
+    None. If the policy is not one of OVERFLOW_POLICIES, raises ValueError.
+    """
+    if policy is None:
+        return _overflow_policy
+    if policy not in OVERFLOW_POLICIES:
+        raise ValueError(
+            f"overflow policy must be one of {', '.join(OVERFLOW_POLICIES)}, "
+            f"received {policy}"
+        )
+    return policy
+
+
+class CompiledPattern:
+    """
+    A license plate pattern that has been validated and expanded once.
+    Everything that only depends on the pattern (the expanded form,
+    the type of each symbol, the positional factors, the number of
+    combinations and the first and last plates) is computed when the
+    object is created, so the operations exposed as methods only do
+    the work that depends on their arguments.
+    Patterns naming an alphabet (see resolve_alphabet) only allow its
+    symbols, and the values of the symbols, the lookup tables used to
+    encode and decode plates, follow it. The pattern without the alphabet
+    is kept as shape, and the symbols of each type of position as
+    type_alphabets (ALPHABETS itself if the pattern names no alphabet).
+    Instances are usually obtained through compile, which caches them.
+    >>> p = CompiledPattern("2C3D2C")
+    >>> p.pattern
+    "CCDDDCC"
+    >>> p.get_plate(1)
+    "AA000AA"
+    """
+
+    __slots__ = (
+        "source",
+        "pattern",
+        "shape",
+        "symbol_types",
+        "runs",
+        "type_alphabets",
+        "alphabets",
+        "radices",
+        "_runs_info",
+        "_int_digits",
+        "_symbol_values",
+        "_shape_table",
+        "_factors",
+        "_combinations",
+        "_min_plate",
+        "_max_plate",
+    )
+
+    source: str
+    pattern: str
+    shape: str
+    symbol_types: bytes
+    runs: Tuple[Tuple[str, int], ...]
+    type_alphabets: Dict[str, str]
+    alphabets: Tuple[str, ...]
+    radices: Tuple[int, ...]
+
+    def __init__(
+        self, pattern: str, type_alphabets: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.source = pattern
+        self.pattern, self.symbol_types, self.runs = parse_pattern(pattern)
+        self._set_symbols(type_alphabets)
+        self._factors: Optional[Tuple[int, ...]] = None
+
+    def _set_symbols(self, type_alphabets: Optional[Dict[str, str]]) -> None:
+        # The pattern without its alphabet, if any, and the symbols
+        # allowed for each type of position
+        self.shape, _, name = self.pattern.partition(ALPHABET_SEPARATOR)
+        if type_alphabets is None and name:
+            try:
+                type_alphabets = resolve_alphabet(name)
+            except ValueError as e:
+                position = self.source.find(ALPHABET_SEPARATOR)
+                raise PatternNotValidException(self.source, position, str(e))
+        elif type_alphabets is None:
+            type_alphabets = ALPHABETS
+        self.type_alphabets = type_alphabets
+
+        # Lookup tables from a symbol to its value, and from the symbols of
+        # a plate to the type of their position, shared by every pattern
+        # using the default alphabets
+        if type_alphabets is ALPHABETS:
+            self._symbol_values = _SYMBOL_VALUES
+            self._shape_table = _PLATE_SHAPE
+        else:
+            self._symbol_values = _symbol_values(type_alphabets)
+            self._shape_table = _shape_table(type_alphabets)
+
+        # Symbols allowed at each position, and how many of them there are
+        self.alphabets = tuple(type_alphabets[s] for s in self.shape)
+        self.radices = tuple(len(a) for a in self.alphabets)
+
+        # Runs are visited from right to left, as the factor of each
+        # of them is the number of combinations of the runs to its right
+        runs_info: List[_RunInfo] = []
+        factor = 1
+        for symb, length in reversed(self.runs):
+            alphabet = type_alphabets[symb]
+            radix = len(alphabet)
+            size = radix ** length
+            runs_info.append(_RunInfo(alphabet, radix, length, size, factor))
+            factor *= size
+        self._runs_info: Tuple[_RunInfo, ...] = tuple(reversed(runs_info))
+
+        # Translation table from the symbols of the pattern to the digits
+        # that int uses to parse a number in the base of their alphabet
+        self._int_digits: Dict[int, int] = {}
+        for symb in set(self.shape):
+            alphabet = type_alphabets[symb]
+            self._int_digits.update(
+                str.maketrans(alphabet, _INT_DIGITS[: len(alphabet)])
+            )
+        self._combinations: int = factor
+
+        self._min_plate: str = "".join(type_alphabets[s][0] * n for s, n in self.runs)
+        self._max_plate: str = "".join(type_alphabets[s][-1] * n for s, n in self.runs)
+
+    @property
+    def factors(self) -> Tuple[int, ...]:
+        """
+        Factor by which the value of each symbol is multiplied,
+        computed on first access.
+        """
+        if self._factors is None:
+            # Cumulative product of the radices, from right to left, with
+            # the first element taken out and a 1 appended at the end
+            pos_factors: List[int] = list(
+                itertools.accumulate(self.radices[:0:-1], operator.mul)
+            )
+            self._factors = tuple(pos_factors[::-1]) + (1,) if self.shape else ()
+        return self._factors
+
+    @classmethod
+    def from_precomputed(
+        cls,
+        source: str,
+        pattern: str,
+        factors: Tuple[int, ...],
+        combinations: int,
+        type_alphabets: Optional[Dict[str, str]] = None,
+    ) -> "CompiledPattern":
+        """
+        Builds a CompiledPattern from an expanded pattern, its positional
+        factors, its number of combinations and the alphabets of its types
+        of position computed beforehand (see plates.registry). The pattern
+        is trusted, so it is not parsed nor validated, and its runs are
+        read from it directly; the lookup tables of its alphabets are
+        still built as when compiling it.
+        """
+        shape = pattern.partition(ALPHABET_SEPARATOR)[0]
+        compiled = cls.__new__(cls)
+        compiled.source = source
+        compiled.pattern = pattern
+        compiled.symbol_types = shape.encode("ascii").translate(_SYMBOL_TYPES)
+        compiled.runs = tuple(
+            (symb, len(list(group))) for symb, group in itertools.groupby(shape)
+        )
+        compiled._set_symbols(type_alphabets)
+        compiled._factors = tuple(factors)
+        compiled._combinations = combinations
+        return compiled
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.pattern!r})"
+
+    def __len__(self) -> int:
+        return len(self.shape)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompiledPattern):
+            return NotImplemented
+        return (
+            self.pattern == other.pattern
+            and self.type_alphabets == other.type_alphabets
+        )
+
+    def __hash__(self) -> int:
+        return hash(self.pattern)
+
+    def combinations(self) -> int:
+        """
+        Returns the number of possible combinations
+        that match the pattern.
+        """
+        return self._combinations
+
+    def max_plate(self) -> str:
+        """
+        Returns the last plate corresponding to the pattern.
+        """
+        return self._max_plate
+
+    def min_plate(self) -> str:
+        """
+        Returns the first plate corresponding to the pattern.
+        """
+        return self._min_plate
+
+    def factor_by_position(self) -> List[int]:
+        """
+        Returns a list with the factor by which the value of
+        each symbol is multiplied. See factor_by_position.
+        """
+        return list(self.factors)
+
+    def matches_pattern(self, plate: str) -> Union[bool, NoReturn]:
+        """
+        Checks if the plate matches with the pattern.
+        If the plate is not valid, raises PlateNotValidException.
+        """
+        if not valid_plate(plate):
+            raise PlateNotValidException(plate)
+
+        # Symbols outside the alphabets of the pattern are left as they are
+        return plate.translate(self._shape_table) == self.shape
+
+    def get_plate(
+        self, index: int, overflow: Optional[str] = None
+    ) -> Union[Optional[str], NoReturn]:
+        """
+        Returns the nth plate of the pattern.
+        If n is greater than the number of combinations of the pattern,
+        follows the overflow policy given, or the global one if None
+        (by default, warns and returns the last plate).
+        """
+        return self._get_plate(index, overflow, stacklevel=2)
+
+    def _get_plate(
+        self, index: int, overflow: Optional[str], stacklevel: int
+    ) -> Union[Optional[str], NoReturn]:
+        # The warning is issued stacklevel frames above the caller
+        if index < 1:
+            raise ValueError(f"index must be a positive integer, received {index}")
+
+        if index > self._combinations:
+            policy = check_overflow_policy(overflow)
+            if policy == "clamp":
+                overflow_warning(stacklevel + 1)
+                return self._max_plate
+            if policy == "wrap":
+                index = (index - 1) % self._combinations + 1
+            elif policy == "raise":
+                raise IndexOverflowException(self.pattern, index)
+            else:
+                return None
+        return self._plate(index)
+
+    def _plate(self, index: int) -> str:
+        # Assumes the index is between 1 and the number of combinations
+        index -= 1
+        symbols: List[str] = []
+        if len(self.shape) <= SYMBOLWISE_MAX_LENGTH:
+            for factor, alphabet in zip(self.factors, self.alphabets):
+                val, index = divmod(index, factor)
+                symbols.append(alphabet[val])
+            return "".join(symbols)
+
+        # Whole runs are peeled off the index at once, and then each of
+        # them is written in the base of its alphabet, digits by str and
+        # letters a chunk of symbols at a time, from the right
+        for alphabet, _, length, _, factor in self._runs_info:
+            val, index = divmod(index, factor)
+            if alphabet is _DIGITS:
+                symbols.append(str(val).zfill(length))
+                continue
+            table = _chunk_table(alphabet)
+            chunk = len(table[0])
+            full, rest = divmod(length, chunk)
+            chunks: List[str] = []
+            for _ in range(full):
+                val, digit = divmod(val, len(table))
+                chunks.append(table[digit])
+            if rest:
+                # Less than a chunk left, so val is below radix ** rest
+                chunks.append(table[val][chunk - rest :])
+            symbols.append("".join(reversed(chunks)))
+        return "".join(symbols)
+
+    def get_plate_index(self, plate: str) -> Union[int, NoReturn]:
+        """
+        Returns the order number of the plate within the pattern.
+        If the plate does not match the pattern, raises ValueError.
+        """
+        if not self.matches_pattern(plate):
+            raise ValueError(f"Plate {plate} does not match pattern {self.pattern}")
+        return self._index(plate)
+
+    def _index(self, plate: str) -> int:
+        # Assumes the plate matches the pattern
+        if len(plate) <= SYMBOLWISE_MAX_LENGTH:
+            n = 1
+            values = self._symbol_values
+            for symbol, factor in zip(plate, self.factors):
+                n += values[symbol] * factor
+            return n
+
+        # Each run is read as an
+        # integer in the base of its alphabet, once its symbols have been
+        # translated to the digits int expects for that base
+        digits = plate.translate(self._int_digits)
+        n, pos = 0, 0
+        for _, radix, length, size, _ in self._runs_info:
+            n = n * size + int(digits[pos : pos + length], radix)
+            pos += length
+        return n + 1
+
+    def generate_random_plate(self) -> str:
+        """
+        Generates a random plate matching the pattern.
+        """
+        return "".join(random.choice(alphabet) for alphabet in self.alphabets)
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile(pattern: str) -> Union[CompiledPattern, NoReturn]:
+    """
+    Returns the CompiledPattern for the pattern given, which may be
+    in its short form. Results are kept in a LRU cache bounded by
+    COMPILE_CACHE_SIZE, so compiling the same pattern again is free.
+    Modifying STD_ALPHABETS clears it.
+    If the pattern is not valid, raises PatternNotValidException
+    >>> compile("3C3D").combinations()
+    17576000
+    """
+    return CompiledPattern(pattern)
+
+
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_precompiled(iso_code: str) -> CompiledPattern:
+    precompiled = STD_PATTERNS.precompiled()
+    assert precompiled is not None
+    return precompiled.compiled(iso_code)
+
+
+# The compiled patterns are dropped with the registry they come from
+registry._clear_hooks.append(_compile_precompiled.cache_clear)
+
+
+def compile_std(iso_code: str) -> Union[CompiledPattern, NoReturn]:
+    """
+    Returns the CompiledPattern of the standard pattern with the
+    ISO 3166 code given, taken from the precompiled registry when
+    it is available and STD_PATTERNS has not been modified.
+    If the code is not in STD_PATTERNS, raises KeyError
+    >>> compile_std("AR-2").pattern
+    "CCDDDCC"
+    """
+    if STD_PATTERNS.precompiled() is None:
+        return compile(STD_PATTERNS[iso_code])
+    return _compile_precompiled(iso_code)
 
 
 def max_plate(pattern: str) -> Union[str, NoReturn]:
@@ -63,10 +581,7 @@ def max_plate(pattern: str) -> Union[str, NoReturn]:
     Equivalent to replacing all characters in the pattern
     by Z and digits by 9.
     """
-    pattern = expand_pattern(pattern)
-    plate = re.sub("C", "Z", pattern)
-    plate = re.sub("D", "9", plate)
-    return plate
+    return compile(pattern).max_plate()
 
 
 def min_plate(pattern: str) -> Union[str, NoReturn]:
@@ -76,10 +591,7 @@ def min_plate(pattern: str) -> Union[str, NoReturn]:
     Equivalent to replacing all characters in the pattern
     by A and digits by 0.
     """
-    pattern = expand_pattern(pattern)
-    plate = re.sub("C", "A", pattern)
-    plate = re.sub("D", "0", plate)
-    return plate
+    return compile(pattern).min_plate()
 
 
 def combinations(pattern: str) -> Union[int, NoReturn]:
@@ -88,22 +600,23 @@ def combinations(pattern: str) -> Union[int, NoReturn]:
     that match the pattern.
     If the pattern is not valid, raises PatternNotValidException
     """
-    pattern = expand_pattern(pattern)
-
-    combinations_per_symbol: List[int] = [
-        LEN_ALPHA if s == "C" else LEN_DIGITS for s in pattern
-    ]
-    return functools.reduce(operator.mul, combinations_per_symbol)
+    return compile(pattern).combinations()
 
 
 def valid_pattern(pattern: str) -> bool:
     """
     Checks if the pattern given is valid for a license plate.
     It is equivalent to checking if the pattern contains characters
-    other than 'C' and 'D' or integers.
-    """
-    valid = re.search(r"[^CD\d]", pattern)
-    return valid is None
+    other than 'C' and 'D' or integers, and if it names an alphabet,
+    that the alphabet is declared in STD_ALPHABETS and valid.
+    """
+    try:
+        name = parse_pattern(pattern).pattern.partition(ALPHABET_SEPARATOR)[2]
+        if name:
+            resolve_alphabet(name)
+    except (PatternNotValidException, ValueError):
+        return False
+    return True
 
 
 def valid_plate(plate: str) -> bool:
@@ -127,26 +640,7 @@ def factor_by_position(pattern: str) -> List[int]:
     >>> factor_by_position("DCD")
     [260, 26, 1]
     """
-
-    pattern = expand_pattern(pattern)
-
-    # Each element represents the number of possible symbols for each position
-    # i.e. if pattern is "CCCDDC", then combinations_per_symbol is
-    # [26, 26, 26, 10, 10, 26]
-    combinations_per_symbol: List[int] = [
-        LEN_ALPHA if s == "C" else LEN_DIGITS for s in pattern
-    ]
-
-    # We get the cumulative product of the list
-    pos_factors: List[int] = list(
-        itertools.accumulate(combinations_per_symbol[::-1], operator.mul)
-    )
-    pos_factors = pos_factors[::-1]
-
-    # We take out the first element and append a 1 to the end.
-    pos_factors.pop(0)
-    pos_factors.append(1)
-    return pos_factors
+    return compile(pattern).factor_by_position()
 
 
 def matches_pattern(pattern: str, plate: str) -> Union[bool, NoReturn]:
@@ -159,28 +653,105 @@ def matches_pattern(pattern: str, plate: str) -> Union[bool, NoReturn]:
     >>> matches_pattern(ARG_PATTERN_1, "AA123ZX")
     False
     """
+    return compile(pattern).matches_pattern(plate)
 
-    pattern = expand_pattern(pattern)
-    if not valid_plate(plate):
-        raise PlateNotValidException(plate)
 
-    if len(plate) != len(pattern):
-        return False
+class ParsedPattern(NamedTuple):
+    """
+    Result of parsing a pattern: its expanded form (followed by the name
+    of its alphabet, if any), the type of each of its positions as a
+    byte (0 for characters and 1 for digits), and its run-length
+    encoding, as (symbol, count) pairs where consecutive runs always
+    have different symbols.
+    """
 
-    for i, j in zip(plate, pattern):
-        if (i.isupper() and j == "C") or (i.isdecimal() and j == "D"):
-            continue
-        return False
-    return True
+    pattern: str
+    symbol_types: bytes
+    runs: Tuple[Tuple[str, int], ...]
 
 
-def repeat_char_n_times(match: Match[str]) -> str:
+@functools.lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def parse_pattern(short_pattern: str) -> Union[ParsedPattern, NoReturn]:
     """
-    Returns the string corresponding to the second element
-    matched, repeated as times as the integer value of the first
-    element matched.
+    Parses a pattern, possibly in its short form, in a single pass.
+    Repeat counts may have any number of digits. Results are kept
+    in a LRU cache, like the ones of compile.
+    If the pattern is not valid, raises PatternNotValidException
+    with the position of the first invalid character.
+    >>> parse_pattern("2C12D").runs
+    (("C", 2), ("D", 12))
+    >>> parse_pattern("3D2CD").pattern
+    "DDDCCD"
+    >>> parse_pattern("2C3D2C@NO_IOQU").pattern
+    "CCDDDCC@NO_IOQU"
     """
-    return int(match.group(1)) * str(match.group(2))
+    shape, separator, name = short_pattern.partition(ALPHABET_SEPARATOR)
+    if separator and not name:
+        raise PatternNotValidException(
+            short_pattern, len(shape), "missing alphabet name"
+        )
+    symbols: List[str] = []
+    counts: List[int] = []
+    count, count_start = -1, 0
+    for pos, char in enumerate(shape):
+        if "0" <= char <= "9":
+            if count < 0:
+                count, count_start = 0, pos
+            count = count * 10 + ord(char) - 48
+        elif char == "C" or char == "D":
+            if count == 0:
+                raise PatternNotValidException(
+                    short_pattern, count_start, "repeat count must be positive"
+                )
+            n = 1 if count < 0 else count
+            if symbols and symbols[-1] == char:
+                counts[-1] += n
+            else:
+                symbols.append(char)
+                counts.append(n)
+            count = -1
+        else:
+            raise PatternNotValidException(
+                short_pattern, pos, f"unexpected character {char!r}"
+            )
+    if count >= 0:
+        raise PatternNotValidException(
+            short_pattern, count_start, "repeat count not followed by C or D"
+        )
+
+    pattern = "".join(symb * n for symb, n in zip(symbols, counts))
+    return ParsedPattern(
+        pattern + separator + name,
+        pattern.encode("ascii").translate(_SYMBOL_TYPES),
+        tuple(zip(symbols, counts)),
+    )
+
+
+def resolve_alphabet(name: str) -> Union[Dict[str, str], NoReturn]:
+    """
+    Returns the symbols of each type of position under the alphabet of
+    STD_ALPHABETS with the name given, which maps some types of position
+    ("C", "D") to the symbols replacing those of ALPHABETS, in the order
+    of their values. Each of them must be a subset of the symbols of
+    ALPHABETS for its type, of at least 2 symbols and without repetitions.
+    If there is no such alphabet or it is not valid, raises ValueError.
+    >>> resolve_alphabet("NO_IOQU")["C"]
+    "ABCDEFGHJKLMNPRSTVWXYZ"
+    """
+    if name not in STD_ALPHABETS:
+        raise ValueError(f"unknown alphabet {name}")
+    type_alphabets = dict(ALPHABETS)
+    for symb, alphabet in STD_ALPHABETS[name].items():
+        default = ALPHABETS.get(symb)
+        if (
+            default is None
+            or len(alphabet) < 2
+            or len(set(alphabet)) != len(alphabet)
+            or not set(alphabet) <= set(default)
+        ):
+            raise ValueError(f"alphabet {name} is not valid for {symb}")
+        type_alphabets[symb] = alphabet
+    return type_alphabets
 
 
 def expand_pattern(short_pattern: str) -> Union[str, NoReturn]:
@@ -193,11 +764,10 @@ def expand_pattern(short_pattern: str) -> Union[str, NoReturn]:
     "CCCDDD"
     >>> expand_pattern("3D2CD")
     "DDDCCD"
+    >>> expand_pattern("12D")
+    "DDDDDDDDDDDD"
     """
-    if not valid_pattern(short_pattern):
-        raise PatternNotValidException(short_pattern)
-    pattern = re.sub(r"(\d)([CD])", repeat_char_n_times, short_pattern)
-    return pattern
+    return parse_pattern(short_pattern).pattern
 
 
 def get_pattern(plate: str) -> Union[str, NoReturn]:
@@ -208,42 +778,29 @@ def get_pattern(plate: str) -> Union[str, NoReturn]:
     """
     if not valid_plate(plate):
         raise PlateNotValidException(plate)
-    pattern = re.sub("[A-Z]", "C", plate)
-    pattern = re.sub(r"\d", "D", pattern)
-    return pattern
+    return plate.translate(_PLATE_SHAPE)
 
 
-def get_plate(pattern: str, index: int) -> Union[str, NoReturn]:
+def get_plate(
+    pattern: str, index: int, overflow: Optional[str] = None
+) -> Union[Optional[str], NoReturn]:
     """
     Takes a natural number, and an alphanumerical pattern
     representing the type of the plate, and returns the nth plate.
     If the pattern is not valid, raises PatternNotValidException.
     If n is greater than the number of combinations generated by the pattern
-    given, prints a warning and returns max_plate(pattern)
+    given, follows the overflow policy given, or the global one if None:
+    - "clamp" (the default) warns and returns max_plate(pattern)
+    - "wrap" starts over from the first plate
+    - "raise" raises IndexOverflowException
+    - "none" returns None
+    >>> get_plate("CD", 261, overflow="wrap")
+    "A0"
     """
-
     if index < 1:
         raise ValueError(f"index must be a positive integer, received {index}")
 
-    pattern = expand_pattern(pattern)
-    if index > combinations(pattern):
-        console = Console(stderr=True, style="red")
-        console.print(
-            "WARNING: The input index exceeded the number of"
-            "combinations possible with the pattern given"
-        )
-        return max_plate(pattern)
-
-    index -= 1
-    position_factors: List[int] = factor_by_position(pattern)
-    plate: str = ""
-
-    for i in range(len(pattern)):
-        val = index // position_factors[i]
-        plate += symbol_by_value(val, pattern[i])
-        index %= position_factors[i]
-
-    return plate
+    return compile(pattern)._get_plate(index, overflow, stacklevel=2)
 
 
 def get_plate_index(plate: str) -> Union[int, NoReturn]:
@@ -260,12 +817,7 @@ def get_plate_index(plate: str) -> Union[int, NoReturn]:
     >>> get_plate_index("AA001CD")
     732
     """
-    pattern = get_pattern(plate)
-    position_factors = factor_by_position(pattern)
-    n = 1
-    for index, symbol in enumerate(plate):
-        n += value(symbol) * position_factors[index]
-    return n
+    return compile(get_pattern(plate))._index(plate)
 
 
 def generate_random_pattern(length: int = -1) -> str:
@@ -292,64 +844,50 @@ def generate_random_plate(pattern: Optional[str] = None) -> Union[str, NoReturn]
     """
     if pattern is None:
         pattern = generate_random_pattern()
-    else:
-        pattern = expand_pattern(pattern)
-
-    plate: str = ""
 
-    for symb in pattern:
-        if symb == "C":
-            plate += chr(random.randrange(ord("A"), ord("A") + LEN_ALPHA))
-        else:
-            plate += str(random.randrange(0, LEN_DIGITS))
+    return compile(pattern).generate_random_plate()
 
-    return plate
 
-
-def std_patterns_table() -> None:
+@registry.cached_by_version(ISO_3166)
+def iso_locations() -> Tuple[Tuple[str, str], ...]:
     """
-    Prints a table with information about the Standard
-    License Plate patterns provided in the STD_PATTERNS
-    dictionary. For each of the patterns, the table shows
-    the number of combinations and generates a random plate
-    """
-    table = Table(title="Standard License Plate Patterns")
-
-    table.add_column("Country/State", style="bold red")
-    table.add_column("ISO 3166", justify="full", style="bold green")
-    table.add_column("Pattern", justify="right", style="blue")
-    table.add_column("Combinations", justify="right", style="red")
-    table.add_column("Example", justify="right", style="bold violet")
-
-    def insert_to_table(ubication: str, iso_code: str) -> None:
-        pattern = STD_PATTERNS[iso_code]
-        table.add_row(
-            ubication,
-            iso_code,
-            pattern,
-            str(combinations(pattern)),
-            generate_random_plate(pattern),
-        )
-
+    Flattens the ISO_3166 dictionary, returning a tuple of
+    (country or subdivision, ISO 3166 code) pairs, in the
+    same order as they appear in ISO_3166. The result is cached
+    until ISO_3166 is modified.
+    >>> iso_locations()[:3]
+    (("ANDORRA", "AD"), ("ARGENTINA", "AR-1"), ("ARGENTINA", "AR-2"))
+    """
+    locations: List[Tuple[str, str]] = []
     for country, iso in ISO_3166.items():
         # Case that country has unique code,
         # then iso is the ISO 3166-1 code for the country
         if isinstance(iso, str):
-            insert_to_table(country, iso)
+            locations.append((country, iso))
         # Case that country has a collection of
         # codes, associated to countries which
         # have implemented new patterns
         elif isinstance(iso, list):
             for iso_code in iso:
-                insert_to_table(country, iso_code)
+                locations.append((country, iso_code))
         # Case that country has a dictionary, where
         # each key is a subdivision of the country
         # and the value is the ISO 3166-2 code for
         # the corresponding subdivision
         elif isinstance(iso, dict):
             for subdivision, iso_code in iso.items():
-                insert_to_table(subdivision, iso_code)
+                locations.append((subdivision, iso_code))
+    return tuple(locations)
+
+
+def std_patterns_table(format: str = "rich") -> None:
+    """
+    Prints a table with information about the Standard
+    License Plate patterns provided in the STD_PATTERNS
+    dictionary. For each of the patterns, the table shows
+    the number of combinations and an example plate.
+    The format is one of rich, tsv, csv or json.
+    """
+    from plates import table
 
-    console = Console()
-    print("\n")
-    console.print(table)
+    table.render(format)
@@ -0,0 +1,213 @@
+"""
+Correction of plates misread by OCR, which often confuses letters and
+digits that look alike, such as O and 0 or B and 8. A noisy plate is
+mapped to the valid plates of each standard pattern (or the patterns
+given) that can be reached by replacing confusable symbols.
+"""
+import itertools
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from plates import core, registry
+from plates.classify import pattern_index
+
+
+# Letters and digits often confused by OCR, and the cost of replacing
+# one by the other, lower for the most common confusions
+CONFUSIONS: Tuple[Tuple[str, str, float], ...] = (
+    ("O", "0", 1.0),
+    ("I", "1", 1.0),
+    ("B", "8", 1.0),
+    ("S", "5", 1.0),
+    ("Z", "2", 1.0),
+    ("G", "6", 1.0),
+    ("D", "0", 1.5),
+    ("Q", "0", 1.5),
+    ("L", "1", 1.5),
+    ("T", "1", 2.0),
+    ("T", "7", 1.5),
+    ("A", "4", 1.5),
+    ("B", "3", 2.0),
+    ("E", "3", 2.0),
+    ("G", "9", 2.0),
+)
+
+DEFAULT_MAX_EDITS: int = 2
+
+# Characters removed from the plates before correcting them
+SEPARATORS = " -.·"
+
+_MASK_BITS = str.maketrans("CD", "01")
+_REMOVE_SEPARATORS = str.maketrans("", "", SEPARATORS)
+
+Substitutes = Dict[str, Tuple[Tuple[str, float], ...]]
+
+
+class Correction(NamedTuple):
+    plate: str
+    pattern: str
+    iso_codes: Tuple[str, ...]
+    # Number of symbols replaced, and sum of the costs of the replacements
+    edits: int
+    cost: float
+
+
+def _shape_mask(shape: str) -> int:
+    # Bit n - 1 - i is set if position i of the shape is a digit
+    return int(shape.translate(_MASK_BITS), 2)
+
+
+class Corrector:
+    """
+    Corrects plates against a set of patterns, mapping each pattern to
+    the ISO codes reported with its corrections (pattern_index() by
+    default). The substitutes of each symbol and the shape of each
+    pattern, as a bitmask, are precomputed when built, so correcting a
+    plate only takes an XOR and a bit count per pattern of its length,
+    and looking up the substitutes of the symbols that do not fit.
+    """
+
+    def __init__(
+        self,
+        patterns: Optional[Dict[str, Tuple[str, ...]]] = None,
+        confusions: Iterable[Tuple[str, str, float]] = CONFUSIONS,
+    ) -> None:
+        if patterns is None:
+            patterns = pattern_index()
+        self.by_length: Dict[
+            int, List[Tuple[int, core.CompiledPattern, Tuple[str, ...]]]
+        ] = {}
+        for pattern, iso_codes in patterns.items():
+            compiled = core.compile(pattern)
+            self.by_length.setdefault(len(compiled), []).append(
+                (_shape_mask(compiled.shape), compiled, iso_codes)
+            )
+
+        # Substitutes of each letter by digits, and each digit by letters,
+        # cheapest first
+        to_digit: Dict[str, List[Tuple[str, float]]] = {}
+        to_letter: Dict[str, List[Tuple[str, float]]] = {}
+        for letter, digit, cost in confusions:
+            to_digit.setdefault(letter, []).append((digit, cost))
+            to_letter.setdefault(digit, []).append((letter, cost))
+        self.substitutes: Dict[str, Substitutes] = {
+            kind: {
+                symbol: tuple(sorted(options, key=lambda option: option[1]))
+                for symbol, options in table.items()
+            }
+            for kind, table in (("D", to_digit), ("C", to_letter))
+        }
+
+    def correct(
+        self, plate: str, max_edits: int = DEFAULT_MAX_EDITS
+    ) -> List[Correction]:
+        """
+        Returns every plate of the patterns that can be obtained from the
+        plate given by replacing up to max_edits confusable symbols, ranked
+        by the cost of the replacements (a plate that already matches a
+        pattern has a cost of 0). The plate is upper cased and stripped of
+        SEPARATORS first. Returns an empty list if nothing is found.
+        >>> Corrector().correct("AB1O3CD")
+        [Correction(plate="AB103CD", pattern="CCDDDCC", ..., edits=1, cost=1.0)]
+        """
+        plate = plate.upper().translate(_REMOVE_SEPARATORS)
+        # valid_plate accepts any uppercase letter, such as É
+        if not core.valid_plate(plate) or not all(
+            symbol in core._SYMBOL_VALUES for symbol in plate
+        ):
+            return []
+        candidates = self.by_length.get(len(plate))
+        if not candidates:
+            return []
+
+        mask = _shape_mask(plate.translate(core._PLATE_SHAPE))
+        corrections: List[Correction] = []
+        for pattern_mask, compiled, iso_codes in candidates:
+            pattern = compiled.pattern
+            diff = mask ^ pattern_mask
+            if not diff:
+                # Patterns with their own alphabets may still reject it
+                if plate.translate(compiled._shape_table) == compiled.shape:
+                    corrections.append(Correction(plate, pattern, iso_codes, 0, 0.0))
+                continue
+            edits = bin(diff).count("1")
+            if edits > max_edits:
+                continue
+
+            # Alternatives at each position, a single one where it fits,
+            # keeping only the symbols of the alphabet of the position
+            options: List[Tuple[Tuple[str, float], ...]] = []
+            mismatches = format(diff, f"0{len(plate)}b")
+            for symbol, kind, alphabet, mismatch in zip(
+                plate, compiled.shape, compiled.alphabets, mismatches
+            ):
+                if mismatch == "0":
+                    if symbol not in alphabet:
+                        break
+                    options.append(((symbol, 0.0),))
+                    continue
+                substitutes = tuple(
+                    option
+                    for option in self.substitutes[kind].get(symbol, ())
+                    if option[0] in alphabet
+                )
+                if not substitutes:
+                    break
+                options.append(substitutes)
+            else:
+                for choice in itertools.product(*options):
+                    corrections.append(
+                        Correction(
+                            "".join(symbol for symbol, _ in choice),
+                            pattern,
+                            iso_codes,
+                            edits,
+                            sum(cost for _, cost in choice),
+                        )
+                    )
+
+        corrections.sort(key=lambda c: (c.cost, c.edits))
+        return corrections
+
+
+@registry.cached_by_version(core.ISO_3166, core.STD_PATTERNS, core.STD_ALPHABETS)
+def default_corrector() -> Corrector:
+    """
+    Returns the Corrector of the standard patterns, built on the
+    first call and reused until STD_PATTERNS, ISO_3166 or STD_ALPHABETS
+    change.
+    """
+    return Corrector()
+
+
+def correct_plate(plate: str, max_edits: int = DEFAULT_MAX_EDITS) -> List[Correction]:
+    """
+    Corrects the plate against the standard patterns (see Corrector.correct).
+    >>> correct_plate("AB1O3CD")[0].plate
+    "AB103CD"
+    """
+    return default_corrector().correct(plate, max_edits)
+
+
+def correct_plates(
+    plates: Iterable[str], max_edits: int = DEFAULT_MAX_EDITS
+) -> Iterator[List[Correction]]:
+    """
+    Lazily corrects each of the plates given against
+    the standard patterns, as correct_plate would.
+    """
+    correct = default_corrector().correct
+    for plate in plates:
+        yield correct(plate, max_edits)
+
+
+def best_corrections(
+    plates: Iterable[str], max_edits: int = DEFAULT_MAX_EDITS
+) -> List[Optional[str]]:
+    """
+    Returns the best ranked correction of each of the plates,
+    or None for those that could not be corrected.
+    """
+    best: List[Optional[str]] = []
+    for corrections in correct_plates(plates, max_edits):
+        best.append(corrections[0].plate if corrections else None)
+    return best
@@ -0,0 +1,377 @@
+"""
+A compact file format for large sets of plates. Plates are grouped by
+pattern and stored as their indices, sorted and split in blocks, where
+each index is written as its difference to the previous one, encoded
+as a varint (7 bits per byte, the high bit telling if more bytes
+follow). Sorted plates are close to each other, so most take 1 or 2
+bytes instead of a line of text.
+
+    header | blocks ... | footer | footer offset, magic
+
+The footer lists, for each pattern, its blocks with their offset, size,
+number of indices and smallest and largest index, so the file can be
+memory mapped and only the blocks overlapping a range of indices need
+to be decoded. Indices must fit in 64 bits, so patterns must have less
+than 2 ** 64 combinations. With NumPy installed, blocks are encoded
+and decoded in vectorized form.
+"""
+import mmap
+import os
+import struct
+from array import array
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    NoReturn,
+)
+
+from plates import core
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+# Number of indices of each block
+BLOCK_SIZE: int = 4096
+
+_MAGIC = b"PLATECOL"
+_VERSION = 1
+_HEADER = struct.Struct("<8sH")
+# Offset of the footer, followed by the magic again
+_TRAILER = struct.Struct("<Q8s")
+# Number of patterns in the footer
+_GROUPS = struct.Struct("<I")
+# Length of the pattern, followed by the pattern, then number of blocks
+# and of indices of the pattern
+_PATTERN_LEN = struct.Struct("<H")
+_GROUP = struct.Struct("<IQ")
+# Offset, size in bytes, number of indices, smallest and largest index
+_BLOCK = struct.Struct("<QIIQQ")
+
+_UINT64_LIMIT = 2 ** 64
+
+
+class Block(NamedTuple):
+    offset: int
+    nbytes: int
+    length: int
+    first: int
+    last: int
+
+
+def _has_numpy() -> bool:
+    return np is not None
+
+
+def _encode_varints(deltas: Any) -> bytes:
+    if _has_numpy():
+        values = np.asarray(deltas, dtype=np.uint64)
+        lengths = np.ones(values.size, dtype=np.int64)
+        for k in range(1, 10):
+            lengths += values >= np.uint64(1 << (7 * k))
+        starts = np.cumsum(lengths) - lengths
+        out = np.empty(int(lengths.sum()), dtype=np.uint8)
+        for k in range(int(lengths.max(initial=0))):
+            sel = lengths > k
+            low = (values[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+            more = (lengths[sel] > k + 1).astype(np.uint64) << np.uint64(7)
+            out[starts[sel] + k] = low | more
+        return bytes(out.tobytes())
+
+    buffer = bytearray()
+    for value in deltas:
+        while value >= 0x80:
+            buffer.append(value & 0x7F | 0x80)
+            value >>= 7
+        buffer.append(value)
+    return bytes(buffer)
+
+
+def _decode_block(buffer: Any, block: Block) -> Any:
+    """
+    Returns the indices of the block, as a NumPy uint64 array if
+    NumPy is installed, or as an array('Q') otherwise.
+    """
+    raw = buffer[block.offset : block.offset + block.nbytes]
+    if _has_numpy():
+        data = np.frombuffer(raw, dtype=np.uint8)
+        ends = np.flatnonzero(data < 0x80)
+        starts = np.empty_like(ends)
+        starts[:1] = 0
+        starts[1:] = ends[:-1] + 1
+        shifts = np.arange(data.size) - np.repeat(starts, ends - starts + 1)
+        parts = (data & 0x7F).astype(np.uint64) << (7 * shifts).astype(np.uint64)
+        deltas = np.add.reduceat(parts, starts) if starts.size else parts[:0]
+        return np.cumsum(deltas, dtype=np.uint64) + np.uint64(block.first)
+
+    indices = array("Q")
+    index, value, shift = block.first, 0, 0
+    for byte in bytes(raw):
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            index += value
+            indices.append(index)
+            value = shift = 0
+    return indices
+
+
+def _sorted_indices(indices: Any) -> Any:
+    if _has_numpy():
+        if not hasattr(indices, "__len__"):
+            return np.sort(np.fromiter(indices, dtype=np.uint64))
+        return np.sort(np.asarray(indices, dtype=np.uint64))
+    return array("Q", sorted(indices))
+
+
+def _write_indices(
+    f: BinaryIO, indices: Mapping[str, Iterable[int]], block_size: int
+) -> Union[int, NoReturn]:
+    groups: List[Tuple[str, List[Block], int]] = []
+    total = 0
+    f.write(_HEADER.pack(_MAGIC, _VERSION))
+    for pattern, pattern_indices in indices.items():
+        compiled = core.compile(pattern)
+        if compiled.combinations() >= _UINT64_LIMIT:
+            raise OverflowError(f"Pattern {compiled.pattern} has too many combinations")
+        values = _sorted_indices(pattern_indices)
+        combinations = compiled.combinations()
+        if len(values) and not 1 <= values[0] <= values[-1] <= combinations:
+            raise ValueError(f"Index out of range for pattern {compiled.pattern}")
+
+        blocks = []
+        for start in range(0, len(values), block_size):
+            chunk = values[start : start + block_size]
+            first = int(chunk[0])
+            if _has_numpy():
+                deltas = np.diff(chunk, prepend=np.uint64(first))
+            else:
+                deltas = [b - a for a, b in zip([first] + list(chunk), chunk)]
+            encoded = _encode_varints(deltas)
+            blocks.append(
+                Block(f.tell(), len(encoded), len(chunk), first, int(chunk[-1]))
+            )
+            f.write(encoded)
+        groups.append((compiled.pattern, blocks, len(values)))
+        total += len(values)
+
+    footer_offset = f.tell()
+    f.write(_GROUPS.pack(len(groups)))
+    for pattern, blocks, count in groups:
+        encoded_pattern = pattern.encode("ascii")
+        f.write(_PATTERN_LEN.pack(len(encoded_pattern)))
+        f.write(encoded_pattern)
+        f.write(_GROUP.pack(len(blocks), count))
+        f.writelines(_BLOCK.pack(*block) for block in blocks)
+    f.write(_TRAILER.pack(footer_offset, _MAGIC))
+    return total
+
+
+def write_indices(
+    path: str,
+    indices: Mapping[str, Iterable[int]],
+    block_size: int = BLOCK_SIZE,
+) -> Union[int, NoReturn]:
+    """
+    Writes the indices of each pattern to the file at path, returning
+    the number of indices written. The indices of each pattern do not
+    need to be sorted, and repeated indices are kept.
+    If a pattern has 2 ** 64 combinations or more, raises OverflowError,
+    and if an index is out of range, raises ValueError, leaving the file
+    at path as it was.
+    """
+    if block_size < 1:
+        raise ValueError(
+            f"block_size must be a positive integer, received {block_size}"
+        )
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            total = _write_indices(f, indices, block_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return total
+
+
+def write_plates(
+    path: str, plates: Iterable[str], block_size: int = BLOCK_SIZE
+) -> Union[int, NoReturn]:
+    """
+    Writes the plates to the file at path, grouped by pattern,
+    returning the number of plates written (see write_indices).
+    If any plate is not valid, raises PlateNotValidException.
+    """
+    indices: Dict[str, Any] = {}
+    for plate in plates:
+        compiled = core.compile(core.get_pattern(plate))
+        pattern_indices = indices.get(compiled.pattern)
+        if pattern_indices is None:
+            if compiled.combinations() >= _UINT64_LIMIT:
+                raise OverflowError(
+                    f"Pattern {compiled.pattern} has too many combinations"
+                )
+            pattern_indices = indices[compiled.pattern] = array("Q")
+        pattern_indices.append(compiled._index(plate))
+    return write_indices(path, indices, block_size)
+
+
+class PlateFile:
+    """
+    Reader of a file written by write_plates or write_indices. The file
+    is memory mapped and only its footer is read when opened, blocks are
+    decoded when a query touches them.
+    >>> with PlateFile("plates.col") as f:
+    ...     list(f.query("CCDDDCC", "AA000AA", "AA999ZZ"))
+    """
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.groups = self._read_footer()
+        except (ValueError, struct.error):
+            self._mmap.close()
+            raise ValueError(f"{path} does not hold plates written by write_plates")
+
+    def _read_footer(self) -> Dict[str, Tuple[int, List[Block]]]:
+        buffer = self._mmap
+        magic, version = _HEADER.unpack_from(buffer, 0)
+        footer_offset, end_magic = _TRAILER.unpack_from(
+            buffer, len(buffer) - _TRAILER.size
+        )
+        if magic != _MAGIC or end_magic != _MAGIC or version != _VERSION:
+            raise ValueError
+
+        groups: Dict[str, Tuple[int, List[Block]]] = {}
+        at = footer_offset
+        (n_groups,) = _GROUPS.unpack_from(buffer, at)
+        at += _GROUPS.size
+        for _ in range(n_groups):
+            (length,) = _PATTERN_LEN.unpack_from(buffer, at)
+            at += _PATTERN_LEN.size
+            pattern = bytes(buffer[at : at + length]).decode("ascii")
+            at += length
+            n_blocks, count = _GROUP.unpack_from(buffer, at)
+            at += _GROUP.size
+            blocks = [
+                Block(*_BLOCK.unpack_from(buffer, at + i * _BLOCK.size))
+                for i in range(n_blocks)
+            ]
+            at += n_blocks * _BLOCK.size
+            groups[pattern] = (count, blocks)
+        return groups
+
+    def patterns(self) -> List[str]:
+        return list(self.groups)
+
+    def count(self, pattern: Optional[str] = None) -> int:
+        """
+        Returns the number of indices of the pattern, or of the whole file.
+        """
+        if pattern is None:
+            return sum(count for count, _ in self.groups.values())
+        group = self.groups.get(core.compile(pattern).pattern)
+        return group[0] if group is not None else 0
+
+    def iter_blocks(
+        self,
+        pattern: str,
+        start: Optional[Union[str, int]] = None,
+        stop: Optional[Union[str, int]] = None,
+    ) -> Iterator[Any]:
+        """
+        Yields the sorted indices of the pattern from start to stop, both
+        included (given as plates or indices), a block at a time, as NumPy
+        arrays if NumPy is installed or as array('Q') otherwise. Blocks
+        entirely out of the range are skipped without being decoded.
+        """
+        compiled = core.compile(pattern)
+        group = self.groups.get(compiled.pattern)
+        if group is None:
+            return
+        low = _bound(compiled, start, 1)
+        high = _bound(compiled, stop, compiled.combinations())
+        for block in group[1]:
+            if block.last < low:
+                continue
+            if block.first > high:
+                break
+            indices = _decode_block(self._mmap, block)
+            if block.first < low or block.last > high:
+                indices = _clip(indices, low, high)
+            yield indices
+
+    def query(
+        self,
+        pattern: str,
+        start: Optional[Union[str, int]] = None,
+        stop: Optional[Union[str, int]] = None,
+    ) -> Iterator[str]:
+        """
+        Yields the plates of the pattern from start to stop, in index order.
+        """
+        get_plate = core.compile(pattern)._plate
+        for indices in self.iter_blocks(pattern, start, stop):
+            for index in indices.tolist():
+                yield get_plate(index)
+
+    def __iter__(self) -> Iterator[str]:
+        for pattern in self.groups:
+            yield from self.query(pattern)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "PlateFile":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _bound(
+    compiled: core.CompiledPattern, bound: Optional[Union[str, int]], default: int
+) -> int:
+    if bound is None:
+        return default
+    if isinstance(bound, str):
+        return compiled.get_plate_index(bound)
+    return bound
+
+
+def _clip(indices: Any, low: int, high: int) -> Any:
+    if _has_numpy():
+        return indices[(indices >= np.uint64(low)) & (indices <= np.uint64(high))]
+    return array("Q", (index for index in indices if low <= index <= high))
+
+
+def read_plates(
+    path: str,
+    pattern: Optional[str] = None,
+    start: Optional[Union[str, int]] = None,
+    stop: Optional[Union[str, int]] = None,
+) -> Iterator[str]:
+    """
+    Streams the plates of the file at path, pattern by pattern and in
+    index order, or only those of the pattern given, from start to stop.
+    """
+    with PlateFile(path) as f:
+        if pattern is None:
+            yield from f
+        else:
+            yield from f.query(pattern, start, stop)
@@ -0,0 +1,235 @@
+"""
+Compact value types to hold plates as their index within their pattern,
+instead of as strings.
+"""
+from array import array
+from typing import Any, Iterable, Iterator, Tuple, Union, NoReturn, overload
+
+from plates import core
+
+
+class Plate:
+    """
+    A license plate stored as its compiled pattern and its index,
+    whose string form is computed only when it is needed.
+    Plates are hashable and ordered by pattern and then by index,
+    adding or subtracting an integer moves through the plates of the
+    pattern, and subtracting two plates gives the distance between them.
+    >>> plate = Plate("AA001CD")
+    >>> plate.index
+    732
+    >>> str(plate + 1)
+    "AA001CE"
+    >>> Plate("AA001CE") - plate
+    1
+    """
+
+    __slots__ = ("compiled", "index")
+
+    def __init__(self, plate: str) -> None:
+        self.compiled: core.CompiledPattern = core.compile(core.get_pattern(plate))
+        self.index: int = self.compiled._index(plate)
+
+    @classmethod
+    def from_index(
+        cls, pattern: Union[str, core.CompiledPattern], index: int
+    ) -> Union["Plate", NoReturn]:
+        """
+        Returns the plate with the index given within the pattern.
+        If the index is out of range, raises ValueError.
+        """
+        compiled = core.compile(pattern) if isinstance(pattern, str) else pattern
+        if not 1 <= index <= compiled.combinations():
+            raise ValueError(
+                f"index must be between 1 and {compiled.combinations()}, "
+                f"received {index}"
+            )
+        plate = cls.__new__(cls)
+        plate.compiled = compiled
+        plate.index = index
+        return plate
+
+    @property
+    def pattern(self) -> str:
+        return self.compiled.pattern
+
+    def _key(self) -> Tuple[str, int]:
+        return self.compiled.pattern, self.index
+
+    def __str__(self) -> str:
+        return self.compiled._plate(self.index)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({str(self)!r})"
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Plate):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __lt__(self, other: "Plate") -> bool:
+        if not isinstance(other, Plate):
+            return NotImplemented
+        return self._key() < other._key()
+
+    def __le__(self, other: "Plate") -> bool:
+        if not isinstance(other, Plate):
+            return NotImplemented
+        return self._key() <= other._key()
+
+    def __gt__(self, other: "Plate") -> bool:
+        if not isinstance(other, Plate):
+            return NotImplemented
+        return self._key() > other._key()
+
+    def __ge__(self, other: "Plate") -> bool:
+        if not isinstance(other, Plate):
+            return NotImplemented
+        return self._key() >= other._key()
+
+    def __add__(self, n: int) -> "Plate":
+        if not isinstance(n, int):
+            return NotImplemented
+        return Plate.from_index(self.compiled, self.index + n)
+
+    __radd__ = __add__
+
+    @overload
+    def __sub__(self, other: "Plate") -> int:
+        ...
+
+    @overload
+    def __sub__(self, other: int) -> "Plate":
+        ...
+
+    def __sub__(self, other: Union["Plate", int]) -> Union["Plate", int]:
+        if isinstance(other, Plate):
+            if other.compiled.pattern != self.compiled.pattern:
+                raise ValueError(
+                    f"Plates {self} and {other} do not have the same pattern"
+                )
+            return self.index - other.index
+        if isinstance(other, int):
+            return Plate.from_index(self.compiled, self.index - other)
+        return NotImplemented
+
+
+class PlateArray:
+    """
+    A sequence of plates of a single pattern, stored as their indices
+    in a contiguous array('Q') of 8 bytes per plate. Items are returned
+    as Plate objects, and plates can be added as strings, Plate objects
+    or indices. The pattern must have less than 2 ** 64 combinations.
+    >>> plates = PlateArray("CCDDDCC", ["AA001CD", "AD077YI"])
+    >>> plates.nbytes
+    16
+    >>> list(plates.strings())
+    ["AA001CD", "AD077YI"]
+    """
+
+    __slots__ = ("compiled", "indices")
+
+    def __init__(
+        self, pattern: Union[str, core.CompiledPattern], plates: Iterable[Any] = ()
+    ) -> None:
+        self.compiled = core.compile(pattern) if isinstance(pattern, str) else pattern
+        if self.compiled.combinations() >= 2 ** 64:
+            raise OverflowError(
+                f"Pattern {self.compiled.pattern} has too many combinations"
+            )
+        self.indices = array("Q")
+        self.extend(plates)
+
+    @classmethod
+    def from_indices(
+        cls, pattern: Union[str, core.CompiledPattern], indices: Iterable[int]
+    ) -> "PlateArray":
+        """
+        Builds a PlateArray straight from the indices of the plates.
+        """
+        plates = cls(pattern)
+        plates.indices = array("Q", indices)
+        return plates
+
+    def _to_index(self, plate: Any) -> Union[int, NoReturn]:
+        if isinstance(plate, Plate):
+            if plate.compiled.pattern != self.compiled.pattern:
+                raise ValueError(
+                    f"Plate {plate} does not match pattern {self.compiled.pattern}"
+                )
+            return plate.index
+        if isinstance(plate, int):
+            if not 1 <= plate <= self.compiled.combinations():
+                raise ValueError(f"index {plate} out of range")
+            return plate
+        return self.compiled.get_plate_index(plate)
+
+    def append(self, plate: Any) -> None:
+        self.indices.append(self._to_index(plate))
+
+    def extend(self, plates: Iterable[Any]) -> None:
+        self.indices.extend(self._to_index(plate) for plate in plates)
+
+    def sort(self) -> None:
+        self.indices = array("Q", sorted(self.indices))
+
+    def strings(self) -> Iterator[str]:
+        """
+        Yields the string form of each of the plates.
+        """
+        get_plate = self.compiled._plate
+        for index in self.indices:
+            yield get_plate(index)
+
+    def numpy(self) -> Any:
+        """
+        Returns a NumPy uint64 array sharing memory with the indices.
+        """
+        import numpy as np
+
+        return np.frombuffer(self.indices, dtype=np.uint64)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.indices) * self.indices.itemsize
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    @overload
+    def __getitem__(self, i: int) -> Plate:
+        ...
+
+    @overload
+    def __getitem__(self, i: slice) -> "PlateArray":
+        ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Plate, "PlateArray"]:
+        if isinstance(i, slice):
+            return PlateArray.from_indices(self.compiled, self.indices[i])
+        return Plate.from_index(self.compiled, self.indices[i])
+
+    def __iter__(self) -> Iterator[Plate]:
+        for index in self.indices:
+            yield Plate.from_index(self.compiled, index)
+
+    def __contains__(self, plate: Any) -> bool:
+        try:
+            return self._to_index(plate) in self.indices
+        except (ValueError, core.PlateNotValidException):
+            return False
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PlateArray):
+            return NotImplemented
+        return (
+            self.compiled.pattern == other.compiled.pattern
+            and self.indices == other.indices
+        )
+
+    def __repr__(self) -> str:
+        plates = list(self.strings())
+        return f"{type(self).__name__}({self.compiled.pattern!r}, {plates})"
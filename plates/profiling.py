@@ -0,0 +1,324 @@
+"""
+Opt-in instrumentation of the functions of plates.core, recording how
+many times each of them is called, how long the calls take, and how
+often the caches of core are hit. Turn it on with
+
+    plates.instrument(enable=True)
+
+or by setting the PLATES_INSTRUMENT environment variable to 1 before
+importing plates. Instrumenting replaces the functions of core and of
+the plates package, and the methods of CompiledPattern, by wrappers
+timing each call, and turning it off puts the originals back, so it
+costs nothing while off. Functions imported with "from plates.core
+import ..." before instrumenting keep pointing to the originals.
+
+Times are inclusive: a call to get_plate also counts the time spent in
+the call to compile it makes, which is recorded as well.
+"""
+import collections
+import functools
+import os
+import sys
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from plates import core, registry
+
+
+ENV_VAR = "PLATES_INSTRUMENT"
+
+# Number of recent calls of each function the latency
+# percentiles are computed over
+LATENCY_WINDOW: int = 4096
+
+DEFAULT_PROMETHEUS_HOST = "127.0.0.1"
+DEFAULT_PROMETHEUS_PORT = 9464
+
+FUNCTIONS: Tuple[str, ...] = (
+    "combinations",
+    "compile",
+    "compile_std",
+    "expand_pattern",
+    "factor_by_position",
+    "generate_random_pattern",
+    "generate_random_plate",
+    "get_pattern",
+    "get_plate",
+    "get_plate_index",
+    "iso_locations",
+    "matches_pattern",
+    "max_plate",
+    "min_plate",
+    "parse_pattern",
+    "std_patterns_table",
+    "symbol_by_value",
+    "valid_pattern",
+    "valid_plate",
+    "value",
+)
+
+METHODS: Tuple[str, ...] = (
+    "combinations",
+    "factor_by_position",
+    "generate_random_plate",
+    "get_plate",
+    "get_plate_index",
+    "matches_pattern",
+    "max_plate",
+    "min_plate",
+)
+
+# Cached functions whose hit rates are reported, by module
+CACHES: Tuple[Tuple[Any, str], ...] = (
+    (core, "compile"),
+    (core, "_compile_precompiled"),
+    (core, "parse_pattern"),
+    (core, "iso_locations"),
+    (registry, "load_data"),
+)
+
+
+def latency_summary(
+    latencies: Iterable[float], total: float, count: int
+) -> Dict[str, float]:
+    """
+    Returns the mean latency of count calls taking total seconds, and
+    the percentiles and maximum of the latencies given (usually the most
+    recent ones), all in milliseconds.
+    >>> latency_summary([0.001, 0.003], 0.004, 2)
+    {"mean": 2.0, "p50": 3.0, "p90": 3.0, "p99": 3.0, "max": 3.0}
+    """
+    recent = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not recent:
+            return 0.0
+        return recent[min(len(recent) - 1, int(p * len(recent)))] * 1e3
+
+    return {
+        "mean": total / count * 1e3 if count else 0.0,
+        "p50": percentile(0.5),
+        "p90": percentile(0.9),
+        "p99": percentile(0.99),
+        "max": recent[-1] * 1e3 if recent else 0.0,
+    }
+
+
+class _FunctionStats:
+    __slots__ = ("calls", "errors", "total", "latencies")
+
+    def __init__(self) -> None:
+        self.latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self.clear()
+
+    def clear(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.latencies.clear()
+
+    def record(self, latency: float) -> None:
+        self.calls += 1
+        self.total += latency
+        self.latencies.append(latency)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": self.total * 1e3,
+            "latency_ms": latency_summary(self.latencies, self.total, self.calls),
+        }
+
+
+_stats: Dict[str, _FunctionStats] = {}
+# Objects replaced while instrumenting, to put back when turned off,
+# as (owner, attribute, original) triples
+_replaced: List[Tuple[Any, str, Any]] = []
+
+
+def _wrap(name: str, f: Callable[..., Any]) -> Callable[..., Any]:
+    stats = _stats.setdefault(name, _FunctionStats())
+    perf_counter = time.perf_counter
+
+    @functools.wraps(f)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = perf_counter()
+        try:
+            return f(*args, **kwargs)
+        except BaseException:
+            stats.errors += 1
+            raise
+        finally:
+            stats.record(perf_counter() - started)
+
+    # Cached functions keep exposing their cache
+    for attr in ("cache_info", "cache_clear"):
+        if hasattr(f, attr):
+            setattr(wrapper, attr, getattr(f, attr))
+    return wrapper
+
+
+def _replace(owner: Any, attr: str, new: Any) -> None:
+    _replaced.append((owner, attr, getattr(owner, attr)))
+    setattr(owner, attr, new)
+
+
+def enabled() -> bool:
+    return bool(_replaced)
+
+
+def instrument(enable: bool = True) -> None:
+    """
+    Turns the instrumentation of plates.core on or off. Counters are
+    kept when it is turned off, and added to when it is turned on again.
+    """
+    if enable == enabled():
+        return
+    if not enable:
+        while _replaced:
+            owner, attr, original = _replaced.pop()
+            setattr(owner, attr, original)
+        return
+
+    package = sys.modules["plates"]
+    for name in FUNCTIONS:
+        original = getattr(core, name)
+        wrapper = _wrap(name, original)
+        _replace(core, name, wrapper)
+        # Names the package imported from core
+        if getattr(package, name, None) is original:
+            _replace(package, name, wrapper)
+    for name in METHODS:
+        method = vars(core.CompiledPattern)[name]
+        _replace(core.CompiledPattern, name, _wrap(f"CompiledPattern.{name}", method))
+
+
+def reset() -> None:
+    """
+    Sets every counter back to zero.
+    """
+    for stats in _stats.values():
+        stats.clear()
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    Returns the counters as a dictionary: for each function called since
+    it was instrumented, its number of calls and of calls that raised,
+    its cumulative time and its latency percentiles over the last
+    LATENCY_WINDOW calls, in milliseconds, and the hits, misses, size
+    and hit rate of each of CACHES, which are counted even when off.
+    """
+    caches = {}
+    for module, name in CACHES:
+        info = getattr(module, name).cache_info()
+        lookups = info.hits + info.misses
+        caches[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    return {
+        "enabled": enabled(),
+        "functions": {
+            name: stats.snapshot() for name, stats in _stats.items() if stats.calls
+        },
+        "caches": caches,
+    }
+
+
+def _metric(name: str, kind: str, description: str) -> List[str]:
+    return [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+
+
+def to_prometheus(snap: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Returns the snapshot given (the current one by default)
+    in the Prometheus text exposition format.
+    """
+    if snap is None:
+        snap = snapshot()
+    functions: Dict[str, Any] = snap["functions"]
+    caches: Dict[str, Any] = snap["caches"]
+
+    lines = _metric(
+        "plates_instrumentation_enabled", "gauge", "Whether plates is instrumented."
+    )
+    lines.append(f"plates_instrumentation_enabled {int(snap['enabled'])}")
+
+    lines += _metric(
+        "plates_call_errors_total", "counter", "Calls that raised an exception."
+    )
+    for name, stats in functions.items():
+        lines.append(f'plates_call_errors_total{{function="{name}"}} {stats["errors"]}')
+
+    lines += _metric(
+        "plates_call_seconds", "summary", "Latency of the calls, in seconds."
+    )
+    for name, stats in functions.items():
+        label = f'function="{name}"'
+        for quantile, key in (("0.5", "p50"), ("0.9", "p90"), ("0.99", "p99")):
+            latency = stats["latency_ms"][key] / 1e3
+            lines.append(
+                f'plates_call_seconds{{{label},quantile="{quantile}"}} {latency!r}'
+            )
+        lines.append(f"plates_call_seconds_sum{{{label}}} {stats['total_ms'] / 1e3!r}")
+        lines.append(f"plates_call_seconds_count{{{label}}} {stats['calls']}")
+
+    for field, kind, description in (
+        ("hits", "counter", "Lookups found in the cache."),
+        ("misses", "counter", "Lookups not found in the cache."),
+        ("size", "gauge", "Entries held by the cache."),
+    ):
+        metric = f"plates_cache_{field}" + ("_total" if kind == "counter" else "")
+        lines += _metric(metric, kind, description)
+        for name, stats in caches.items():
+            lines.append(f'{metric}{{cache="{name}"}} {stats[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    """
+    Writes the current snapshot to path in the Prometheus text format,
+    replacing the file atomically, as the textfile collector of the
+    node exporter expects.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(to_prometheus())
+    os.replace(tmp_path, path)
+
+
+def serve_prometheus(
+    port: int = DEFAULT_PROMETHEUS_PORT, host: str = DEFAULT_PROMETHEUS_HOST
+) -> Any:
+    """
+    Starts answering HTTP requests on host and port (local only by
+    default) with the current snapshot in the Prometheus text format,
+    from a daemon thread. Returns the HTTPServer, whose shutdown
+    method stops it.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            body = to_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = HTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if os.environ.get(ENV_VAR, "") not in ("", "0"):
+    instrument(True)
@@ -0,0 +1,326 @@
+"""
+Functions to walk contiguous ranges of plates of a pattern.
+"""
+from typing import (
+    cast,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    NoReturn,
+)
+
+from plates import core
+
+
+Bound = Union[str, int]
+
+# partition splits the pattern at the shortest prefix with at least this
+# many prefixes per shard (or at the full pattern), so that shard sizes
+# differ by at most one prefix, a fraction of this of their size
+PREFIXES_PER_SHARD: int = 64
+
+
+class Shard(NamedTuple):
+    """
+    A contiguous range of plates of a pattern, from the index start
+    to the index stop, both included. Shards are numbered from 1.
+    """
+
+    number: int
+    start: int
+    stop: int
+    first: str
+    last: str
+
+    @property
+    def size(self) -> int:
+        return self.stop - self.start + 1
+
+
+def _bound_index(
+    compiled: core.CompiledPattern, bound: Optional[Bound], default: int
+) -> Union[int, NoReturn]:
+    """
+    Returns the index corresponding to a bound of a range, which
+    may be given either as a plate or as an index.
+    """
+    if bound is None:
+        return default
+    if isinstance(bound, str):
+        return compiled.get_plate_index(bound)
+    if not 1 <= bound <= compiled.combinations():
+        raise ValueError(
+            f"index must be between 1 and {compiled.combinations()}, received {bound}"
+        )
+    return bound
+
+
+def _odometer(
+    compiled: core.CompiledPattern, start: int, count: int, step: int
+) -> Iterator[bytearray]:
+    """
+    Yields count plates as the same bytearray, modified in place,
+    starting at the plate with index start and moving step plates
+    each time. The symbols are kept as a mixed radix counter, so
+    moving to the next plate only touches the positions that carry.
+    """
+    alphabets = [a.encode("ascii") for a in compiled.alphabets]
+    radices = compiled.radices
+
+    values: List[int] = []
+    rem = start - 1
+    for factor in compiled.factors:
+        val, rem = divmod(rem, factor)
+        values.append(val)
+    plate = bytearray(alphabets[pos][val] for pos, val in enumerate(values))
+
+    last = len(values) - 1
+    for _ in range(count - 1):
+        yield plate
+        carry, pos = step, last
+        while carry:
+            carry, values[pos] = divmod(values[pos] + carry, radices[pos])
+            plate[pos] = alphabets[pos][values[pos]]
+            pos -= 1
+    if count > 0:
+        yield plate
+
+
+def _range_args(
+    pattern: str, start: Optional[Bound], stop: Optional[Bound], step: int
+) -> Union[Tuple[core.CompiledPattern, int, int], NoReturn]:
+    if step < 1:
+        raise ValueError(f"step must be a positive integer, received {step}")
+    compiled = core.compile(pattern)
+    first = _bound_index(compiled, start, 1)
+    last = _bound_index(compiled, stop, compiled.combinations())
+    count = (last - first) // step + 1 if last >= first else 0
+    return compiled, first, count
+
+
+def iter_plates(
+    pattern: str,
+    start: Optional[Bound] = None,
+    stop: Optional[Bound] = None,
+    step: int = 1,
+) -> Iterator[str]:
+    """
+    Yields the plates of the pattern from start to stop, both included,
+    moving step plates each time. The bounds can be either plates or
+    indices, and default to the first and last plates of the pattern.
+    >>> list(iter_plates("CD", "A8", "B1"))
+    ["A8", "A9", "B0", "B1"]
+    >>> list(iter_plates("CD", 1, 30, step=10))
+    ["A0", "B0", "C0"]
+    """
+    compiled, first, count = _range_args(pattern, start, stop, step)
+    for plate in _odometer(compiled, first, count, step):
+        yield plate.decode("ascii")
+
+
+def iter_plate_chunks(
+    pattern: str,
+    size: int,
+    start: Optional[Bound] = None,
+    stop: Optional[Bound] = None,
+    step: int = 1,
+    as_bytes: bool = False,
+    sep: bytes = b"\n",
+) -> Iterator[Union[List[str], bytes]]:
+    """
+    Same as iter_plates, but yields the plates in chunks of size
+    plates (the last one may be shorter). Each chunk is a list of
+    strings, or, if as_bytes is True, a single bytes buffer where
+    every plate is followed by sep, ready to be written to a file.
+    >>> list(iter_plate_chunks("CD", 2, "A8", "B0", as_bytes=True))
+    [b"A8\\nA9\\n", b"B0\\n"]
+    """
+    if size < 1:
+        raise ValueError(f"size must be a positive integer, received {size}")
+    compiled, first, count = _range_args(pattern, start, stop, step)
+
+    if as_bytes:
+        buffer = bytearray()
+        n = 0
+        for plate in _odometer(compiled, first, count, step):
+            buffer += plate
+            buffer += sep
+            n += 1
+            if n == size:
+                yield bytes(buffer)
+                buffer.clear()
+                n = 0
+        if n:
+            yield bytes(buffer)
+        return
+
+    chunk: List[str] = []
+    for plate in _odometer(compiled, first, count, step):
+        chunk.append(plate.decode("ascii"))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def partition(pattern: str, n_shards: int) -> Union[List[Shard], NoReturn]:
+    """
+    Splits the plates of the pattern into n_shards contiguous shards,
+    which together hold every plate once. Shards start and end at the
+    boundaries between prefixes of the same length, that is, each shard
+    holds every plate starting with some of the prefixes, and the number
+    of prefixes of each shard differs by at most one.
+    If n_shards is greater than the number of plates, raises ValueError.
+    >>> partition("CCCDDDD", 4)
+    [Shard(number=1, start=1, stop=43940000, first="AAA0000", last="GMZ9999"), ...]
+    """
+    compiled = core.compile(pattern)
+    total = compiled.combinations()
+    if not 1 <= n_shards <= total:
+        raise ValueError(f"n_shards must be between 1 and {total}, received {n_shards}")
+
+    # Number of prefixes, and number of plates starting with each of them
+    prefixes, size = 1, total
+    for radix, factor in zip(compiled.radices, compiled.factors):
+        if prefixes >= n_shards * PREFIXES_PER_SHARD:
+            break
+        prefixes, size = prefixes * radix, factor
+
+    shards = []
+    for i in range(n_shards):
+        start = i * prefixes // n_shards * size + 1
+        stop = (i + 1) * prefixes // n_shards * size
+        shards.append(
+            Shard(i + 1, start, stop, compiled._plate(start), compiled._plate(stop))
+        )
+    return shards
+
+
+def parse_shard(shard: str) -> Union[Tuple[int, int], NoReturn]:
+    """
+    Parses a shard given as "number/n_shards", such as "3/16".
+    If it is not valid, raises ValueError.
+    """
+    number, sep, n_shards = shard.partition("/")
+    if not sep or not number.isdecimal() or not n_shards.isdecimal():
+        raise ValueError(f"shard must be given as number/n_shards, received {shard}")
+    if not 1 <= int(number) <= int(n_shards):
+        raise ValueError(f"shard number must be between 1 and {n_shards}")
+    return int(number), int(n_shards)
+
+
+def iter_shard(
+    pattern: str,
+    number: int,
+    n_shards: int,
+    chunk_size: Optional[int] = None,
+) -> Iterator[Union[str, bytes]]:
+    """
+    Worker entry point, yielding the plates of the shard number out of
+    n_shards of the pattern (see partition), or, if chunk_size is given,
+    bytes buffers of up to chunk_size plates, each followed by a newline.
+    Workers only need their shard number to split a pattern between them.
+    >>> list(iter_shard("CD", 2, 2))[:2]
+    ["N0", "N1"]
+    """
+    shard = partition(pattern, n_shards)[number - 1]
+    if chunk_size is None:
+        yield from iter_plates(pattern, shard.start, shard.stop)
+        return
+    chunks = iter_plate_chunks(
+        pattern, chunk_size, shard.start, shard.stop, as_bytes=True
+    )
+    yield from cast(Iterator[bytes], chunks)
+
+
+def plate_distance(a: str, b: str) -> Union[int, NoReturn]:
+    """
+    Returns how many plates after plate a comes plate b, which is
+    negative if b comes before a. Both plates must have the same
+    pattern, otherwise raises ValueError.
+    >>> plate_distance("AA000AA", "AA001CD")
+    731
+    """
+    pattern = core.get_pattern(a)
+    if core.get_pattern(b) != pattern:
+        raise ValueError(f"Plates {a} and {b} do not have the same pattern")
+    values = core._SYMBOL_VALUES
+    return sum(
+        (values[y] - values[x]) * factor
+        for x, y, factor in zip(a, b, core.compile(pattern).factors)
+    )
+
+
+def advance_plate(
+    plate: str, n: int, overflow: Optional[str] = None
+) -> Union[Optional[str], NoReturn]:
+    """
+    Returns the plate that comes n plates after the one given (or
+    before it, if n is negative). The offset is added to the symbols
+    of the plate from right to left, propagating the carry, so small
+    offsets only touch the last symbols.
+    If the result goes past the last plate of the pattern, follows the
+    overflow policy, as get_plate does. If it goes before the first
+    plate, raises ValueError, unless the policy is "wrap", in which
+    case it goes on from the last plate.
+    >>> advance_plate("AA999ZZ", 1)
+    "AB000AA"
+    """
+    return _advance_plate(plate, n, overflow, stacklevel=2)
+
+
+def _advance_plate(
+    plate: str, n: int, overflow: Optional[str], stacklevel: int
+) -> Union[Optional[str], NoReturn]:
+    # The warning is issued stacklevel frames above the caller
+    compiled = core.compile(core.get_pattern(plate))
+    values = core._SYMBOL_VALUES
+    symbols = list(plate)
+    carry, pos = n, len(symbols) - 1
+    while carry and pos >= 0:
+        carry, val = divmod(values[symbols[pos]] + carry, compiled.radices[pos])
+        symbols[pos] = compiled.alphabets[pos][val]
+        pos -= 1
+
+    if carry:
+        policy = core.check_overflow_policy(overflow)
+        # The symbols left after the carry are already the wrapped plate
+        if policy == "wrap":
+            return "".join(symbols)
+        if carry < 0:
+            raise ValueError(f"Plate {plate} has less than {-n} plates before it")
+        if policy == "clamp":
+            core.overflow_warning(stacklevel + 1)
+            return compiled.max_plate()
+        if policy == "raise":
+            raise core.IndexOverflowException(
+                compiled.pattern, compiled._index(plate) + n
+            )
+        return None
+    return "".join(symbols)
+
+
+def next_plate(
+    plate: str, overflow: Optional[str] = None
+) -> Union[Optional[str], NoReturn]:
+    """
+    Returns the plate that comes after the one given.
+    >>> next_plate("AAA009")
+    "AAA010"
+    """
+    return _advance_plate(plate, 1, overflow, stacklevel=2)
+
+
+def prev_plate(
+    plate: str, overflow: Optional[str] = None
+) -> Union[Optional[str], NoReturn]:
+    """
+    Returns the plate that comes before the one given.
+    >>> prev_plate("AAA010")
+    "AAA009"
+    """
+    return _advance_plate(plate, -1, overflow, stacklevel=2)
@@ -0,0 +1,604 @@
+"""
+Lazy access to the data shipped with the module in data.json.
+The file is parsed once, the first time any of its sections is used,
+and the parsed data is shared by every module that needs it.
+
+The standard patterns are also precompiled into a binary artifact,
+data.bin, holding the ISO codes, the expanded patterns, their positional
+factors, their number of combinations and the symbols of their
+alphabets. The artifact is memory mapped and read on demand, so its
+size does not affect import time nor resident memory. It is built the
+first time it is needed (or by running `python -m plates.registry`)
+in the user cache directory (PLATES_CACHE_DIR, if set), and rebuilt
+whenever the size or modification time of data.json change.
+If it can not be written, data.json is used instead.
+"""
+import functools
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from plates.core import CompiledPattern
+
+
+CACHE_DIR_ENV_VAR = "PLATES_CACHE_DIR"
+
+
+def _cache_dir() -> str:
+    """
+    Returns the directory the artifact is written to: the one set in
+    CACHE_DIR_ENV_VAR, or otherwise the user cache directory of the
+    platform, as the package directory may not be writable.
+    """
+    path = os.environ.get(CACHE_DIR_ENV_VAR)
+    if path:
+        return path
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser(
+            os.path.join("~", "AppData", "Local")
+        )
+    elif sys.platform == "darwin":
+        base = os.path.expanduser(os.path.join("~", "Library", "Caches"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+            os.path.join("~", ".cache")
+        )
+    return os.path.join(base, "plates")
+
+
+# os.path and a deferred json import keep the import of the module cheap
+PATH = os.path.join(os.path.dirname(__file__), "data.json")
+# Named after the location of data.json, so that every installation
+# of the module has its own
+ARTIFACT_PATH = os.path.join(
+    _cache_dir(), f"data-{zlib.crc32(PATH.encode('utf-8')):08x}.bin"
+)
+
+STD_SECTION = "Standard Plate Patterns"
+ALPHABETS_SECTION = "Alphabets"
+
+_MAGIC = b"PLATEREG"
+_VERSION = 4
+# magic, version, size and modification time (in nanoseconds) of
+# data.json, CRC-32 of its standard patterns and of its alphabets,
+# number of codes, number of unique patterns, and size of the strings
+# blob
+_HEADER = struct.Struct("<8sHQqIIIII")
+# offsets and lengths of the code and its pattern as written in
+# data.json within the strings blob, and number of its expanded pattern
+_CODE = struct.Struct("<IHIHI")
+# offset and length of the expanded pattern within the strings blob,
+# offset of its combinations and factors within the numbers blob, and
+# offset and length of its alphabets within the strings blob (empty if
+# it uses the default ones)
+_PATTERN = struct.Struct("<IHIIH")
+_INDEX = struct.Struct("<I")
+_INT_LEN = struct.Struct("<H")
+
+# Increased every time data.json is parsed or the registry is loaded,
+# so that data derived from them can tell when it is out of date
+_generation: int = 0
+
+T = TypeVar("T")
+
+
+@functools.lru_cache(maxsize=None)
+def load_data() -> Dict[str, Any]:
+    """
+    Parses data.json and returns its "License Plates" section.
+    """
+    import json
+
+    global _generation
+    _generation += 1
+    with open(PATH) as f:
+        data: Dict[str, Any] = json.load(f)["License Plates"]
+    return data
+
+
+class LazySection(MutableMapping[str, Any]):
+    """
+    A dictionary holding one of the sections of data.json,
+    which is only loaded when its contents are first accessed.
+    Setting or deleting its keys changes its version, which tells the
+    caches built from it to compute their values again. Values modified
+    in place, such as ISO_3166["USA"]["CALIFORNIA"], are not tracked, so
+    invalidate must be called after modifying them.
+    """
+
+    def __init__(self, section: str) -> None:
+        self.section = section
+        self.modifications = 0
+
+    @property
+    def data(self) -> Dict[str, Any]:
+        section: Dict[str, Any] = load_data()[self.section]
+        return section
+
+    @property
+    def version(self) -> Tuple[int, int]:
+        """
+        Changes whenever the section is modified or loaded again.
+        """
+        return _generation, self.modifications
+
+    def invalidate(self) -> None:
+        """
+        Changes the version of the section, as modifying it does.
+        """
+        self.modifications += 1
+
+    def __getitem__(self, key: str) -> Any:
+        return self.data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.data[key] = value
+        self.invalidate()
+
+    def __delitem__(self, key: str) -> None:
+        del self.data[key]
+        self.invalidate()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.data
+
+    def __repr__(self) -> str:
+        return repr(self.data)
+
+
+class CacheInfo(NamedTuple):
+    """
+    Statistics of a cache, with the same fields as those of the
+    caches of functools.lru_cache.
+    """
+
+    hits: int
+    misses: int
+    maxsize: Optional[int]
+    currsize: int
+
+
+class VersionedCache(Generic[T]):
+    """
+    Caches the result of a function taking no arguments, which is
+    computed again only when the version of any of the sections it
+    depends on has changed since it was last computed.
+    """
+
+    def __init__(self, f: Callable[[], T], sections: Tuple[LazySection, ...]) -> None:
+        functools.update_wrapper(self, f)
+        self.f = f
+        self.sections = sections
+        self._key: Optional[Tuple[Tuple[int, int], ...]] = None
+        self._value: Optional[T] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self) -> T:
+        key = tuple(section.version for section in self.sections)
+        if key != self._key or self._value is None:
+            self.misses += 1
+            self._value = self.f()
+            # Computing the value may load the sections for the first time
+            self._key = tuple(section.version for section in self.sections)
+        else:
+            self.hits += 1
+        return self._value
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, 1, int(self._value is not None))
+
+    def cache_clear(self) -> None:
+        self._key = self._value = None
+        self.hits = self.misses = 0
+
+
+def cached_by_version(
+    *sections: LazySection,
+) -> Callable[[Callable[[], T]], VersionedCache[T]]:
+    """
+    Decorator caching a function with VersionedCache.
+    """
+
+    def decorator(f: Callable[[], T]) -> VersionedCache[T]:
+        return VersionedCache(f, sections)
+
+    return decorator
+
+
+def _encode_int(n: int) -> bytes:
+    raw = n.to_bytes((n.bit_length() + 7) // 8, "big")
+    return _INT_LEN.pack(len(raw)) + raw
+
+
+def _encode_alphabets(type_alphabets: Dict[str, str]) -> str:
+    # Each type of position followed by its symbols, separated by commas
+    return ",".join(symb + alphabet for symb, alphabet in type_alphabets.items())
+
+
+def _decode_alphabets(encoded: str) -> Dict[str, str]:
+    return {part[0]: part[1:] for part in encoded.split(",")}
+
+
+def _section_crc(section: Mapping[str, Any]) -> int:
+    # Keys are not sorted, as their order is kept by the registry
+    import json
+
+    return zlib.crc32(json.dumps(section).encode("utf-8"))
+
+
+def build_registry(path: Optional[str] = None) -> None:
+    """
+    Precompiles the standard patterns of data.json into the binary
+    artifact at path (ARTIFACT_PATH by default), creating its directory
+    if needed. The file is replaced atomically, so concurrent readers
+    never see a partial artifact.
+    """
+    import json
+    from plates.core import ALPHABETS, CompiledPattern
+
+    if path is None:
+        path = ARTIFACT_PATH
+    # Taken before reading, so that a later change is always noticed
+    stat = os.stat(PATH)
+    with open(PATH, "rb") as data_file:
+        raw = data_file.read()
+    data = json.loads(raw)["License Plates"]
+    patterns: Dict[str, str] = data[STD_SECTION]
+
+    strings = bytearray()
+    numbers = bytearray()
+    code_records: List[bytes] = []
+    pattern_records: List[bytes] = []
+    pattern_ids: Dict[str, int] = {}
+
+    def add_string(string: str) -> Tuple[int, int]:
+        encoded = string.encode("utf-8")
+        strings.extend(encoded)
+        return len(strings) - len(encoded), len(encoded)
+
+    for code, source in patterns.items():
+        compiled = CompiledPattern(source)
+        if compiled.pattern not in pattern_ids:
+            pattern_ids[compiled.pattern] = len(pattern_ids)
+            offset, length = add_string(compiled.pattern)
+            alphabets = compiled.type_alphabets
+            encoded = "" if alphabets is ALPHABETS else _encode_alphabets(alphabets)
+            pattern_records.append(
+                _PATTERN.pack(offset, length, len(numbers), *add_string(encoded))
+            )
+            numbers.extend(_encode_int(compiled.combinations()))
+            for factor in compiled.factors:
+                numbers.extend(_encode_int(factor))
+        code_records.append(
+            _CODE.pack(
+                *add_string(code), *add_string(source), pattern_ids[compiled.pattern]
+            )
+        )
+
+    # Numbers of the codes sorted by code, to look them up by binary search
+    codes = list(patterns)
+    sorted_ids = sorted(range(len(codes)), key=codes.__getitem__)
+
+    header = _HEADER.pack(
+        _MAGIC,
+        _VERSION,
+        stat.st_size,
+        stat.st_mtime_ns,
+        _section_crc(patterns),
+        _section_crc(data[ALPHABETS_SECTION]),
+        len(code_records),
+        len(pattern_records),
+        len(strings),
+    )
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.writelines(code_records)
+            f.writelines(_INDEX.pack(i) for i in sorted_ids)
+            f.writelines(pattern_records)
+            f.write(strings)
+            f.write(numbers)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class PatternRegistry(Mapping[str, str]):
+    """
+    Read only view of a precompiled registry, mapping each ISO code to
+    its pattern as written in data.json. Records are decoded from the
+    underlying buffer (usually a memory mapped file) only when accessed.
+    """
+
+    def __init__(self, buffer: Any) -> None:
+        (
+            magic,
+            version,
+            self.size,
+            self.mtime_ns,
+            self.patterns_crc,
+            self.alphabets_crc,
+            self._n_codes,
+            n_patterns,
+            strings_len,
+        ) = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Buffer does not hold a precompiled registry")
+        self._buffer = buffer
+        self._codes_at: int = _HEADER.size
+        self._index_at: int = self._codes_at + self._n_codes * _CODE.size
+        self._patterns_at: int = self._index_at + self._n_codes * _INDEX.size
+        self._strings_at: int = self._patterns_at + n_patterns * _PATTERN.size
+        self._numbers_at: int = self._strings_at + strings_len
+
+    @classmethod
+    def open(cls, path: str) -> Optional["PatternRegistry"]:
+        """
+        Memory maps the artifact at path. Returns None if it
+        does not exist or does not hold a valid registry.
+        """
+        try:
+            with open(path, "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(buffer)
+        except (ValueError, struct.error):
+            # Not kept mapped, so that it can be replaced
+            buffer.close()
+            return None
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return bytes(self._buffer[start : start + length]).decode("utf-8")
+
+    def _record(self, i: int) -> Tuple[int, int, int, int, int]:
+        record: Tuple[int, int, int, int, int] = _CODE.unpack_from(
+            self._buffer, self._codes_at + i * _CODE.size
+        )
+        return record
+
+    def _code(self, i: int) -> str:
+        code_offset, code_len, *_ = self._record(i)
+        return self._string(code_offset, code_len)
+
+    def _find(self, code: str) -> int:
+        # Binary search over the codes sorted by the index table
+        lo, hi = 0, self._n_codes
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (i,) = _INDEX.unpack_from(self._buffer, self._index_at + mid * _INDEX.size)
+            found = self._code(i)
+            if found == code:
+                return int(i)
+            if found < code:
+                lo = mid + 1
+            else:
+                hi = mid
+        raise KeyError(code)
+
+    def __getitem__(self, code: str) -> str:
+        *_, source_offset, source_len, _ = self._record(self._find(code))
+        return self._string(source_offset, source_len)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self._code(i) for i in range(self._n_codes))
+
+    def __len__(self) -> int:
+        return int(self._n_codes)
+
+    def __contains__(self, code: object) -> bool:
+        try:
+            self._find(str(code))
+        except KeyError:
+            return False
+        return True
+
+    def is_fresh(self, size: int, mtime_ns: int) -> bool:
+        """
+        Checks if the registry was built from a data.json
+        with the size and modification time given.
+        """
+        return bool(self.size == size and self.mtime_ns == mtime_ns)
+
+    def matches(
+        self, patterns: Mapping[str, Any], alphabets: Optional[Mapping[str, Any]]
+    ) -> bool:
+        """
+        Checks if the registry was built from the standard patterns
+        and alphabets given (alphabets are not checked if None).
+        """
+        if _section_crc(patterns) != self.patterns_crc:
+            return False
+        return alphabets is None or _section_crc(alphabets) == self.alphabets_crc
+
+    def close(self) -> None:
+        """
+        Releases the buffer, if it is a memory mapped file.
+        """
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def compiled(self, code: str) -> "CompiledPattern":
+        """
+        Returns the CompiledPattern of the code, built from the expanded
+        pattern, factors, combinations and alphabets precomputed.
+        """
+        from plates.core import ALPHABET_SEPARATOR, CompiledPattern
+
+        *_, source_offset, source_len, pattern_id = self._record(self._find(code))
+        (
+            offset,
+            length,
+            numbers_offset,
+            alphabets_offset,
+            alphabets_len,
+        ) = _PATTERN.unpack_from(
+            self._buffer, self._patterns_at + pattern_id * _PATTERN.size
+        )
+        pattern = self._string(offset, length)
+        type_alphabets = None
+        if alphabets_len:
+            type_alphabets = _decode_alphabets(
+                self._string(alphabets_offset, alphabets_len)
+            )
+
+        ints: List[int] = []
+        at = self._numbers_at + numbers_offset
+        for _ in range(len(pattern.partition(ALPHABET_SEPARATOR)[0]) + 1):
+            (int_len,) = _INT_LEN.unpack_from(self._buffer, at)
+            at += _INT_LEN.size
+            ints.append(int.from_bytes(self._buffer[at : at + int_len], "big"))
+            at += int_len
+
+        combinations, *factors = ints
+        return CompiledPattern.from_precomputed(
+            self._string(source_offset, source_len),
+            pattern,
+            tuple(factors),
+            combinations,
+            type_alphabets,
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def load_registry() -> Optional[PatternRegistry]:
+    """
+    Returns the precompiled registry of standard patterns, building it
+    first if it is missing or was built from another data.json.
+    Returns None if the artifact can not be built, in which case
+    data.json must be used instead.
+    """
+    global _generation
+    _generation += 1
+    # Comparing the size and modification time avoids reading data.json
+    stat = os.stat(PATH)
+    registry = PatternRegistry.open(ARTIFACT_PATH)
+    if registry is not None:
+        if registry.is_fresh(stat.st_size, stat.st_mtime_ns):
+            return registry
+        # A file mapped in memory can not be replaced on Windows
+        registry.close()
+
+    try:
+        build_registry(ARTIFACT_PATH)
+    except OSError:
+        return None
+    registry = PatternRegistry.open(ARTIFACT_PATH)
+    if registry is not None and registry.is_fresh(stat.st_size, stat.st_mtime_ns):
+        return registry
+    return None
+
+
+# Functions clearing the caches of data read from the registry,
+# called by clear_registry
+_clear_hooks: List[Callable[[], None]] = []
+
+
+def clear_registry() -> None:
+    """
+    Forgets the registry returned by load_registry, and the data read
+    from it, so that it is loaded again the next time it is needed.
+    """
+    load_registry.cache_clear()
+    for clear in _clear_hooks:
+        clear()
+
+
+class StandardPatterns(LazySection):
+    """
+    The "Standard Plate Patterns" section of data.json. While it and the
+    section of the alphabets given hold what data.json does, it is read
+    from the precompiled registry when available, so data.json does not
+    need to be parsed to look up a pattern.
+    """
+
+    def __init__(self, alphabets: Optional[LazySection] = None) -> None:
+        super().__init__(STD_SECTION)
+        self.alphabets = alphabets
+        # Registry and versions of the sections last checked against it
+        self._checked: Optional[PatternRegistry] = None
+        self._checked_versions: Tuple[Any, ...] = ()
+        self._matches = False
+
+    def _versions(self) -> Tuple[Any, ...]:
+        if self.alphabets is None:
+            return (self.version,)
+        return self.version, self.alphabets.version
+
+    def precompiled(self) -> Optional[PatternRegistry]:
+        """
+        Returns the precompiled registry, or None if it is not available
+        or the contents of the sections differ from those it was built
+        from. They are only compared once the sections are modified, and
+        again whenever their versions change, so undoing the changes
+        makes the registry available again.
+        """
+        registry = load_registry()
+        if registry is None:
+            return None
+        if not self.modifications and (
+            self.alphabets is None or not self.alphabets.modifications
+        ):
+            return registry
+        versions = self._versions()
+        if registry is not self._checked or versions != self._checked_versions:
+            alphabets = None if self.alphabets is None else self.alphabets.data
+            self._matches = registry.matches(self.data, alphabets)
+            self._checked, self._checked_versions = registry, versions
+        return registry if self._matches else None
+
+    def _reader(self) -> Mapping[str, Any]:
+        registry = self.precompiled()
+        return self.data if registry is None else registry
+
+    def __getitem__(self, key: str) -> Any:
+        return self._reader()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._reader())
+
+    def __len__(self) -> int:
+        return len(self._reader())
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._reader()
+
+    def __repr__(self) -> str:
+        return repr(dict(self._reader()))
+
+
+if __name__ == "__main__":
+    build_registry()
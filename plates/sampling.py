@@ -0,0 +1,113 @@
+"""
+Functions to draw distinct plates of a pattern in a random order.
+"""
+import random
+import sys
+from typing import Iterator, List, Optional, Union, NoReturn
+
+from plates import core
+
+
+FEISTEL_ROUNDS: int = 6
+
+_MIX_MULTIPLIER: int = 0x9E3779B97F4A7C15
+_MASK_64: int = (1 << 64) - 1
+
+
+class IndexPermutation:
+    """
+    A keyed bijection of the integers in [0, size), built from a
+    balanced Feistel network over the smallest even number of bits
+    covering size. Values that fall outside the range are mapped
+    again until they land inside it (cycle walking), which takes
+    less than four rounds of the network on average.
+    It uses O(1) memory whatever the size, so it can be used to walk
+    a random order of every plate of a pattern without storing it.
+    This is meant for sampling, not for cryptographic use.
+    >>> perm = IndexPermutation(10, seed=0)
+    >>> sorted(perm(i) for i in range(10))
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9]
+    """
+
+    __slots__ = ("size", "_half_bits", "_half_mask", "_keys")
+
+    def __init__(self, size: int, seed: Optional[int] = None) -> None:
+        if size < 1:
+            raise ValueError(f"size must be a positive integer, received {size}")
+        self.size = size
+        self._half_bits: int = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._half_mask: int = (1 << self._half_bits) - 1
+        rng = random.Random(seed)
+        self._keys: List[int] = [rng.getrandbits(64) for _ in range(FEISTEL_ROUNDS)]
+
+    def _round(self, key: int, half: int) -> int:
+        # Multiply and xor-shift mixing of a half with the round key
+        x = ((half ^ key) * _MIX_MULTIPLIER) & _MASK_64
+        x ^= x >> 29
+        x = (x * _MIX_MULTIPLIER) & _MASK_64
+        x ^= x >> 32
+        return x & self._half_mask
+
+    def _permute(self, x: int) -> int:
+        bits, mask = self._half_bits, self._half_mask
+        left, right = x >> bits, x & mask
+        for key in self._keys:
+            left, right = right, left ^ self._round(key, right)
+        return (left << bits) | right
+
+    def __call__(self, index: int) -> int:
+        if not 0 <= index < self.size:
+            raise IndexError(f"index {index} out of range for size {self.size}")
+        index = self._permute(index)
+        while index >= self.size:
+            index = self._permute(index)
+        return index
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def sample_plates(
+    pattern: str, k: int, seed: Optional[int] = None
+) -> Union[List[str], NoReturn]:
+    """
+    Returns a list of k distinct plates of the pattern, in a random
+    order. Memory used is proportional to k, not to the number of
+    combinations of the pattern, which may be more than sys.maxsize.
+    If k is greater than the number of combinations, raises ValueError
+    >>> sample_plates("CD", 3, seed=0)
+    ["T7", "V5", "C0"]
+    """
+    compiled = core.compile(pattern)
+    total = compiled.combinations()
+    if not 0 <= k <= total:
+        raise ValueError(f"k must be between 0 and {total}, received {k}")
+    if total > sys.maxsize:
+        # random.sample needs the length of the range, which does not fit
+        permutation = IndexPermutation(total, seed)
+        return [compiled._plate(permutation(i) + 1) for i in range(k)]
+    indices = random.Random(seed).sample(range(1, total + 1), k)
+    return [compiled._plate(index) for index in indices]
+
+
+def iter_sample(
+    pattern: str, k: Optional[int] = None, seed: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Lazily yields k distinct plates of the pattern in a random order,
+    or every plate of the pattern if k is not given, using the same
+    memory whatever k is. The order is given by an IndexPermutation
+    keyed by seed, so the same seed always yields the same plates.
+    >>> sorted(iter_sample("D", seed=0))
+    ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]
+    """
+    compiled = core.compile(pattern)
+    total = compiled.combinations()
+    if k is None:
+        k = total
+    elif not 0 <= k <= total:
+        raise ValueError(f"k must be between 0 and {total}, received {k}")
+
+    permutation = IndexPermutation(total, seed)
+    for i in range(k):
+        yield compiled._plate(permutation(i) + 1)
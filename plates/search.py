@@ -0,0 +1,167 @@
+"""
+Search of the plates matching a partial plate, such as one read by a
+witness or a low quality camera, where some symbols are unknown or are
+one of a few possible symbols.
+"""
+import itertools
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, NoReturn
+
+from plates import core
+from plates.classify import pattern_index
+
+
+WILDCARD = "?"
+
+# Symbols allowed at a position of a query, None meaning any symbol
+QuerySymbols = Optional[str]
+
+
+def _are_symbols(chars: str) -> bool:
+    return all(char in core._SYMBOL_VALUES for char in chars)
+
+
+def parse_query(query: str) -> Union[Tuple[QuerySymbols, ...], NoReturn]:
+    """
+    Takes a partial plate, where each position is either a symbol,
+    WILDCARD for an unknown symbol, or a set of symbols between
+    brackets, and returns the symbols allowed at each position.
+    If the query is not valid, raises ValueError.
+    >>> parse_query("AB?1[0O]")
+    ("A", "B", None, "1", "0O")
+    """
+    positions: List[QuerySymbols] = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char == WILDCARD:
+            positions.append(None)
+        elif char == "[":
+            end = query.find("]", i)
+            symbols = query[i + 1 : end]
+            if end == -1 or not symbols or not _are_symbols(symbols):
+                raise ValueError(
+                    f"Query {query} is not valid: "
+                    f"bad set of symbols at position {i}"
+                )
+            positions.append("".join(sorted(set(symbols))))
+            i = end
+        elif _are_symbols(char):
+            positions.append(char)
+        else:
+            raise ValueError(
+                f"Query {query} is not valid: unexpected character {char!r} "
+                f"at position {i}"
+            )
+        i += 1
+    return tuple(positions)
+
+
+class PartialMatch:
+    """
+    The plates of a pattern matching a query: at each position, the
+    symbols of the alphabet of the pattern allowed by the query, ordered
+    by value. Plates are yielded lazily, in index order.
+    """
+
+    def __init__(
+        self,
+        compiled: core.CompiledPattern,
+        symbols: Tuple[str, ...],
+        iso_codes: Tuple[str, ...] = (),
+    ) -> None:
+        self.compiled = compiled
+        self.symbols = symbols
+        self.iso_codes = iso_codes
+
+    @property
+    def pattern(self) -> str:
+        return self.compiled.pattern
+
+    def count(self) -> int:
+        """
+        Returns the number of plates matching, without enumerating them.
+        """
+        total = 1
+        for symbols in self.symbols:
+            total *= len(symbols)
+        return total
+
+    def __iter__(self) -> Iterator[str]:
+        # The product varies the last position fastest, as indices do
+        for plate in itertools.product(*self.symbols):
+            yield "".join(plate)
+
+    def indices(self) -> Iterator[int]:
+        """
+        Yields the indices of the plates matching, in increasing order.
+        """
+        values = self.compiled._symbol_values
+        weighted = [
+            [values[symbol] * factor for symbol in symbols]
+            for symbols, factor in zip(self.symbols, self.compiled.factors)
+        ]
+        for terms in itertools.product(*weighted):
+            yield sum(terms) + 1
+
+    def __repr__(self) -> str:
+        return (
+            f"{type(self).__name__}({self.pattern!r}, "
+            f"count={self.count()}, iso_codes={self.iso_codes})"
+        )
+
+
+def match_partial(
+    query: str, patterns: Optional[Iterable[str]] = None
+) -> Union[List[PartialMatch], NoReturn]:
+    """
+    Returns a PartialMatch for each of the patterns given (every pattern
+    of STD_PATTERNS by default) that has some plate matching the query
+    (see parse_query), in the order the patterns were given. Patterns
+    of another length, or with a position whose alphabet has none of the
+    symbols allowed there, are discarded without looking at their plates.
+    >>> matches = match_partial("AB?12?C")
+    >>> [(m.pattern, m.iso_codes, m.count()) for m in matches]
+    [("CCDDDCC", ("AR-2", "HR"), 260), ("CCDDDCC@NO_IOQU", ("IT",), 220)]
+    >>> next(iter(matches[0]))
+    "AB012AC"
+    """
+    positions = parse_query(query)
+    candidates: Dict[str, Tuple[str, ...]]
+    if patterns is None:
+        candidates = pattern_index()
+    else:
+        candidates = dict.fromkeys((core.compile(p).pattern for p in patterns), ())
+
+    matches = []
+    for pattern, iso_codes in candidates.items():
+        compiled = core.compile(pattern)
+        if len(compiled) != len(positions):
+            continue
+        symbols = tuple(
+            alphabet
+            if allowed is None
+            else "".join(symbol for symbol in alphabet if symbol in allowed)
+            for alphabet, allowed in zip(compiled.alphabets, positions)
+        )
+        if all(symbols):
+            matches.append(PartialMatch(compiled, symbols, iso_codes))
+    return matches
+
+
+def count_partial(query: str, patterns: Optional[Iterable[str]] = None) -> int:
+    """
+    Returns the number of plates matching the query within the patterns
+    given (every pattern of STD_PATTERNS by default).
+    >>> count_partial("AB?12?C", ["CCDDDCC"])
+    260
+    """
+    return sum(match.count() for match in match_partial(query, patterns))
+
+
+def iter_partial(query: str, patterns: Optional[Iterable[str]] = None) -> Iterator[str]:
+    """
+    Lazily yields every plate matching the query, pattern by pattern
+    as returned by match_partial, and in index order within each of them.
+    """
+    for match in match_partial(query, patterns):
+        yield from match
@@ -0,0 +1,433 @@
+"""
+An asyncio server answering plate lookups over a line delimited JSON
+protocol, on a TCP port or a Unix socket. Start it with
+
+    python -m plates serve --port 7878
+
+Each request is a JSON object in its own line, with the name of the
+operation, its arguments and an optional id, which is sent back with
+the response, since responses are written as soon as they are ready
+and may come in a different order than their requests:
+
+    {"id": 1, "op": "get_plate", "args": {"pattern": "2C3D2C", "index": 732}}
+    {"id": 1, "result": "AA001CD"}
+
+Errors are returned in the same way, with a type and a message:
+
+    {"id": 2, "error": {"type": "overflow", "message": "..."}}
+
+Requests of the same operation arriving together, from one or many
+connections, are answered as a batch, which goes through the vectorized
+functions of plates.bulk when NumPy is installed. The "stats" operation
+returns the throughput and latency counters of the server, and the
+"profile" operation the counters of plates.profiling, which are only
+recorded if the server was started with PLATES_INSTRUMENT=1.
+"""
+import asyncio
+import collections
+import json
+import socket
+import sys
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from plates import core, profiling
+from plates.classify import classify_plate
+
+try:
+    import numpy as np
+    from plates import bulk
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7878
+
+# Largest number of requests answered in a single batch
+MAX_BATCH_SIZE: int = 4096
+# Smallest batch handed to plates.bulk, smaller ones are answered one by one
+BULK_MIN_SIZE: int = 32
+# Number of recent requests the latency percentiles are computed over
+LATENCY_WINDOW: int = 4096
+
+Result = Any
+BatchHandler = Callable[[List[Dict[str, Any]]], List[Result]]
+
+
+def error_type(e: Exception) -> str:
+    if isinstance(e, core.IndexOverflowException):
+        return "overflow"
+    if isinstance(e, core.PatternNotValidException):
+        return "pattern_not_valid"
+    if isinstance(e, core.PlateNotValidException):
+        return "plate_not_valid"
+    return "bad_request"
+
+
+def _each(f: Callable[..., Any]) -> BatchHandler:
+    """
+    Returns a batch handler calling f once for each request.
+    """
+
+    def handler(batch: List[Dict[str, Any]]) -> List[Result]:
+        results: List[Result] = []
+        for kwargs in batch:
+            try:
+                results.append(f(**kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    return handler
+
+
+def _checked_index(compiled: core.CompiledPattern, index: Any) -> int:
+    if not isinstance(index, int) or isinstance(index, bool):
+        raise TypeError(f"index must be an integer, received {index!r}")
+    if index < 1:
+        raise ValueError("index must be greater than 0")
+    if index > compiled.combinations():
+        raise core.IndexOverflowException(compiled.pattern, index)
+    return index
+
+
+def _checked_plate(plate: Any) -> str:
+    if not isinstance(plate, str):
+        raise TypeError(f"plate must be a string, received {plate!r}")
+    # get_pattern accepts any uppercase letter, but only those of the
+    # alphabets have a value
+    core.get_pattern(plate)
+    if not all(symbol in core._SYMBOL_VALUES for symbol in plate):
+        raise core.PlateNotValidException(plate)
+    return plate
+
+
+def _batch_get_plate(batch: List[Dict[str, Any]]) -> List[Result]:
+    results: List[Result] = [None] * len(batch)
+    # Positions and indices of the valid requests of each pattern
+    groups: Dict[str, List[Tuple[int, int]]] = {}
+    for i, kwargs in enumerate(batch):
+        try:
+            if set(kwargs) != {"pattern", "index"}:
+                raise TypeError("get_plate takes the arguments pattern and index")
+            compiled = core.compile(kwargs["pattern"])
+            index = _checked_index(compiled, kwargs["index"])
+        except Exception as e:
+            results[i] = e
+            continue
+        groups.setdefault(compiled.pattern, []).append((i, index))
+
+    for pattern, group in groups.items():
+        compiled = core.compile(pattern)
+        if np is not None and len(group) >= BULK_MIN_SIZE:
+            if compiled.combinations() <= bulk.INT64_MAX:
+                plates = bulk.get_plates(pattern, [index for _, index in group])
+                for (i, _), plate in zip(group, plates.tolist()):
+                    results[i] = plate.decode("ascii")
+                continue
+        for i, index in group:
+            results[i] = compiled.get_plate(index)
+    return results
+
+
+def _batch_get_plate_index(batch: List[Dict[str, Any]]) -> List[Result]:
+    results: List[Result] = [None] * len(batch)
+    # Positions of the valid plates of each length
+    groups: Dict[int, List[int]] = {}
+    for i, kwargs in enumerate(batch):
+        try:
+            if set(kwargs) != {"plate"}:
+                raise TypeError("get_plate_index takes the argument plate")
+            _checked_plate(kwargs["plate"])
+        except Exception as e:
+            results[i] = e
+            continue
+        groups.setdefault(len(kwargs["plate"]), []).append(i)
+
+    for group in groups.values():
+        if np is not None and len(group) >= BULK_MIN_SIZE:
+            plates = [batch[i]["plate"] for i in group]
+            try:
+                indices = bulk.get_plate_indices(plates).tolist()
+            except (OverflowError, ValueError, core.PlateNotValidException):
+                # Answered one by one, so that only the failing
+                # requests get the error
+                pass
+            else:
+                for i, index in zip(group, indices):
+                    results[i] = index
+                continue
+        for i in group:
+            results[i] = core.get_plate_index(batch[i]["plate"])
+    return results
+
+
+HANDLERS: Dict[str, BatchHandler] = {
+    "get_plate": _batch_get_plate,
+    "get_plate_index": _batch_get_plate_index,
+    "classify_plate": _each(lambda plate: list(classify_plate(plate))),
+    "combinations": _each(core.combinations),
+    "get_pattern": _each(core.get_pattern),
+    "matches_pattern": _each(core.matches_pattern),
+    "max_plate": _each(core.max_plate),
+    "min_plate": _each(core.min_plate),
+    "valid_pattern": _each(core.valid_pattern),
+}
+
+
+class ServerStats:
+    """
+    Throughput and latency counters of a server.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=LATENCY_WINDOW)
+        self.latency_total = 0.0
+
+    def record(self, latency: float, error: bool) -> None:
+        self.requests += 1
+        self.errors += error
+        self.latencies.append(latency)
+        self.latency_total += latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the counters as a dictionary. Latencies are in
+        milliseconds, and their percentiles and maximum are taken
+        over the last LATENCY_WINDOW requests.
+        """
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime": uptime,
+            "connections": self.connections,
+            "requests": self.requests,
+            "errors": self.errors,
+            "requests_per_second": self.requests / uptime if uptime else 0.0,
+            "batches": self.batches,
+            "mean_batch_size": (
+                self.batched_requests / self.batches if self.batches else 0.0
+            ),
+            "latency_ms": profiling.latency_summary(
+                self.latencies, self.latency_total, self.requests
+            ),
+        }
+
+
+class _Batcher:
+    """
+    Gathers the requests of one operation received in the same
+    iteration of the event loop, and answers them in a single call
+    to its handler, right after, or as soon as MAX_BATCH_SIZE are
+    waiting.
+    """
+
+    def __init__(self, handler: BatchHandler, stats: ServerStats) -> None:
+        self.handler = handler
+        self.stats = stats
+        self.pending: List[Tuple[Dict[str, Any], "asyncio.Future[Result]"]] = []
+
+    def submit(self, kwargs: Dict[str, Any]) -> "asyncio.Future[Result]":
+        loop = asyncio.get_event_loop()
+        future: "asyncio.Future[Result]" = loop.create_future()
+        self.pending.append((kwargs, future))
+        if len(self.pending) >= MAX_BATCH_SIZE:
+            self.flush()
+        elif len(self.pending) == 1:
+            loop.call_soon(self.flush)
+        return future
+
+    def flush(self) -> None:
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.stats.batches += 1
+        self.stats.batched_requests += len(batch)
+        try:
+            results = self.handler([kwargs for kwargs, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class PlateServer:
+    """
+    Server answering the operations of HANDLERS, plus "stats" and "profile".
+    Use start to listen on host and port (a free port is chosen if
+    port is 0), or on the Unix socket at path if given.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: Optional[str] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.path = path
+        self.stats = ServerStats()
+        self._batchers = {
+            op: _Batcher(handler, self.stats) for op, handler in HANDLERS.items()
+        }
+        self._server: Optional[Any] = None
+
+    async def start(self) -> None:
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=self.path
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._handle_connection, self.host, self.port
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+
+    async def wait_closed(self) -> None:
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    async def __aenter__(self) -> "PlateServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.close()
+        await self.wait_closed()
+
+    async def answer(self, request: Any) -> Dict[str, Any]:
+        """
+        Returns the response to a request, already parsed from JSON.
+        """
+        started = time.perf_counter()
+        request_id = request.get("id") if isinstance(request, dict) else None
+        response: Dict[str, Any] = {"id": request_id}
+        try:
+            if not isinstance(request, dict):
+                raise TypeError("Requests must be JSON objects")
+            op = request.get("op")
+            kwargs = request.get("args", {})
+            if not isinstance(kwargs, dict):
+                raise TypeError("args must be a JSON object")
+            if op == "stats":
+                response["result"] = self.stats.snapshot()
+            elif op == "profile":
+                response["result"] = profiling.snapshot()
+            elif op in self._batchers:
+                response["result"] = await self._batchers[op].submit(kwargs)
+            else:
+                raise ValueError(f"Unknown operation {op!r}")
+        except Exception as e:
+            response["error"] = {
+                "type": error_type(e),
+                "message": getattr(e, "msg", None) or str(e),
+            }
+        self.stats.record(time.perf_counter() - started, "error" in response)
+        return response
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            request = None
+            response = {
+                "id": None,
+                "error": {"type": "bad_request", "message": f"Invalid JSON: {e}"},
+            }
+            self.stats.record(0.0, True)
+        if request is not None:
+            response = await self.answer(request)
+        writer.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.stats.connections += 1
+        # Requests of a connection are answered concurrently,
+        # so that pipelined requests are batched together
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                await writer.drain()
+            if tasks:
+                await asyncio.gather(*tasks)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.stats.connections -= 1
+            writer.close()
+
+
+async def _serve(server: PlateServer) -> None:
+    await server.start()
+    where = server.path or f"{server.host}:{server.port}"
+    print(f"Serving plates on {where}", file=sys.stderr)
+    await server.wait_closed()
+
+
+def serve(
+    host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None
+) -> None:
+    """
+    Runs a PlateServer until interrupted.
+    """
+    server = PlateServer(host, port, path)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_serve(server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        loop.close()
+
+
+def request(
+    op: str,
+    args: Optional[Dict[str, Any]] = None,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    path: Optional[str] = None,
+) -> Any:
+    """
+    Sends a single request to the server listening on host and port,
+    or on the Unix socket at path, and returns its result.
+    If the server answers with an error, raises RuntimeError.
+    """
+    if path is not None:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(path)
+    else:
+        conn = socket.create_connection((host, port))
+    with conn, conn.makefile("rwb") as f:
+        f.write(json.dumps({"op": op, "args": args or {}}).encode() + b"\n")
+        f.flush()
+        response = json.loads(f.readline())
+    if "error" in response:
+        raise RuntimeError(response["error"]["message"])
+    return response["result"]
@@ -0,0 +1,130 @@
+"""
+The table of standard patterns shown by std_patterns_table, split into
+the rows it holds, which are computed once and cached until STD_PATTERNS
+or ISO_3166 change, and renderers writing them as a rich table, as
+delimited text (TSV or CSV), or as JSON.
+"""
+import sys
+from typing import Any, Callable, Dict, NamedTuple, Optional, TextIO, Tuple
+
+from plates import core, registry
+
+
+TITLE = "Standard License Plate Patterns"
+COLUMNS: Tuple[str, ...] = (
+    "Country/State",
+    "ISO 3166",
+    "Pattern",
+    "Combinations",
+    "Example",
+)
+
+
+class PatternRow(NamedTuple):
+    location: str
+    iso_code: str
+    pattern: str
+    combinations: int
+    example: str
+
+
+@registry.cached_by_version(core.ISO_3166, core.STD_PATTERNS, core.STD_ALPHABETS)
+def std_pattern_rows() -> Tuple[PatternRow, ...]:
+    """
+    Returns a row for each location of ISO_3166, with its ISO code,
+    its pattern as written in STD_PATTERNS, the number of combinations
+    of the pattern and a random plate of it. Rows are computed on the
+    first call, and computed again only after STD_PATTERNS, ISO_3166 or
+    STD_ALPHABETS are modified, so the example plates stay the same until
+    then.
+    """
+    rows = []
+    for location, iso_code in core.iso_locations():
+        compiled = core.compile_std(iso_code)
+        rows.append(
+            PatternRow(
+                location,
+                iso_code,
+                compiled.source,
+                compiled.combinations(),
+                compiled.generate_random_plate(),
+            )
+        )
+    return tuple(rows)
+
+
+def render_rich(file: Optional[TextIO] = None) -> None:
+    """
+    Prints the rows as a rich table to file (stdout by default).
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    table = Table(title=TITLE)
+    table.add_column(COLUMNS[0], style="bold red")
+    table.add_column(COLUMNS[1], justify="full", style="bold green")
+    table.add_column(COLUMNS[2], justify="right", style="blue")
+    table.add_column(COLUMNS[3], justify="right", style="red")
+    table.add_column(COLUMNS[4], justify="right", style="bold violet")
+
+    for row in std_pattern_rows():
+        table.add_row(
+            row.location, row.iso_code, row.pattern, str(row.combinations), row.example
+        )
+
+    print("\n", file=file)
+    Console(file=file).print(table)
+
+
+def render_delimited(file: Optional[TextIO] = None, delimiter: str = "\t") -> None:
+    """
+    Writes the rows, after a header with the column names,
+    as delimited text to file (stdout by default).
+    """
+    import csv
+
+    writer = csv.writer(
+        sys.stdout if file is None else file, delimiter=delimiter, lineterminator="\n"
+    )
+    writer.writerow(COLUMNS)
+    writer.writerows(std_pattern_rows())
+
+
+def render_tsv(file: Optional[TextIO] = None) -> None:
+    render_delimited(file, "\t")
+
+
+def render_csv(file: Optional[TextIO] = None) -> None:
+    render_delimited(file, ",")
+
+
+def render_json(file: Optional[TextIO] = None) -> None:
+    """
+    Writes the rows to file (stdout by default) as a JSON list
+    of objects, with the fields of PatternRow as keys.
+    """
+    import json
+
+    rows: Any = [row._asdict() for row in std_pattern_rows()]
+    json.dump(rows, sys.stdout if file is None else file, indent=2)
+    print(file=file)
+
+
+RENDERERS: Dict[str, Callable[[Optional[TextIO]], None]] = {
+    "rich": render_rich,
+    "tsv": render_tsv,
+    "csv": render_csv,
+    "json": render_json,
+}
+
+
+def render(format: str = "rich", file: Optional[TextIO] = None) -> None:
+    """
+    Writes the table to file (stdout by default) in the format given,
+    one of RENDERERS. If the format is not known, raises ValueError.
+    """
+    if format not in RENDERERS:
+        raise ValueError(
+            f"format must be one of {', '.join(RENDERERS)}, received {format}"
+        )
+    RENDERERS[format](file)
@@ -0,0 +1,286 @@
+"""
+Estimation of the date plates were issued on, from a set of anchors:
+plates whose registration date is known. Plates of a pattern are issued
+in index order, so the date of any plate between two anchors can be
+estimated by interpolating linearly between them, and the other way
+around, the range of plates issued on a given date.
+NumPy is required, install it with `pip install plates[numpy]`.
+"""
+import datetime
+import os
+import struct
+from typing import Any, Iterable, List, Optional, Tuple, Union, NoReturn
+
+from plates import core
+
+try:
+    import numpy as np
+    from plates import bulk
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+
+
+_MAGIC = b"PLATETML"
+_VERSION = 1
+# Magic, version, length of the pattern and number of anchors, followed
+# by the pattern, the indices as uint64 and the dates as int32 days
+# since 1970-01-01
+_HEADER = struct.Struct("<8sHHQ")
+
+DateLike = Union[str, datetime.date, Any]
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "plates.timeline requires NumPy, "
+            "install it with `pip install plates[numpy]`"
+        )
+
+
+def _days(dates: Any) -> Any:
+    """
+    Returns the dates given, as ISO strings, date objects or datetime64,
+    as an int64 array of days since 1970-01-01.
+    """
+    return np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+
+
+class Timeline:
+    """
+    Issuance timeline of a pattern, built from anchors, (plate, date)
+    pairs. Anchors can be added at any time, and are merged into sorted
+    arrays of indices and dates the next time the timeline is queried.
+    If two anchors have the same plate, the last one added is kept, and
+    an anchor dated before some anchor of a lower index is taken as
+    issued on the latest of those dates, so that dates never go back.
+    >>> timeline = Timeline("CCDDDCC", [("AA000AA", "2000-01-01"),
+    ...                                 ("AB000AA", "2000-12-31")])
+    >>> timeline.estimate_dates(["AA500AA"])
+    array(['2000-07-01'], dtype='datetime64[D]')
+    """
+
+    def __init__(
+        self,
+        pattern: Union[str, core.CompiledPattern],
+        anchors: Iterable[Tuple[str, DateLike]] = (),
+    ) -> None:
+        _require_numpy()
+        self.compiled = core.compile(pattern) if isinstance(pattern, str) else pattern
+        if self.compiled.combinations() > bulk.INT64_MAX:
+            raise OverflowError(
+                f"Pattern {self.compiled.pattern} has too many combinations"
+            )
+        self._indices = np.empty(0, dtype=np.int64)
+        self._days = np.empty(0, dtype=np.int64)
+        # Running maximum of the days, which is what queries use
+        self._monotonic = self._days
+        self._pending: List[Tuple[Any, Any]] = []
+        self.update(anchors)
+
+    @property
+    def pattern(self) -> str:
+        return self.compiled.pattern
+
+    def add(self, plate: str, date: DateLike) -> None:
+        """
+        Adds an anchor. If the plate does not match the pattern,
+        raises ValueError.
+        """
+        self.update([(plate, date)])
+
+    def update(self, anchors: Iterable[Tuple[str, DateLike]]) -> None:
+        """
+        Adds the anchors given. If a plate does not match the pattern,
+        raises ValueError.
+        """
+        get_plate_index = self.compiled.get_plate_index
+        indices, dates = [], []
+        for plate, date in anchors:
+            indices.append(get_plate_index(plate))
+            dates.append(date)
+        if indices:
+            self._pending.append((np.array(indices, dtype=np.int64), _days(dates)))
+
+    def update_indices(self, indices: Any, dates: Any) -> None:
+        """
+        Adds anchors given as the indices of their plates and their dates,
+        as array-likes of the same length.
+        If an index is out of range, raises ValueError.
+        """
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        days = _days(dates).ravel()
+        if indices.shape != days.shape:
+            raise ValueError(f"Shapes {indices.shape} and {days.shape} do not match")
+        if indices.size and not (
+            1 <= indices.min() and indices.max() <= self.compiled.combinations()
+        ):
+            raise ValueError(f"Index out of range for pattern {self.pattern}")
+        self._pending.append((indices, days))
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        indices = np.concatenate([self._indices] + [i for i, _ in self._pending])
+        days = np.concatenate([self._days] + [d for _, d in self._pending])
+        self._pending = []
+        # A stable sort keeps the anchors of the same plate in the order
+        # they were added, so the last of each run is the newest
+        order = np.argsort(indices, kind="stable")
+        indices, days = indices[order], days[order]
+        last = np.append(indices[1:] != indices[:-1], True)
+        self._indices, self._days = indices[last], days[last]
+        self._monotonic = np.maximum.accumulate(self._days)
+
+    def anchors(self) -> Tuple[Any, Any]:
+        """
+        Returns the indices of the anchors, sorted, and their dates.
+        """
+        self._merge()
+        return self._indices.copy(), self._days.astype("datetime64[D]")
+
+    def __len__(self) -> int:
+        self._merge()
+        return int(self._indices.size)
+
+    def _rate(self) -> Optional[float]:
+        # Plates issued per day over the whole timeline, used to
+        # extrapolate beyond its first and last anchors
+        days = self._monotonic[-1] - self._monotonic[0] if self._days.size else 0
+        if days <= 0:
+            return None
+        return float(self._indices[-1] - self._indices[0]) / float(days)
+
+    def estimate_dates(
+        self, plates: Any, extrapolate: bool = False
+    ) -> Union[Any, NoReturn]:
+        """
+        Takes an array-like of plates of the pattern, and returns a
+        datetime64[D] array with the estimated issue date of each of them.
+        Plates before the first anchor or after the last one get NaT,
+        unless extrapolate is set, in which case they are estimated from
+        the average issue rate of the timeline.
+        If a plate does not match the pattern, raises ValueError.
+        """
+        return self.estimate_dates_of_indices(
+            bulk.get_plate_indices(plates, self.compiled), extrapolate
+        )
+
+    def estimate_dates_of_indices(self, indices: Any, extrapolate: bool = False) -> Any:
+        """
+        As estimate_dates, with the plates given as their indices.
+        """
+        self._merge()
+        x = np.asarray(indices, dtype=np.int64)
+        if not self._indices.size:
+            return np.full(x.shape, "NaT", dtype="datetime64[D]")
+        xp, fp = self._indices, self._monotonic
+        days = np.interp(x, xp, fp)
+        outside = (x < xp[0]) | (x > xp[-1])
+        rate = self._rate()
+        if extrapolate and rate is not None:
+            days = np.where(x < xp[0], fp[0] - (xp[0] - x) / rate, days)
+            days = np.where(x > xp[-1], fp[-1] + (x - xp[-1]) / rate, days)
+            outside = np.zeros(x.shape, dtype=bool)
+        dates = np.floor(days).astype(np.int64).astype("datetime64[D]")
+        dates[outside] = np.datetime64("NaT")
+        return dates
+
+    def _first_indices(self, days: Any, extrapolate: bool) -> Any:
+        # Estimated index, as a float, of the first plate issued on each
+        # of the days, the inverse of the interpolation of the dates
+        xp, fp = self._monotonic, self._indices
+        after = np.searchsorted(xp, days, side="left")
+        before = np.maximum(after - 1, 0)
+        within = np.minimum(after, xp.size - 1)
+        span = np.maximum(xp[within] - xp[before], 1)
+        first = fp[before] + (days - xp[before]) * (fp[within] - fp[before]) / span
+        first = np.where(after == 0, fp[0], first)
+        first = np.where(after == xp.size, fp[-1] + 1, first)
+
+        rate = self._rate()
+        if extrapolate and rate is not None:
+            first = np.where(days < xp[0], fp[0] - (xp[0] - days) * rate, first)
+            first = np.where(days > xp[-1], fp[-1] + (days - xp[-1]) * rate, first)
+        return np.clip(np.ceil(first), 1, self.compiled.combinations() + 1)
+
+    def index_ranges(self, dates: Any, extrapolate: bool = False) -> Tuple[Any, Any]:
+        """
+        Takes an array-like of dates, and returns two int64 arrays with
+        the indices of the first and last plates estimated to be issued
+        on each of them. Ranges are empty, with the last index lower than
+        the first, if no plate was issued on the date, or if it is before
+        the first anchor or after the last one and extrapolate is not set.
+        """
+        self._merge()
+        days = _days(dates)
+        if not self._indices.size:
+            return np.ones(days.shape, np.int64), np.zeros(days.shape, np.int64)
+        first = self._first_indices(days, extrapolate)
+        stop = self._first_indices(days + 1, extrapolate)
+        return first.astype(np.int64), stop.astype(np.int64) - 1
+
+    def plate_ranges(
+        self, dates: Any, extrapolate: bool = False
+    ) -> List[Optional[Tuple[str, str]]]:
+        """
+        Returns the first and last plates estimated to be issued on each of
+        the dates (see index_ranges), or None for the dates without plates.
+        """
+        get_plate = self.compiled._plate
+        firsts, lasts = self.index_ranges(dates, extrapolate)
+        ranges: List[Optional[Tuple[str, str]]] = []
+        for first, last in zip(firsts.ravel().tolist(), lasts.ravel().tolist()):
+            if first <= last:
+                ranges.append((get_plate(first), get_plate(last)))
+            else:
+                ranges.append(None)
+        return ranges
+
+    def save(self, path: str) -> None:
+        """
+        Writes the anchors to the file at path, replacing it atomically,
+        so the file is left as it was if writing fails.
+        """
+        self._merge()
+        pattern = self.pattern.encode("ascii")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        header = _HEADER.pack(_MAGIC, _VERSION, len(pattern), self._indices.size)
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                f.write(pattern)
+                f.write(self._indices.astype("<u8").tobytes())
+                f.write(self._days.astype("<i4").tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> Union["Timeline", NoReturn]:
+        """
+        Reads a timeline written by save. If the file does not
+        hold one, raises ValueError.
+        """
+        _require_numpy()
+        with open(path, "rb") as f:
+            raw = f.read()
+        try:
+            magic, version, length, n = _HEADER.unpack_from(raw)
+        except struct.error:
+            magic = version = None
+        at = _HEADER.size + (length if magic else 0)
+        if magic != _MAGIC or version != _VERSION or len(raw) != at + n * (8 + 4):
+            raise ValueError(f"{path} does not hold a timeline")
+        timeline = cls(raw[_HEADER.size : at].decode("ascii"))
+        indices = np.frombuffer(raw, dtype="<u8", count=n, offset=at)
+        days = np.frombuffer(raw, dtype="<i4", count=n, offset=at + 8 * n)
+        timeline._indices = indices.astype(np.int64)
+        timeline._days = days.astype(np.int64)
+        timeline._monotonic = np.maximum.accumulate(timeline._days)
+        return timeline
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.pattern!r}, anchors={len(self)})"
@@ -1,6 +1,23 @@
+import os
 import sys
 import pytest
 
+from plates import registry
+
+
+@pytest.fixture(scope="session", autouse=True)
+def cache_dir(tmp_path_factory):
+    # Keep the registry artifact, also built by the subprocesses
+    # of the tests, out of the user cache directory
+    path = str(tmp_path_factory.mktemp("cache"))
+    artifact = os.path.join(path, os.path.basename(registry.ARTIFACT_PATH))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv(registry.CACHE_DIR_ENV_VAR, path)
+        mp.setattr(registry, "ARTIFACT_PATH", artifact)
+        registry.clear_registry()
+        yield path
+        registry.clear_registry()
+
 
 @pytest.fixture(scope="function")
 def capture_stdout(monkeypatch):
@@ -0,0 +1,73 @@
+import pytest
+from plates.core import get_plate
+from plates import bitmap
+from plates.bitmap import PlateBitmap
+
+
+@pytest.fixture(params=["numpy", "python"])
+def bitmap_path(request, tmp_path, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(bitmap, "np", None)
+    else:
+        pytest.importorskip("numpy")
+    return str(tmp_path / "plates.bmp")
+
+
+def test_plate_bitmap(bitmap_path):
+    with PlateBitmap("CCDD", bitmap_path) as plates:
+        assert len(plates) == 0
+        plates.add("AB12")
+        plates.add("AB12")
+        assert "AB12" in plates
+        assert plates.contains("AB12")
+        assert "AB13" not in plates
+        assert "A1" not in plates
+        assert len(plates) == 1
+        plates.discard("AB12")
+        plates.discard("AB13")
+        assert "AB12" not in plates
+        with pytest.raises(ValueError):
+            plates.add("A1")
+
+
+def test_plate_bitmap_persists(bitmap_path):
+    with PlateBitmap("CCDDDCC", bitmap_path) as plates:
+        plates.update(["AD077YI", "AA001CD", "ZZ999ZZ"])
+    with PlateBitmap("CCDDDCC", bitmap_path, readonly=True) as plates:
+        assert list(plates) == ["AA001CD", "AD077YI", "ZZ999ZZ"]
+        assert len(plates) == 3
+    with pytest.raises(ValueError):
+        PlateBitmap("CCDD", bitmap_path)
+
+
+@pytest.mark.parametrize("size", [0, 5, 30, 4096])
+def test_plate_bitmap_truncated(bitmap_path, size):
+    PlateBitmap("CCDDDCC", bitmap_path).close()
+    with open(bitmap_path, "r+b") as f:
+        f.truncate(size)
+    with pytest.raises(ValueError, match="bitmap"):
+        PlateBitmap("CCDDDCC", bitmap_path)
+
+
+def test_plate_bitmap_update_indices(bitmap_path):
+    with PlateBitmap("CD", bitmap_path) as plates:
+        plates.update_indices(range(1, 101))
+        assert len(plates) == 100
+        assert list(plates) == [get_plate("CD", i) for i in range(1, 101)]
+        with pytest.raises(ValueError):
+            plates.update_indices([1, 261])
+        assert len(plates) == 100
+
+
+def test_plate_bitmap_next_free(bitmap_path):
+    with PlateBitmap("CD", bitmap_path) as plates:
+        assert plates.next_free() == "A0"
+        plates.update_indices(range(1, 21))
+        assert plates.next_free() == "C0"
+        assert plates.next_free("A5") == "C0"
+        assert plates.next_free("C0") == "C1"
+        plates.update_indices(range(21, 261))
+        assert plates.next_free() is None
+        plates.discard("Z9")
+        assert plates.next_free("Z8") == "Z9"
+        assert plates.next_free("Z9") is None
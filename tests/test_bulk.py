@@ -0,0 +1,207 @@
+import os
+import timeit
+
+import pytest
+from plates import core
+from plates.core import (
+    IndexOverflowException,
+    PlateNotValidException,
+    PlateOverflowWarning,
+    combinations,
+    expand_pattern,
+    get_plate,
+    get_plate_index,
+    matches_pattern,
+)
+
+np = pytest.importorskip("numpy")
+import plates.bulk  # noqa: E402
+from plates.bulk import (  # noqa: E402
+    advance_plates,
+    generate_random_plates,
+    get_plates,
+    get_plate_indices,
+    plate_distances,
+)
+from plates.ranges import advance_plate, plate_distance  # noqa: E402
+
+
+benchmark = pytest.mark.skipif(
+    not os.environ.get("PLATES_BENCHMARK"),
+    reason="benchmarks only run with PLATES_BENCHMARK=1",
+)
+
+
+@pytest.mark.parametrize("pattern", ["CCCDDD", "2C3D2C", "DCCCDDD", "DDDD"])
+def test_get_plates(pattern):
+    total = combinations(pattern)
+    indices = np.random.default_rng(0).integers(1, total + 1, 500)
+    indices[:2] = (1, total)
+    plates = get_plates(pattern, indices)
+    assert plates.dtype == np.dtype(f"S{len(expand_pattern(pattern))}")
+    assert [p.decode() for p in plates] == [get_plate(pattern, int(i)) for i in indices]
+
+
+def test_get_plates_shape_and_errors():
+    assert get_plates("CCCDDD", [[1, 2], [3, 4]]).shape == (2, 2)
+    assert get_plates("CCCDDD", []).shape == (0,)
+    with pytest.warns(PlateOverflowWarning) as record:
+        assert get_plates("CCCDDD", [17_576_001])[0] == b"ZZZ999"
+    assert record[0].filename == __file__
+    with pytest.raises(ValueError):
+        get_plates("CCCDDD", [0, 1])
+    with pytest.raises(OverflowError):
+        get_plates("C" * 20, [1])
+
+
+def test_get_plate_indices():
+    plates = ["AAA000", "AA001CD", "AD077YI", "ZZ999ZZ", "1234", "9ABC"]
+    expected = [get_plate_index(p) for p in plates]
+    assert get_plate_indices(plates).tolist() == expected
+    assert get_plate_indices(np.array(plates, dtype="S")).tolist() == expected
+    assert get_plate_indices(np.array(plates)).dtype == np.int64
+
+
+@pytest.mark.parametrize("plates", [["AAA000", "aa00"], ["AB 12"], [b"A\x00B"], [""]])
+def test_get_plate_indices_not_valid(plates):
+    with pytest.raises(PlateNotValidException):
+        get_plate_indices(plates)
+
+
+def test_get_plate_indices_not_ascii():
+    plates = ["AA000AA"] * 1000 + ["ÉB1234"]
+    with pytest.raises(PlateNotValidException) as excinfo:
+        get_plate_indices(plates)
+    assert excinfo.value.msg == "Plate ÉB1234 is not a valid license plate"
+
+
+def test_get_plate_indices_roundtrip():
+    indices = np.arange(1, 100_000, 37)
+    assert (get_plate_indices(get_plates("CCDDDCC", indices)) == indices).all()
+
+
+def test_get_plate_indices_pattern():
+    pattern = "CCDDDCC@NO_IOQU"
+    indices = np.arange(1, 100_000, 37)
+    compiled = core.compile(pattern)
+    plates = get_plates(pattern, indices)
+    assert (get_plate_indices(plates, pattern) == indices).all()
+    assert (get_plate_indices(plates, compiled) == indices).all()
+    assert get_plate_indices(["AA000AB"], pattern).tolist() == [2]
+    assert get_plate_indices(["AA000AB"], "CCDDDCC").tolist() == [2]
+    for plates in (["AA000AI"], ["AA000A"], ["AA000ABC"], ["1234BCD"]):
+        with pytest.raises(ValueError):
+            get_plate_indices(plates, pattern)
+    with pytest.raises(PlateNotValidException):
+        get_plate_indices(["aa000ab"], pattern)
+
+
+def test_plate_distances():
+    a = ["AA000AA", "AD077YI", "AAA010", "9Z"]
+    b = ["AA001CD", "AB123CD", "AAA000", "0A"]
+    expected = [plate_distance(x, y) for x, y in zip(a, b)]
+    assert plate_distances(a, b).tolist() == expected
+    with pytest.raises(ValueError):
+        plate_distances(["AA00"], ["AAA0"])
+    with pytest.raises(ValueError):
+        plate_distances(["AA00"], ["AA00", "AA01"])
+
+
+def test_advance_plates():
+    plates = ["AD077YI", "AAA009", "AZ99", "ZZZ", "1"]
+    offsets = [-700_000, 1, 1, -17_575, 8]
+    expected = [advance_plate(p, n).encode() for p, n in zip(plates, offsets)]
+    assert advance_plates(plates, offsets).tolist() == expected
+    assert advance_plates(plates, 0).tolist() == [p.encode() for p in plates]
+    with pytest.warns(PlateOverflowWarning) as record:
+        assert advance_plates(["ZZ9", "AB"], 5).tolist() == [b"ZZ9", b"AG"]
+    assert record[0].filename == __file__
+    with pytest.raises(ValueError):
+        advance_plates(["AB", "AA"], -1)
+
+
+def test_get_plates_overflow_policy():
+    indices = [1, 260, 261, 262]
+    assert get_plates("CD", indices, overflow="wrap").tolist() == [
+        b"A0",
+        b"Z9",
+        b"A0",
+        b"A1",
+    ]
+    assert get_plates("CD", indices, overflow="none").tolist() == [
+        b"A0",
+        b"Z9",
+        b"",
+        b"",
+    ]
+    with pytest.raises(IndexOverflowException):
+        get_plates("CD", indices, overflow="raise")
+
+    plates, valid = get_plates("CD", [0, 1, 261], overflow="raise", mask=True)
+    assert plates.tolist() == [b"", b"A0", b""]
+    assert valid.tolist() == [False, True, False]
+    plates, valid = get_plates("CD", [[1, 300]], mask=True)
+    assert plates.tolist() == [[b"A0", b"Z9"]]
+    assert valid.tolist() == [[True, False]]
+
+
+def test_advance_plates_overflow_policy():
+    plates = ["ZZ9", "AB", "AA"]
+    assert advance_plates(plates, [1, 1, -1], overflow="wrap").tolist() == [
+        b"AA0",
+        b"AC",
+        b"ZZ",
+    ]
+    with pytest.raises(IndexOverflowException):
+        advance_plates(plates, 1, overflow="raise")
+    result, valid = advance_plates(plates, [1, 1, -1], overflow="raise", mask=True)
+    assert result.tolist() == [b"", b"AC", b""]
+    assert valid.tolist() == [False, True, False]
+    result, valid = advance_plates(plates, [1, 1, -1], mask=True)
+    assert result.tolist() == [b"ZZ9", b"AC", b""]
+    assert valid.tolist() == [False, True, False]
+
+
+def test_generate_random_plates():
+    plates = generate_random_plates("DCCCDDD", 1000, seed=1)
+    assert plates.shape == (1000,)
+    assert all(matches_pattern("DCCCDDD", p.decode()) for p in plates)
+    assert len(set(plates)) > 990
+    assert generate_random_plates("DCCCDDD", 0).shape == (0,)
+    with pytest.raises(ValueError):
+        generate_random_plates("DCCCDDD", -1)
+
+
+def test_generate_random_plates_reproducible(monkeypatch):
+    monkeypatch.setattr(plates.bulk, "RANDOM_BATCH_SIZE", 100)
+    serial = generate_random_plates("2C3D2C", 550, seed=7, workers=1)
+    parallel = generate_random_plates("2C3D2C", 550, seed=7, workers=3)
+    assert (serial == parallel).all()
+    assert (serial != generate_random_plates("2C3D2C", 550, seed=8)).any()
+
+
+@benchmark
+def test_benchmark_bulk(capsys):
+    pattern, n = "CCDDDCC", 100_000
+    indices = np.random.default_rng(0).integers(1, combinations(pattern) + 1, n)
+    plates = get_plates(pattern, indices)
+    str_plates = [p.decode() for p in plates]
+    int_indices = indices.tolist()
+
+    scalar_encode = timeit.timeit(
+        lambda: [get_plate(pattern, i) for i in int_indices], number=1
+    )
+    bulk_encode = timeit.timeit(lambda: get_plates(pattern, indices), number=1)
+    scalar_decode = timeit.timeit(
+        lambda: [get_plate_index(p) for p in str_plates], number=1
+    )
+    bulk_decode = timeit.timeit(lambda: get_plate_indices(plates), number=1)
+
+    with capsys.disabled():
+        print(
+            f"\nget_plate x{n}: {scalar_encode:.3f}s, get_plates: {bulk_encode:.3f}s"
+            f"\nget_plate_index x{n}: {scalar_decode:.3f}s, "
+            f"get_plate_indices: {bulk_decode:.3f}s"
+        )
+    assert bulk_encode < scalar_encode
+    assert bulk_decode < scalar_decode
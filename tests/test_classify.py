@@ -0,0 +1,60 @@
+import pytest
+from plates.core import (
+    STD_ALPHABETS,
+    STD_PATTERNS,
+    PlateNotValidException,
+    compile_std,
+    iso_locations,
+    matches_pattern,
+)
+from plates.classify import classify_plate, classify_plates, pattern_index
+
+
+def test_iso_locations():
+    locations = iso_locations()
+    assert locations[:2] == (("ANDORRA", "AD"), ("ARGENTINA", "AR-1"))
+    assert ("CALIFORNIA", "US-CA") in locations
+    assert all(iso_code in STD_PATTERNS for _, iso_code in locations)
+
+
+def test_pattern_index():
+    index = pattern_index()
+    assert sorted(code for codes in index.values() for code in codes) == sorted(
+        STD_PATTERNS
+    )
+    assert index["CCDDDCC"] == ("AR-2", "HR")
+    assert index["CCDDDCC@NO_IOQU"] == ("IT",)
+
+
+@pytest.mark.parametrize(
+    "plate",
+    ["AD077YI", "AD077YB", "1234BCD", "1234ABC", "PBE370", "1234", "AB12", "1AB2CD"],
+)
+def test_classify_plate(plate):
+    expected = [
+        code
+        for code, pattern in STD_PATTERNS.items()
+        if matches_pattern(pattern, plate)
+    ]
+    assert sorted(classify_plate(plate)) == sorted(expected)
+
+
+def test_classify_plates():
+    plates = ["AD077YI", "AB12", "GVP918"]
+    assert list(classify_plates(plates)) == [classify_plate(p) for p in plates]
+    with pytest.raises(PlateNotValidException):
+        classify_plate("ab 12")
+
+
+def test_classify_plate_alphabets():
+    assert classify_plate("AD077YI") == ("AR-2", "HR")
+    assert classify_plate("AD077YB") == ("AR-2", "HR", "IT")
+    assert classify_plate("1234BCD") == ("ES",)
+    assert classify_plate("1234ABC") == ()
+
+
+def test_classify_plate_alphabets_modified(monkeypatch):
+    monkeypatch.setitem(STD_ALPHABETS, "NO_IOQU", {"C": "ABCDEFGHIJKLMN"})
+    assert compile_std("IT").combinations() == 14 ** 4 * 1000
+    assert classify_plate("AD077YB") == ("AR-2", "HR")
+    assert classify_plate("AD077IB") == ("AR-2", "HR", "IT")
@@ -0,0 +1,82 @@
+import os
+import random
+import time
+
+import pytest
+from plates.core import STD_PATTERNS, compile, generate_random_plate, matches_pattern
+from plates.correct import (
+    best_corrections,
+    correct_plate,
+    correct_plates,
+    Correction,
+    Corrector,
+)
+
+
+def test_correct_plate():
+    corrections = correct_plate("AB1O3CD")
+    assert corrections[:2] == [
+        Correction("AB103CD", "CCDDDCC", ("AR-2", "HR"), 1, 1.0),
+        Correction("AB103CD", "CCDDDCC@NO_IOQU", ("IT",), 1, 1.0),
+    ]
+    std = {compile(pattern).pattern for pattern in STD_PATTERNS.values()}
+    assert all(
+        matches_pattern(c.pattern, c.plate) and c.pattern in std for c in corrections
+    )
+    assert [c.cost for c in corrections] == sorted(c.cost for c in corrections)
+
+
+def test_correct_plate_exact_and_normalized():
+    assert correct_plate("ab-103 cd")[0][:2] == ("AB103CD", "CCDDDCC")
+    assert correct_plate("ab-103 cd")[0].edits == 0
+    assert correct_plate("") == []
+    assert correct_plate("AB_103") == []
+    assert correct_plate("ÉB103CD") == []
+
+
+def test_correct_plate_max_edits():
+    corrector = Corrector({"CCDDDCC": ("AR-2",)})
+    assert corrector.correct("A8IO3CD") == []
+    assert [c.plate for c in corrector.correct("A8IO3CD", max_edits=3)] == ["AB103CD"]
+    assert corrector.correct("AB1O3CD", max_edits=0) == []
+    # X is not confused with any digit
+    assert corrector.correct("ABX03CD") == []
+
+
+def test_corrector_confusions():
+    corrector = Corrector({"DDD": ()}, confusions=[("O", "0", 1.0), ("D", "0", 2.0)])
+    assert [(c.plate, c.cost) for c in corrector.correct("1O2")] == [("102", 1.0)]
+    corrector = Corrector({"CCC": ()}, confusions=[("O", "0", 1.0), ("D", "0", 2.0)])
+    assert [(c.plate, c.cost) for c in corrector.correct("A0C")] == [
+        ("AOC", 1.0),
+        ("ADC", 2.0),
+    ]
+
+
+def test_correct_plates():
+    plates = ["AB1O3CD", "!!", "AB103CD"]
+    assert [c[:1] for c in correct_plates(plates)] == [
+        correct_plate(p)[:1] for p in plates
+    ]
+    assert best_corrections(plates) == ["AB103CD", None, "AB103CD"]
+
+
+@pytest.mark.skipif(
+    not os.environ.get("PLATES_BENCHMARK"),
+    reason="benchmarks only run with PLATES_BENCHMARK=1",
+)
+def test_benchmark_correct_plates():
+    rng = random.Random(0)
+    patterns = list(STD_PATTERNS.values())
+    swap = str.maketrans("O0I1B8S5", "0O1I8B5S")
+    noisy = [
+        "".join(
+            c.translate(swap) if rng.random() < 0.15 else c
+            for c in generate_random_plate(rng.choice(patterns))
+        )
+        for _ in range(20_000)
+    ]
+    best_corrections(noisy[:10])
+    start = time.perf_counter()
+    best_corrections(noisy)
+    assert len(noisy) / (time.perf_counter() - start) > 10_000
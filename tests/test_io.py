@@ -0,0 +1,87 @@
+import os
+import random
+
+import pytest
+
+from plates import io
+from plates.core import PlateNotValidException, compile
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(io, "np", None)
+    return request.param
+
+
+def test_write_read_plates(tmp_path, backend):
+    path = str(tmp_path / "plates.col")
+    plates = ["AD077YI", "AA001CD", "1234ABC", "AA001CD", "0001BBB"]
+    assert io.write_plates(path, plates, block_size=2) == 5
+    assert sorted(io.read_plates(path)) == sorted(plates)
+    with io.PlateFile(path) as f:
+        assert sorted(f.patterns()) == ["CCDDDCC", "DDDDCCC"]
+        assert f.count() == 5
+        assert f.count("CCDDDCC") == 3
+        assert f.count("DDDD") == 0
+        assert list(f.query("CCDDDCC")) == ["AA001CD", "AA001CD", "AD077YI"]
+    with pytest.raises(PlateNotValidException):
+        io.write_plates(path, ["AA001CD", "A-0"])
+
+
+def test_large_deltas(tmp_path, backend):
+    path = str(tmp_path / "plates.col")
+    pattern = "CCCCCCCCCCCC"
+    combinations = compile(pattern).combinations()
+    indices = [1, 2, 127, 128, 300, 2 ** 35, combinations - 1, combinations]
+    io.write_indices(path, {pattern: reversed(indices)}, block_size=3)
+    with io.PlateFile(path) as f:
+        blocks = [list(block.tolist()) for block in f.iter_blocks(pattern)]
+    assert sum(blocks, []) == indices
+    with pytest.raises(OverflowError):
+        io.write_indices(path, {"C" * 14: [1]})
+    with pytest.raises(ValueError):
+        io.write_indices(path, {pattern: [0]})
+
+
+def test_range_query(tmp_path, backend):
+    path = str(tmp_path / "plates.col")
+    compiled = compile("CCDDDCC")
+    indices = random.Random(3).sample(range(1, compiled.combinations() + 1), 5000)
+    io.write_indices(path, {"CCDDDCC": indices}, block_size=100)
+    low, high = 1_000_000, 2_000_000
+    expected = sorted(i for i in indices if low <= i <= high)
+    with io.PlateFile(path) as f:
+        blocks = list(f.iter_blocks("CCDDDCC", low, high))
+        assert [i for block in blocks for i in block.tolist()] == expected
+        # Only the blocks overlapping the range are decoded
+        assert len(blocks) <= len(expected) // 100 + 2
+        plates = list(
+            f.query("CCDDDCC", compiled.get_plate(low), compiled.get_plate(high))
+        )
+    assert plates == [compiled.get_plate(i) for i in expected]
+    assert list(io.read_plates(path, "CCDDDCC", low, high)) == plates
+
+
+def test_empty_and_invalid(tmp_path, backend):
+    path = str(tmp_path / "plates.col")
+    io.write_plates(path, [])
+    assert list(io.read_plates(path)) == []
+    with open(path, "wb") as f:
+        f.write(b"AA001CD\n" * 10)
+    with pytest.raises(ValueError):
+        io.PlateFile(path)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_write_fails(tmp_path, backend):
+    path = str(tmp_path / "plates.col")
+    io.write_indices(path, {"CD": [1, 2]})
+    with pytest.raises(ValueError):
+        io.write_indices(path, {"CD": [0]})
+    with pytest.raises(OverflowError):
+        io.write_indices(path, {"CD": [1], "14C": [1]})
+    assert os.listdir(tmp_path) == ["plates.col"]
+    assert list(io.read_plates(path)) == ["A0", "A1"]
@@ -0,0 +1,68 @@
+import pytest
+from plates.core import PlateNotValidException, get_plate_index
+from plates.plate import Plate, PlateArray
+
+
+def test_plate():
+    plate = Plate("AA001CD")
+    assert plate.index == get_plate_index("AA001CD")
+    assert plate.pattern == "CCDDDCC"
+    assert str(plate) == "AA001CD"
+    assert repr(plate) == "Plate('AA001CD')"
+    assert Plate.from_index("CCDDDCC", plate.index) == plate
+    with pytest.raises(PlateNotValidException):
+        Plate("aa001cd")
+    with pytest.raises(ValueError):
+        Plate.from_index("CD", 261)
+
+
+def test_plate_hash_and_order():
+    a, b, c = Plate("AA001CD"), Plate("AA001CE"), Plate("A0")
+    assert len({a, Plate("AA001CD"), b}) == 2
+    assert a < b and b > a and a <= a and b >= a
+    assert sorted([b, a]) == [a, b]
+    assert a != "AA001CD"
+    assert a != c
+
+
+def test_plate_arithmetic():
+    plate = Plate("AZ9")
+    assert str(plate + 1) == "BA0"
+    assert str(1 + plate) == "BA0"
+    assert str(plate - 10) == "AY9"
+    assert Plate("BA0") - plate == 1
+    with pytest.raises(ValueError):
+        Plate("ZZ9") + 1
+    with pytest.raises(ValueError):
+        Plate("AA0") - 1
+    with pytest.raises(ValueError):
+        Plate("AA0") - Plate("A0")
+
+
+def test_plate_array():
+    plates = PlateArray("CCDDDCC", ["AA001CD", Plate("AD077YI")])
+    plates.append(1)
+    assert len(plates) == 3
+    assert plates.nbytes == 24
+    assert list(plates.strings()) == ["AA001CD", "AD077YI", "AA000AA"]
+    assert plates[1] == Plate("AD077YI")
+    assert plates[-1:] == PlateArray.from_indices("CCDDDCC", [1])
+    assert "AD077YI" in plates
+    assert "ZZ999ZZ" not in plates
+    assert "A0" not in plates
+    plates.sort()
+    assert [str(plate) for plate in plates] == ["AA000AA", "AA001CD", "AD077YI"]
+    with pytest.raises(ValueError):
+        plates.append("A0")
+    with pytest.raises(OverflowError):
+        PlateArray("C" * 20)
+
+
+def test_plate_array_numpy():
+    np = pytest.importorskip("numpy")
+    plates = PlateArray.from_indices("CD", [1, 2, 260])
+    view = plates.numpy()
+    assert view.dtype == np.uint64
+    assert view.tolist() == [1, 2, 260]
+    view[0] = 3
+    assert str(plates[0]) == "A2"
@@ -1,3 +1,6 @@
+import io
+import sys
+
 import pytest
 from plates.core import *
 from plates.__main__ import (
@@ -6,6 +9,7 @@ from plates.__main__ import (
     main,
     call,
     print_function_usage,
+    run_batch,
 )
 
 
@@ -14,6 +18,34 @@ def test_get_plate():
     assert get_plate("CCDDDCC", combinations("CCDDDCC")) == "ZZ999ZZ"
 
 
+def test_get_plate_overflow_policy():
+    with pytest.warns(PlateOverflowWarning) as record:
+        assert get_plate("CD", 261) == "Z9"
+        assert compile("CD").get_plate(261) == "Z9"
+    # The warnings point to the calls above
+    assert [w.filename for w in record] == [__file__] * 2
+    assert get_plate("CD", 262, overflow="wrap") == "A1"
+    assert get_plate("CD", 261, overflow="none") is None
+    with pytest.raises(IndexOverflowException):
+        get_plate("CD", 261, overflow="raise")
+    with pytest.raises(ValueError):
+        get_plate("CD", 261, overflow="ignore")
+    assert get_plate("CD", 260, overflow="ignore") == "Z9"
+
+
+def test_set_overflow_policy():
+    assert get_overflow_policy() == "clamp"
+    try:
+        set_overflow_policy("wrap")
+        assert get_plate("CD", 261) == "A0"
+        assert compile("CD").get_plate(261, "none") is None
+    finally:
+        set_overflow_policy("clamp")
+    with pytest.raises(ValueError):
+        set_overflow_policy("ignore")
+    assert get_overflow_policy() == "clamp"
+
+
 @pytest.mark.parametrize("plate,index", [("AAA000", 1), ("AA001CD", 732)])
 def test_get_plate_index(plate, index):
     assert get_plate_index(plate) == index
@@ -65,6 +97,11 @@ def test_valid_pattern():
     assert valid_pattern("3C3D")
     assert not valid_pattern("cDDDCC")
     assert not valid_pattern("4D2CA")
+    assert not valid_pattern("2C3")
+    assert valid_pattern("12D")
+    assert valid_pattern("2C3D2C@NO_IOQU")
+    assert not valid_pattern("2C3D2C@XX")
+    assert not valid_pattern("2C3D2C@")
 
 
 def test_valid_plate():
@@ -106,10 +143,38 @@ def test_expand_pattern():
     assert expand_pattern(STD_PATTERNS["AR-1"]) == STD_PATTERNS["AR-1"]
 
 
+@pytest.mark.parametrize(
+    "short,expanded,runs",
+    [
+        ("12D", "D" * 12, (("D", 12),)),
+        ("2C10D1C", "CC" + "D" * 10 + "C", (("C", 2), ("D", 10), ("C", 1))),
+        ("CC3C", "CCCCC", (("C", 5),)),
+        ("DCD", "DCD", (("D", 1), ("C", 1), ("D", 1))),
+    ],
+)
+def test_parse_pattern(short, expanded, runs):
+    parsed = parse_pattern(short)
+    assert parsed.pattern == expanded == expand_pattern(short)
+    assert parsed.runs == runs
+    assert parsed.symbol_types == bytes(int(s == "D") for s in expanded)
+
+
+@pytest.mark.parametrize(
+    "pattern,position",
+    [("CCdD", 2), ("2C3", 2), ("3C0D", 2), ("12C 4D", 3), ("3C@", 2)],
+)
+def test_parse_pattern_not_valid(pattern, position):
+    with pytest.raises(PatternNotValidException) as excinfo:
+        parse_pattern(pattern)
+    assert excinfo.value.position == position
+    assert f"position {position}" in str(excinfo.value)
+
+
 def test_get_pattern():
     assert get_pattern("AVG405DF") == "CCCDDDCC"
     assert get_pattern("GVP918") == STD_PATTERNS["AR-1"]
     assert get_pattern("90AKLH") != "DCCCC"
+    assert get_pattern("1234") == "DDDD"
 
 
 def test_generate_random_plate():
@@ -126,6 +191,87 @@ def test_generate_random_pattern():
     assert matches_pattern(pattern, generate_random_plate(pattern))
 
 
+def test_compile():
+    compiled = compile("2C3D2C")
+    assert compiled is compile("2C3D2C")
+    assert compiled == CompiledPattern(STD_PATTERNS["AR-2"])
+    assert compiled.pattern == STD_PATTERNS["AR-2"]
+    assert compiled.runs == (("C", 2), ("D", 3), ("C", 2))
+    assert compiled.combinations() == combinations("CCDDDCC")
+    assert compiled.factor_by_position() == factor_by_position("CCDDDCC")
+    assert compiled.min_plate() == "AA000AA"
+    assert compiled.max_plate() == "ZZ999ZZ"
+    assert compiled.get_plate(732) == get_plate("CCDDDCC", 732)
+    assert compiled.get_plate_index("AD077YI") == get_plate_index("AD077YI")
+    assert compiled.matches_pattern(compiled.generate_random_plate())
+    with pytest.raises(ValueError):
+        compiled.get_plate_index("AAA000")
+    with pytest.raises(PatternNotValidException):
+        compile("4D2CA")
+
+
+@pytest.mark.parametrize("pattern", ["CCCDDD", "DCCCDDD", "CDDCCC", "DDDD"])
+def test_get_plate_roundtrip(pattern):
+    for index in (1, 2, 27, 1001, combinations(pattern)):
+        assert get_plate_index(get_plate(pattern, index)) == index
+
+
+@pytest.mark.parametrize(
+    "pattern", ["40D20C", "12D5C2D", "CDCDCDCDCDCDCDCD", "7C9D13C", "21C"]
+)
+def test_long_patterns(pattern):
+    compiled = compile(pattern)
+    factors = factor_by_position(pattern)
+    assert compiled.combinations() == factors[0] * compiled.radices[0]
+    assert compiled.max_plate() == get_plate(pattern, compiled.combinations())
+    assert compiled.min_plate() == get_plate(pattern, 1)
+    for index in (1, 2, 10**9 + 7, compiled.combinations() // 3):
+        plate = get_plate(pattern, index)
+        expected = 1 + sum(value(s) * f for s, f in zip(plate, factors))
+        assert expected == index == get_plate_index(plate)
+
+
+@pytest.mark.parametrize(
+    "pattern", ["2C3D2C@NO_IOQU", "12C3D@NO_IOQU", "4D3C@NO_VOWELS_Q"]
+)
+def test_alphabets(pattern):
+    compiled = compile(pattern)
+    shape, _, name = pattern.partition(ALPHABET_SEPARATOR)
+    alphabets = resolve_alphabet(name)
+    assert compiled.pattern == parse_pattern(pattern).pattern
+    assert compiled.shape == expand_pattern(shape)
+    assert compiled.alphabets == tuple(alphabets[s] for s in compiled.shape)
+    factors = factor_by_position(pattern)
+    assert compiled.combinations() == factors[0] * compiled.radices[0]
+    for index in (1, 2, 1001, compiled.combinations()):
+        plate = compiled.get_plate(index)
+        assert compiled.matches_pattern(plate)
+        assert compiled.get_plate_index(plate) == index
+    assert compiled.min_plate() == compiled.get_plate(1)
+    assert compiled.max_plate() == compiled.get_plate(compiled.combinations())
+
+
+def test_alphabets_not_valid():
+    compiled = compile("2C3D2C@NO_IOQU")
+    assert compiled.combinations() == 22 ** 4 * 1000
+    assert compiled.get_plate(2) == "AA000AB"
+    assert not compiled.matches_pattern("AA000AI")
+    assert compile("CCDDDCC").matches_pattern("AA000AI")
+    with pytest.raises(ValueError):
+        compiled.get_plate_index("AA000AO")
+    with pytest.raises(PatternNotValidException) as excinfo:
+        compile("2C3D2C@XX")
+    assert excinfo.value.position == 6
+
+
+@pytest.mark.parametrize("alphabet", ["A", "", "AAB", "ab", "A0"])
+def test_alphabets_declared_not_valid(monkeypatch, alphabet):
+    monkeypatch.setitem(STD_ALPHABETS, "TEST", {"C": alphabet})
+    assert not valid_pattern("13C2D@TEST")
+    with pytest.raises(PatternNotValidException):
+        compile("13C2D@TEST")
+
+
 def test_main(capture_stdout):
     args = vars(parser.parse_args(["max_plate", "3C3D"]))
     main(args)
@@ -149,6 +295,49 @@ def test_main(capture_stdout):
         main(args)
 
 
+def test_main_batch(capture_stdout, tmp_path):
+    batch_file = tmp_path / "indices.txt"
+    batch_file.write_text("1\n732\n\nnot an index\n")
+    args = vars(
+        parser.parse_args(["get_plate", "-p", "2C3D2C", "--batch", str(batch_file)])
+    )
+    assert main(args) == 1
+    assert "".join(capture_stdout) == "AA000AA\nAA001CD\n"
+
+
+def test_main_overflow(capture_stdout):
+    args = vars(parser.parse_args(["get_plate", "CD", "262", "--overflow", "wrap"]))
+    try:
+        assert main(args) == 0
+    finally:
+        set_overflow_policy("clamp")
+    assert "".join(capture_stdout) == "A1\n"
+
+
+def test_main_enumerate(monkeypatch):
+    out = io.TextIOWrapper(io.BytesIO())
+    monkeypatch.setattr(sys, "stdout", out)
+    args = vars(parser.parse_args(["enumerate", "-p", "CD", "--shard", "26/26"]))
+    assert main(args) == 0
+    assert out.buffer.getvalue().split() == [b"Z%d" % i for i in range(10)]
+    with pytest.raises(SystemExit) as e:
+        main(vars(parser.parse_args(["enumerate"])))
+    assert e.value.code == 2
+
+
+def test_run_batch(capsys):
+    out = io.StringIO()
+    lines = ["AA001CD", "ab12", "CCDDDCC AD077YI"]
+    assert run_batch(get_plate_index, lines, out) == 2
+    assert out.getvalue() == "732\n"
+    assert "line 2" in capsys.readouterr().err
+
+    out = io.StringIO()
+    lines = ["CCDDDCC AD077YI", "CD A1"]
+    assert run_batch(matches_pattern, lines, out) == 0
+    assert out.getvalue() == "True\nTrue\n"
+
+
 def test_get_help_str():
     def function(a: str, b: int, c: float) -> str:
         return a * int(c // b)
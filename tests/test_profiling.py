@@ -0,0 +1,87 @@
+import urllib.request
+
+import pytest
+
+import plates
+from plates import core, profiling
+from plates.core import PlateNotValidException, get_plate
+
+
+@pytest.fixture
+def instrumented():
+    profiling.reset()
+    plates.instrument(enable=True)
+    yield
+    plates.instrument(enable=False)
+    profiling.reset()
+
+
+def test_off_by_default():
+    assert not profiling.enabled()
+    original = core.get_plate
+    plates.instrument(enable=True)
+    assert core.get_plate is not original and plates.get_plate is core.get_plate
+    plates.instrument(enable=False)
+    assert core.get_plate is original and plates.get_plate is original
+    assert "__wrapped__" not in vars(core.CompiledPattern.get_plate)
+
+
+def test_counts_calls(instrumented):
+    for index in range(1, 11):
+        plates.get_plate("CCDDDCC", index)
+        core.compile("CCDDDCC").get_plate(index)
+    with pytest.raises(PlateNotValidException):
+        core.get_plate_index("A-1")
+    functions = profiling.snapshot()["functions"]
+    assert functions["get_plate"]["calls"] == 10
+    assert functions["CompiledPattern.get_plate"]["calls"] == 10
+    assert functions["get_plate_index"]["errors"] == 1
+    latency = functions["get_plate"]["latency_ms"]
+    assert latency["max"] >= latency["p99"] >= latency["p50"] > 0
+    assert functions["get_plate"]["total_ms"] >= latency["max"]
+
+
+def test_latency_summary():
+    summary = profiling.latency_summary([0.003, 0.001], 0.004, 2)
+    assert summary == {"mean": 2.0, "p50": 3.0, "p90": 3.0, "p99": 3.0, "max": 3.0}
+    assert set(profiling.latency_summary([], 0.0, 0).values()) == {0.0}
+
+
+def test_wrapped_functions_behave_the_same(instrumented):
+    assert get_plate("CD", 261, overflow="wrap") == "A0"
+    assert core.compile("CD") is core.compile("CD")
+    core.compile.cache_clear()
+    assert core.compile.cache_info().currsize == 0
+    assert core.get_plate.__name__ == "get_plate"
+
+
+def test_cache_hit_rates(instrumented):
+    core.compile.cache_clear()
+    for _ in range(4):
+        core.compile("CCDDDCC")
+    caches = profiling.snapshot()["caches"]
+    assert caches["compile"]["hits"] == 3
+    assert caches["compile"]["misses"] == 1
+    assert caches["compile"]["hit_rate"] == 0.75
+    assert {"iso_locations", "load_data", "parse_pattern"} <= set(caches)
+
+
+def test_prometheus(instrumented, tmp_path):
+    core.get_plate_index("AA001CD")
+    text = profiling.to_prometheus()
+    assert "plates_instrumentation_enabled 1" in text
+    assert 'plates_call_seconds_count{function="get_plate_index"} 1' in text
+    assert 'plates_cache_hits_total{cache="compile"}' in text
+
+    path = tmp_path / "plates.prom"
+    profiling.write_prometheus(str(path))
+    assert "# TYPE plates_call_seconds summary" in path.read_text()
+
+    server = profiling.serve_prometheus(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert b"plates_call_seconds_sum" in response.read()
+    finally:
+        server.shutdown()
+        server.server_close()
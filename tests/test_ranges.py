@@ -0,0 +1,160 @@
+import pytest
+from plates.core import (
+    IndexOverflowException,
+    PlateOverflowWarning,
+    combinations,
+    get_plate,
+    get_plate_index,
+)
+from plates.ranges import (
+    advance_plate,
+    iter_plates,
+    iter_plate_chunks,
+    iter_shard,
+    next_plate,
+    parse_shard,
+    partition,
+    plate_distance,
+    prev_plate,
+    Shard,
+)
+
+
+def test_iter_plates():
+    assert list(iter_plates("CD", "A8", "B1")) == ["A8", "A9", "B0", "B1"]
+    assert list(iter_plates("CD", 1, 30, step=10)) == ["A0", "B0", "C0"]
+    assert list(iter_plates("CD", "B1", "A8")) == []
+    assert len(list(iter_plates("CD"))) == combinations("CD")
+
+
+@pytest.mark.parametrize(
+    "pattern,start,stop,step",
+    [
+        ("CCDDDCC", "AB123CD", 900_000, 1),
+        ("DCCCDDD", 1, 20_000, 7),
+        ("CCCDDD", 17_575_000, 17_576_000, 3),
+    ],
+)
+def test_iter_plates_matches_get_plate(pattern, start, stop, step):
+    first = start if isinstance(start, int) else get_plate_index(start)
+    expected = [get_plate(pattern, i) for i in range(first, stop + 1, step)]
+    assert list(iter_plates(pattern, start, stop, step)) == expected
+
+
+def test_iter_plate_chunks():
+    plates = list(iter_plates("CDD", "A98", "C03"))
+    chunks = list(iter_plate_chunks("CDD", 4, "A98", "C03"))
+    assert all(len(chunk) == 4 for chunk in chunks[:-1])
+    assert sum(chunks, []) == plates
+
+    buffers = list(iter_plate_chunks("CDD", 4, "A98", "C03", as_bytes=True))
+    assert b"".join(buffers).decode().split() == plates
+    assert buffers[0] == b"A98\nA99\nB00\nB01\n"
+
+
+def test_iter_plates_not_valid():
+    with pytest.raises(ValueError):
+        list(iter_plates("CD", step=0))
+    with pytest.raises(ValueError):
+        list(iter_plates("CD", 0))
+    with pytest.raises(ValueError):
+        list(iter_plates("CD", "A11"))
+    with pytest.raises(ValueError):
+        list(iter_plate_chunks("CD", 0))
+
+
+@pytest.mark.parametrize(
+    "a,b", [("AA000AA", "AA001CD"), ("AD077YI", "AB123CD"), ("1A", "1A")]
+)
+def test_plate_distance(a, b):
+    assert plate_distance(a, b) == get_plate_index(b) - get_plate_index(a)
+    with pytest.raises(ValueError):
+        plate_distance(a, "A")
+
+
+@pytest.mark.parametrize("n", [0, 1, -1, 26, 999, -1000, 123_456, -700_000])
+def test_advance_plate(n):
+    plate = "AD077YI"
+    assert advance_plate(plate, n) == get_plate("CCDDDCC", get_plate_index(plate) + n)
+
+
+def test_advance_plate_bounds():
+    with pytest.warns(PlateOverflowWarning) as record:
+        assert advance_plate("ZZ999ZY", 5) == "ZZ999ZZ"
+        assert next_plate("ZZ999ZZ") == "ZZ999ZZ"
+    assert [w.filename for w in record] == [__file__] * 2
+    assert advance_plate("AA000AB", -1) == "AA000AA"
+    with pytest.raises(ValueError):
+        advance_plate("AA000AB", -2)
+
+
+def test_advance_plate_overflow_policy():
+    assert advance_plate("ZZ999ZY", 5, overflow="wrap") == "AA000AD"
+    assert advance_plate("AA000AB", -2, overflow="wrap") == "ZZ999ZZ"
+    assert advance_plate("ZZ999ZY", 5, overflow="none") is None
+    assert next_plate("Z9", overflow="wrap") == "A0"
+    with pytest.raises(IndexOverflowException):
+        advance_plate("ZZ999ZY", 5, overflow="raise")
+    with pytest.raises(ValueError):
+        advance_plate("AA000AB", -2, overflow="none")
+
+
+def test_next_prev_plate():
+    assert next_plate("AAA009") == "AAA010"
+    assert next_plate("AZ99") == "BA00"
+    assert prev_plate("BA00") == "AZ99"
+    assert prev_plate(next_plate("US123")) == "US123"
+
+
+@pytest.mark.parametrize(
+    "pattern,n_shards",
+    [
+        ("CCCDDDD", 16),
+        ("CCCDDDD", 7),
+        ("CD", 3),
+        ("DDD", 1000),
+        ("DDD", 1),
+        ("C" * 20, 100),
+    ],
+)
+def test_partition(pattern, n_shards):
+    shards = partition(pattern, n_shards)
+    assert [shard.number for shard in shards] == list(range(1, n_shards + 1))
+    assert shards[0].start == 1
+    assert shards[-1].stop == combinations(pattern)
+    for a, b in zip(shards, shards[1:]):
+        assert b.start == a.stop + 1
+    sizes = [shard.size for shard in shards]
+    assert max(sizes) - min(sizes) <= max(sizes) // 64 + 1
+    for shard in shards:
+        assert shard.first == get_plate(pattern, shard.start)
+        assert shard.last == get_plate(pattern, shard.stop)
+
+
+def test_partition_prefix_aligned():
+    shards = partition("CCCDDDD", 16)
+    assert all(shard.first.endswith("0000") for shard in shards)
+    assert all(shard.last.endswith("9999") for shard in shards)
+    assert partition("CD", 2) == [
+        Shard(1, 1, 130, "A0", "M9"),
+        Shard(2, 131, 260, "N0", "Z9"),
+    ]
+    with pytest.raises(ValueError):
+        partition("CD", 261)
+    with pytest.raises(ValueError):
+        partition("CD", 0)
+
+
+def test_iter_shard():
+    plates = [plate for k in range(1, 4) for plate in iter_shard("CDD", k, 3)]
+    assert plates == list(iter_plates("CDD"))
+    chunks = list(iter_shard("CDD", 3, 3, chunk_size=100))
+    assert b"".join(chunks).decode().split() == list(iter_shard("CDD", 3, 3))
+    assert max(chunk.count(b"\n") for chunk in chunks) == 100
+
+
+def test_parse_shard():
+    assert parse_shard("3/16") == (3, 16)
+    for shard in ("0/16", "17/16", "3", "a/b", "-1/2"):
+        with pytest.raises(ValueError):
+            parse_shard(shard)
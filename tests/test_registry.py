@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+
+import pytest
+from plates import core, registry
+from plates.core import CompiledPattern, combinations, compile, compile_std
+from plates.registry import PatternRegistry, StandardPatterns, build_registry
+
+
+@pytest.fixture
+def data_copy(tmp_path, monkeypatch):
+    """
+    Points the registry to a copy of data.json and an artifact
+    inside tmp_path, clearing the caches before and after, so that
+    the data parsed from the copy is not shared with other tests
+    """
+    path = tmp_path / "data.json"
+    shutil.copy(registry.PATH, path)
+    monkeypatch.setattr(registry, "PATH", str(path))
+    monkeypatch.setattr(registry, "ARTIFACT_PATH", str(tmp_path / "data.bin"))
+    registry.load_data.cache_clear()
+    registry.clear_registry()
+    yield path
+    registry.load_data.cache_clear()
+    registry.clear_registry()
+
+
+def test_build_registry(data_copy, tmp_path):
+    build_registry()
+    precompiled = PatternRegistry.open(str(tmp_path / "data.bin"))
+    patterns = json.loads(data_copy.read_text())["License Plates"][registry.STD_SECTION]
+    assert dict(precompiled) == patterns
+    assert list(precompiled) == list(patterns)
+    assert "AR-2" in precompiled and "XX" not in precompiled
+    with pytest.raises(KeyError):
+        precompiled["XX"]
+    for code, pattern in patterns.items():
+        compiled = precompiled.compiled(code)
+        expected = CompiledPattern(pattern)
+        assert compiled == expected
+        assert compiled.factors == expected.factors
+        assert compiled.alphabets == expected.alphabets
+        assert compiled.runs == expected.runs
+        assert compiled.symbol_types == expected.symbol_types
+        assert compiled.combinations() == combinations(pattern)
+    precompiled.close()
+
+
+def test_build_registry_creates_directory(data_copy, tmp_path):
+    path = tmp_path / "cache" / "plates" / "data.bin"
+    build_registry(str(path))
+    assert PatternRegistry.open(str(path)) is not None
+    assert os.listdir(path.parent) == ["data.bin"]
+
+
+def test_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv(registry.CACHE_DIR_ENV_VAR, str(tmp_path))
+    assert registry._cache_dir() == str(tmp_path)
+    monkeypatch.delenv(registry.CACHE_DIR_ENV_VAR)
+    assert os.path.basename(registry._cache_dir()) == "plates"
+    assert os.path.dirname(registry.ARTIFACT_PATH) != os.path.dirname(registry.PATH)
+
+
+def test_load_registry_rebuilds_stale(data_copy):
+    assert registry.load_registry() is not None
+    data = json.loads(data_copy.read_text())
+    data["License Plates"][registry.STD_SECTION]["XX"] = "3C4D"
+    data_copy.write_text(json.dumps(data))
+    # The size alone tells the registry is stale
+    stat = data_copy.stat()
+    os.utime(data_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    registry.clear_registry()
+    precompiled = registry.load_registry()
+    assert precompiled["XX"] == "3C4D"
+    assert precompiled.compiled("XX").pattern == "CCCDDDD"
+
+
+def test_load_registry_checks_modification_time(data_copy, tmp_path):
+    assert registry.load_registry() is not None
+    artifact = tmp_path / "data.bin"
+    built = artifact.stat().st_mtime_ns
+    registry.clear_registry()
+    assert registry.load_registry() is not None
+    assert artifact.stat().st_mtime_ns == built
+
+    stat = data_copy.stat()
+    os.utime(data_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    registry.clear_registry()
+    precompiled = registry.load_registry()
+    assert precompiled.is_fresh(stat.st_size, stat.st_mtime_ns + 10 ** 9)
+
+
+def test_clear_registry_clears_compiled(data_copy):
+    compile_std("AR-2")
+    assert core._compile_precompiled.cache_info().currsize > 0
+    registry.clear_registry()
+    assert core._compile_precompiled.cache_info().currsize == 0
+
+
+def test_load_registry_fallback(data_copy, tmp_path, monkeypatch):
+    # A directory can not be created under a file
+    (tmp_path / "file").write_text("")
+    not_writable = tmp_path / "file" / "data.bin"
+    monkeypatch.setattr(registry, "ARTIFACT_PATH", str(not_writable))
+    assert registry.load_registry() is None
+    assert StandardPatterns()["AR-2"] == "CCDDDCC"
+
+
+def test_open_not_valid(tmp_path):
+    path = tmp_path / "data.bin"
+    assert PatternRegistry.open(str(path)) is None
+    path.write_bytes(b"not a registry")
+    assert PatternRegistry.open(str(path)) is None
+
+
+def test_standard_patterns_modified(data_copy):
+    alphabets = registry.LazySection(registry.ALPHABETS_SECTION)
+    patterns = StandardPatterns(alphabets)
+    assert patterns.precompiled() is not None
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(patterns, "XX", "2C2D")
+        assert patterns.precompiled() is None
+        assert patterns["XX"] == "2C2D"
+        assert patterns["AR-1"] == "CCCDDD"
+    # Undoing the changes makes the registry available again
+    assert patterns.precompiled() is not None
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setitem(alphabets, "NO_IOQU", {"C": "AB"})
+        assert patterns.precompiled() is None
+    assert patterns.precompiled() is not None
+
+
+def test_compile_std():
+    assert compile_std("AR-2") == compile("CCDDDCC")
+    assert compile_std("US-CA").get_plate(1) == "0AAA000"
+    with pytest.raises(KeyError):
+        compile_std("XX")
+    assert core.STD_PATTERNS["ES"] == "DDDDCCC@NO_VOWELS_Q"
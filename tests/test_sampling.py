@@ -0,0 +1,50 @@
+import pytest
+from plates.core import get_plate, matches_pattern
+from plates.sampling import IndexPermutation, iter_sample, sample_plates
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 10, 257, 1000])
+def test_index_permutation(size):
+    permutation = IndexPermutation(size, seed=3)
+    assert sorted(permutation(i) for i in range(size)) == list(range(size))
+    assert len(permutation) == size
+    with pytest.raises(IndexError):
+        permutation(size)
+
+
+def test_index_permutation_seed():
+    first = [IndexPermutation(1000, seed=1)(i) for i in range(1000)]
+    assert first == [IndexPermutation(1000, seed=1)(i) for i in range(1000)]
+    assert first != [IndexPermutation(1000, seed=2)(i) for i in range(1000)]
+    assert first != list(range(1000))
+
+
+def test_sample_plates():
+    plates = sample_plates("CCDDDCC", 1000, seed=0)
+    assert len(set(plates)) == 1000
+    assert all(matches_pattern("CCDDDCC", plate) for plate in plates)
+    assert plates == sample_plates("CCDDDCC", 1000, seed=0)
+    assert sorted(sample_plates("CD", 260)) == sorted(
+        get_plate("CD", i) for i in range(1, 261)
+    )
+    with pytest.raises(ValueError):
+        sample_plates("CD", 261)
+
+
+def test_sample_plates_large():
+    # 26 ** 14 combinations do not fit in a range
+    plates = sample_plates("14C", 100, seed=0)
+    assert len(set(plates)) == 100
+    assert all(matches_pattern("14C", plate) for plate in plates)
+    assert plates == sample_plates("14C", 100, seed=0)
+
+
+def test_iter_sample():
+    plates = list(iter_sample("CDD"))
+    assert sorted(plates) == [get_plate("CDD", i) for i in range(1, 2601)]
+    assert list(iter_sample("CCDDDCC", 50, seed=4)) == list(
+        iter_sample("CCDDDCC", 50, seed=4)
+    )
+    assert len(set(iter_sample("CCDDDCC", 5000, seed=4))) == 5000
+    with pytest.raises(ValueError):
+        list(iter_sample("CD", 300))
@@ -0,0 +1,61 @@
+import itertools
+
+import pytest
+from plates.core import combinations, get_plate, get_plate_index
+from plates.search import (
+    count_partial,
+    iter_partial,
+    match_partial,
+    parse_query,
+)
+
+
+def test_parse_query():
+    assert parse_query("AB?1[0O]") == ("A", "B", None, "1", "0O")
+    assert parse_query("[O0O]") == ("0O",)
+    assert parse_query("") == ()
+    for query in ("ab?", "A[]", "A[0O", "A-1", "[?A]"):
+        with pytest.raises(ValueError):
+            parse_query(query)
+
+
+def test_match_partial_std_patterns():
+    matches = match_partial("AB?12?C")
+    assert [(m.pattern, m.iso_codes, m.count()) for m in matches] == [
+        ("CCDDDCC", ("AR-2", "HR"), 260),
+        ("CCDDDCC@NO_IOQU", ("IT",), 220),
+    ]
+    plates = list(matches[0])
+    assert plates[:2] == ["AB012AC", "AB012BC"]
+    assert list(matches[0].indices()) == [get_plate_index(p) for p in plates]
+    assert plates == sorted(plates, key=get_plate_index)
+    compiled = matches[1].compiled
+    plates = list(matches[1])
+    assert "AB012IC" not in plates
+    assert list(matches[1].indices()) == [compiled.get_plate_index(p) for p in plates]
+
+
+def test_match_partial_brute_force():
+    pattern, query = "CDCD", "[AIO][01]?[0O5S]"
+    every_plate = (get_plate(pattern, i) for i in range(1, combinations(pattern) + 1))
+    expected = [
+        plate
+        for plate in every_plate
+        if plate[0] in "AIO" and plate[1] in "01" and plate[3] in "05"
+    ]
+    assert list(iter_partial(query, [pattern])) == expected
+    assert count_partial(query, [pattern]) == len(expected)
+
+
+def test_match_partial_pruning():
+    assert [m.pattern for m in match_partial("A?", ["CD", "DD", "2C", "CCC"])] == [
+        "CD",
+        "CC",
+    ]
+    assert match_partial("[OI]1", ["DD"]) == []
+    assert count_partial("??????????????????????", ["22C"]) == 26 ** 22
+
+
+def test_match_partial_is_lazy():
+    plates = iter_partial("?" * 22, ["22C"])
+    assert list(itertools.islice(plates, 2)) == ["A" * 22, "A" * 21 + "B"]
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import sys
+
+import pytest
+from plates.core import get_plate
+from plates import server
+from plates.server import PlateServer
+
+
+async def exchange(requests, **server_kwargs):
+    """
+    Sends every request through a single connection and
+    returns the responses, sorted as their requests.
+    """
+    async with PlateServer(port=0, **server_kwargs) as plate_server:
+        if plate_server.path is not None:
+            reader, writer = await asyncio.open_unix_connection(plate_server.path)
+        else:
+            reader, writer = await asyncio.open_connection(
+                "127.0.0.1", plate_server.port
+            )
+        for i, request in enumerate(requests):
+            if not isinstance(request, str):
+                request = json.dumps({"id": i, **request})
+            writer.write(request.encode() + b"\n")
+        writer.write_eof()
+        responses = [json.loads(line) async for line in reader]
+        writer.close()
+        return sorted(responses, key=lambda r: -1 if r["id"] is None else r["id"])
+
+
+def run(requests, **server_kwargs):
+    # asyncio.run is only available from Python 3.7
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(exchange(requests, **server_kwargs))
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def test_server_operations():
+    responses = run(
+        [
+            {"op": "get_plate", "args": {"pattern": "CCDDDCC", "index": 732}},
+            {"op": "get_plate_index", "args": {"plate": "AA001CD"}},
+            {"op": "classify_plate", "args": {"plate": "AD077YI"}},
+            {"op": "combinations", "args": {"pattern": "2C3D2C"}},
+            {"op": "matches_pattern", "args": {"pattern": "CD", "plate": "A1"}},
+        ]
+    )
+    assert [r["result"] for r in responses] == [
+        "AA001CD",
+        732,
+        ["AR-2", "HR"],
+        456_976_000,
+        True,
+    ]
+
+
+def test_server_errors():
+    responses = run(
+        [
+            {"op": "get_plate", "args": {"pattern": "CD", "index": 261}},
+            {"op": "get_plate", "args": {"pattern": "CX", "index": 1}},
+            {"op": "get_plate_index", "args": {"plate": "ab1"}},
+            {"op": "get_plate", "args": {"pattern": "CD"}},
+            {"op": "unknown"},
+            "not json",
+        ]
+    )
+    assert [r["error"]["type"] for r in responses] == [
+        "bad_request",
+        "overflow",
+        "pattern_not_valid",
+        "plate_not_valid",
+        "bad_request",
+        "bad_request",
+    ]
+    assert "261" in responses[1]["error"]["message"]
+
+
+def test_server_batches(monkeypatch):
+    monkeypatch.setattr(server, "BULK_MIN_SIZE", 4)
+    indices = list(range(1, 200, 3))
+    plates = [get_plate("CCDDDCC", i) for i in indices]
+    requests = (
+        [
+            {"op": "get_plate", "args": {"pattern": "CCDDDCC", "index": i}}
+            for i in indices
+        ]
+        + [{"op": "get_plate_index", "args": {"plate": p}} for p in plates]
+        + [
+            {"op": "get_plate", "args": {"pattern": "CCDDDCC", "index": 10 ** 10}},
+            {"op": "get_plate_index", "args": {"plate": "ÉA001CD"}},
+            {"op": "stats"},
+        ]
+    )
+    responses = run(requests)
+    n = len(indices)
+    assert [r["result"] for r in responses[:n]] == plates
+    assert [r["result"] for r in responses[n : 2 * n]] == indices
+    assert responses[-3]["error"]["type"] == "overflow"
+    assert responses[-2]["error"]["type"] == "plate_not_valid"
+    stats = responses[-1]["result"]
+    assert stats["mean_batch_size"] > 1
+    assert stats["latency_ms"]["max"] >= stats["latency_ms"]["p50"] >= 0
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets only")
+def test_server_unix_socket(tmp_path):
+    path = str(tmp_path / "plates.sock")
+    responses = run([{"op": "max_plate", "args": {"pattern": "CCD"}}], path=path)
+    assert responses[0]["result"] == "ZZ9"
+
+
+def test_server_request(capsys):
+    import threading
+    from plates.__main__ import main
+
+    plate_server = PlateServer(port=0)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(plate_server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        result = server.request(
+            "get_plate_index", {"plate": "AA001CD"}, port=plate_server.port
+        )
+        assert result == 732
+        with pytest.raises(RuntimeError):
+            server.request("unknown", port=plate_server.port)
+        assert server.request("profile", port=plate_server.port)["caches"]
+
+        params = {
+            "args": ["stats"],
+            "list_functions": False,
+            "port": plate_server.port,
+            "format": "prometheus",
+        }
+        assert main(params) == 0
+        assert "plates_cache_hits_total" in capsys.readouterr().out
+        assert main({**params, "format": "json"}) == 0
+        assert json.loads(capsys.readouterr().out)["server"]["requests"] >= 4
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        plate_server.close()
+        loop.run_until_complete(plate_server.wait_closed())
+        loop.close()
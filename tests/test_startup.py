@@ -0,0 +1,76 @@
+import subprocess
+import sys
+
+import pytest
+
+# Generous limit on the cumulative time to import plates, in microseconds,
+# meant to catch heavy imports creeping back in rather than small slowdowns
+IMPORT_TIME_LIMIT = 100_000
+
+HEAVY_MODULES = ["rich", "json", "numpy"]
+
+
+# -X importtime was added in Python 3.7
+requires_importtime = pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="-X importtime requires Python 3.7"
+)
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def import_times(module):
+    """
+    Returns a dictionary mapping each module imported while importing
+    module to its cumulative import time, as reported by -X importtime
+    """
+    stderr = run_python("-X", "importtime", "-c", f"import {module}").stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@requires_importtime
+def test_import_does_not_load_heavy_modules():
+    times = import_times("plates")
+    for heavy in HEAVY_MODULES:
+        assert heavy not in times
+
+
+@requires_importtime
+def test_import_time():
+    times = import_times("plates")
+    assert times["plates"] < IMPORT_TIME_LIMIT
+
+
+@pytest.mark.parametrize("module", ["plates.core", "plates.__main__"])
+def test_data_is_parsed_once(module):
+    code = (
+        f"import {module}\n"
+        "from plates import core, registry\n"
+        "core.STD_PATTERNS['AR-2'], core.ISO_3166['USA']\n"
+        "print(registry.load_data.cache_info().misses)\n"
+    )
+    assert run_python("-c", code).stdout.strip() == "1"
+
+
+def test_cli_does_not_parse_data_until_help():
+    code = (
+        "from plates import __main__, registry\n"
+        "__main__.parser.parse_args(['combinations', '3C3D'])\n"
+        "print(registry.load_data.cache_info().misses)\n"
+        "__main__.parser.format_help()\n"
+        "print(registry.load_data.cache_info().misses)\n"
+    )
+    assert run_python("-c", code).stdout.split() == ["0", "1"]
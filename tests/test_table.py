@@ -0,0 +1,100 @@
+import csv
+import io
+import json
+
+import pytest
+from plates.core import (
+    ISO_3166,
+    STD_PATTERNS,
+    combinations,
+    iso_locations,
+    matches_pattern,
+)
+from plates import registry
+from plates.table import COLUMNS, render, std_pattern_rows
+
+
+def test_std_pattern_rows():
+    rows = std_pattern_rows()
+    assert std_pattern_rows() is rows
+    assert [(row.location, row.iso_code) for row in rows] == list(iso_locations())
+    for row in rows:
+        assert row.pattern == STD_PATTERNS[row.iso_code]
+        assert row.combinations == combinations(row.pattern)
+        assert matches_pattern(row.pattern, row.example)
+
+
+def test_std_pattern_rows_invalidated():
+    rows = std_pattern_rows()
+    ISO_3166["ATLANTIS"] = "AR-2"
+    try:
+        updated = std_pattern_rows()
+        assert updated is not rows
+        assert updated[-1][:3] == ("ATLANTIS", "AR-2", "CCDDDCC")
+        assert iso_locations()[-1] == ("ATLANTIS", "AR-2")
+    finally:
+        del ISO_3166["ATLANTIS"]
+    assert len(std_pattern_rows()) == len(rows)
+
+
+def test_std_pattern_rows_invalidated_nested():
+    rows = std_pattern_rows()
+    usa = ISO_3166["USA"]
+    usa["ATLANTIS"] = "AR-2"
+    try:
+        # Modifications in place are not tracked until invalidated
+        assert std_pattern_rows() is rows
+        ISO_3166.invalidate()
+        assert ("ATLANTIS", "AR-2") in iso_locations()
+        assert len(std_pattern_rows()) == len(rows) + 1
+    finally:
+        del usa["ATLANTIS"]
+        ISO_3166.invalidate()
+    assert len(std_pattern_rows()) == len(rows)
+
+
+def test_versioned_cache():
+    section = registry.LazySection("Program Info")
+    calls = []
+
+    @registry.cached_by_version(section)
+    def keys():
+        calls.append(1)
+        return sorted(section)
+
+    assert keys() == keys()
+    assert len(calls) == 1
+    section["Extra"] = ""
+    assert "Extra" in keys()
+    del section["Extra"]
+    assert "Extra" not in keys()
+    assert len(calls) == 3
+    keys.cache_clear()
+    keys()
+    assert len(calls) == 4
+
+
+@pytest.mark.parametrize("format,delimiter", [("tsv", "\t"), ("csv", ",")])
+def test_render_delimited(format, delimiter):
+    out = io.StringIO()
+    render(format, out)
+    rows = list(csv.reader(io.StringIO(out.getvalue()), delimiter=delimiter))
+    assert tuple(rows[0]) == COLUMNS
+    assert rows[1:] == [[str(field) for field in row] for row in std_pattern_rows()]
+
+
+def test_render_json():
+    out = io.StringIO()
+    render("json", out)
+    rows = json.loads(out.getvalue())
+    assert rows[0] == std_pattern_rows()[0]._asdict()
+    assert len(rows) == len(std_pattern_rows())
+
+
+def test_render_rich():
+    out = io.StringIO()
+    render("rich", out)
+    assert "Standard License Plate Patterns" in out.getvalue()
+    assert "ARGENTINA" in out.getvalue()
+    with pytest.raises(ValueError):
+        render("xml")
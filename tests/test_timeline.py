@@ -0,0 +1,106 @@
+import datetime
+import os
+
+import pytest
+from plates.core import PlateNotValidException, get_plate_index
+
+np = pytest.importorskip("numpy")
+from plates.timeline import Timeline  # noqa: E402
+
+ANCHORS = [
+    ("AA000AA", "2000-01-01"),
+    ("AB000AA", "2000-12-31"),
+    ("AC500AA", "2001-06-30"),
+]
+
+
+def test_estimate_dates():
+    timeline = Timeline("CCDDDCC", ANCHORS)
+    dates = timeline.estimate_dates(["AA500AA", "AA000AA", "AB000AA", "AZ999ZZ"])
+    assert dates.tolist()[:3] == [
+        datetime.date(2000, 7, 1),
+        datetime.date(2000, 1, 1),
+        datetime.date(2000, 12, 31),
+    ]
+    assert np.isnat(dates[3])
+    assert not np.isnat(timeline.estimate_dates(["AZ999ZZ"], extrapolate=True)[0])
+    with pytest.raises(ValueError):
+        timeline.estimate_dates(["AA000AAA"])
+    with pytest.raises(ValueError):
+        timeline.estimate_dates(["AA000A", "1234ABC"])
+    with pytest.raises(PlateNotValidException):
+        timeline.estimate_dates(["AA-00AA"])
+
+
+def test_ranges_match_dates():
+    timeline = Timeline("CCDDDCC", ANCHORS)
+    dates = np.arange("1999-12-30", "2001-07-02", dtype="datetime64[D]")
+    first, last = timeline.index_ranges(dates)
+    nonempty = first <= last
+    assert not nonempty[:2].any() and not nonempty[-1]
+    # Ranges are contiguous and the ends of each are dated on its date
+    assert (first[nonempty][1:] == last[nonempty][:-1] + 1).all()
+    for ends in (first, last):
+        estimated = timeline.estimate_dates_of_indices(ends[nonempty])
+        assert (estimated == dates[nonempty]).all()
+    assert timeline.plate_ranges(["2000-01-01", "1999-01-01"]) == [
+        ("AA000AA", timeline.compiled.get_plate(int(last[2]))),
+        None,
+    ]
+
+
+def test_incremental_updates():
+    timeline = Timeline("CCDDDCC")
+    assert len(timeline) == 0
+    assert np.isnat(timeline.estimate_dates(["AA500AA"])[0])
+    timeline.update(ANCHORS[:2])
+    timeline.add("AA500AA", datetime.date(2000, 2, 1))
+    assert timeline.estimate_dates(["AA500AA"])[0] == np.datetime64("2000-02-01")
+    # The last anchor of a plate replaces the previous ones
+    timeline.add("AA500AA", "2000-03-01")
+    timeline.update_indices([get_plate_index("AC500AA")], ["2001-06-30"])
+    indices, dates = timeline.anchors()
+    assert len(timeline) == 4
+    assert (np.diff(indices) > 0).all()
+    assert dates[1] == np.datetime64("2000-03-01")
+    with pytest.raises(ValueError):
+        timeline.add("1234ABC", "2000-01-01")
+    with pytest.raises(ValueError):
+        timeline.update_indices([0], ["2000-01-01"])
+
+
+def test_dates_never_go_back():
+    timeline = Timeline("CCDDDCC", ANCHORS + [("AA900AA", "1999-01-01")])
+    dates = timeline.estimate_dates(["AA800AA", "AA950AA"])
+    assert (dates >= np.datetime64("2000-01-01")).all()
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / "timeline.tml")
+    timeline = Timeline("2C3D2C", ANCHORS)
+    timeline.save(path)
+    loaded = Timeline.load(path)
+    assert loaded.pattern == "CCDDDCC"
+    for a, b in zip(loaded.anchors(), timeline.anchors()):
+        assert (a == b).all()
+    plates = ["AA123BC", "AB999ZZ"]
+    assert (loaded.estimate_dates(plates) == timeline.estimate_dates(plates)).all()
+    (tmp_path / "bad").write_bytes(b"PLATETML")
+    with pytest.raises(ValueError):
+        Timeline.load(str(tmp_path / "bad"))
+
+
+def test_save_fails(tmp_path, monkeypatch):
+    path = str(tmp_path / "timeline.tml")
+    timeline = Timeline("CCDDDCC", ANCHORS)
+    timeline.save(path)
+
+    def replace(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    timeline.add("AD000AA", "2002-01-01")
+    with pytest.raises(PermissionError):
+        timeline.save(path)
+    assert os.listdir(tmp_path) == ["timeline.tml"]
+    assert len(Timeline.load(path)) == 3